@@ -1,53 +1,134 @@
 from pygame.locals import *
-from OpenGL.arrays import vbo
 from OpenGL.GL import *
 from OpenGL.GLU import *
-from PIL import Image
 import os
 import numpy as np
+from vertex_cache import optimize_vertex_cache, reorder_vertices
+from texture_manager import textures
+from assets import asset_path, packed_mesh
+from gpu_resources import create_vbo, delete_vbo
+
+# Bump when the compiled vertex and index arrays change, e.g. their layout or the vertex cache
+# ordering, so meshes compiled into an asset pack by older code are rebuilt from the OBJ
+MESH_FORMAT_VERSION = 1
+
+def set_texture_matrix(uv_transform):
+    """Load an (offset_u, offset_v, scale_u, scale_v) texture matrix, or identity for None."""
+    glMatrixMode(GL_TEXTURE)
+    glLoadIdentity()
+    if uv_transform:
+        offset_u, offset_v, scale_u, scale_v = uv_transform
+        glTranslatef(offset_u, offset_v, 0)
+        glScalef(scale_u, scale_v, 1)
+    glMatrixMode(GL_MODELVIEW)
+
+def faces_from_arrays(faces, face_materials, names):
+    """Turn (F, 3, 3) corner indices (-1 for missing) and per-face material ids back into OBJ.faces."""
+    return [
+        (names[m], [(v, None if vt < 0 else vt, None if vn < 0 else vn) for v, vt, vn in face])
+        for m, face in zip(face_materials.tolist(), faces.tolist())
+    ]
 
 class OBJ:
-    def __init__(self, filename,override_texture=None):
+    def __init__(self, filename,override_texture=None, upload=True):
         self.vertices = []
         self.normals = []
         self.texcoords = []
         self.faces = []
         self.materials = {}
         self.current_material = None
-        self.textures = {}
         self.vbos = {}
         self.override_texture = override_texture
-        self.load_model(filename)
-        self.build_vbos()
         self.filename = filename
+        self.material_files = []
+        if not self.load_packed(filename):
+            self.load_model(filename)
+            self.build_arrays()
+        # upload=False only parses and compiles, for building the asset pack without a GL context
+        if upload:
+            self.load_textures()
+            self.build_vbos()
+
+    def load_packed(self, filename):
+        """Take the parsed and compiled mesh from the asset pack; returns False if it is not packed."""
+        packed = packed_mesh(filename, MESH_FORMAT_VERSION)
+        if packed is None:
+            return False
+        meta, arrays = packed
+        self.vertices = arrays['vertices']
+        self.texcoords = arrays['texcoords']
+        self.normals = arrays['normals']
+        self.faces = faces_from_arrays(arrays['faces'], arrays['face_materials'], meta['face_material_names'])
 
-    def build_vbos(self):
+        dir_path = os.path.dirname(filename)
+        for name, mat in meta['materials'].items():
+            image_path = mat['map_Kd']
+            if image_path and self.override_texture and name.lower() == 'main':
+                image_path = os.path.join(dir_path, self.override_texture)
+            self.materials[name] = {'Kd': tuple(mat['Kd']), 'map_Kd': image_path, 'texture_id': None, 'uv_transform': None}
+            if image_path:
+                textures.preload([image_path])
+
+        self.vertex_data = arrays['vertex_data']
+        self.index_arrays = {m: arrays[f'indices{i}'] for i, m in enumerate(meta['index_materials'])}
+        self.index_type = GL_UNSIGNED_SHORT if self.vertex_data.shape[0] <= 0xFFFF else GL_UNSIGNED_INT
+        self.vram_bytes = self.vertex_data.nbytes + sum(a.nbytes for a in self.index_arrays.values())
+        return True
+
+    def build_arrays(self):
+        """Build one unique-vertex array and a cache-ordered index array per material."""
         unique_vertex_map = {}
-        final_data = {}
+        vertex_data = []
+        index_lists = {}
         for material, face_group in self.faces:
-            if material not in final_data:
-                final_data[material] = []
+            indices = index_lists.setdefault(material, [])
 
             for v_idx, vt_idx, vn_idx in face_group:
                 key = (v_idx, vt_idx, vn_idx)
-                if key not in unique_vertex_map:
+                index = unique_vertex_map.get(key)
+                if index is None:
                     vertex = self.vertices[v_idx]
                     tex = self.texcoords[vt_idx] if vt_idx is not None and vt_idx < len(self.texcoords) else (0.0, 0.0)
                     normal = self.normals[vn_idx] if vn_idx is not None and vn_idx < len(self.normals) else (0.0, 0.0, 0.0)
-                    unique_vertex_map[key] = vertex + tex + normal
-                final_data[material].append(unique_vertex_map[key])
+                    index = len(vertex_data)
+                    unique_vertex_map[key] = index
+                    vertex_data.append((*vertex, *tex, *normal))
+                indices.append(index)
+
+        materials = list(index_lists)
+        ordered = [optimize_vertex_cache(index_lists[m], len(vertex_data)) for m in materials]
+        vertex_array = np.array(vertex_data, dtype=np.float32).reshape(-1, 8)
+        self.vertex_data, remapped = reorder_vertices(vertex_array, ordered)
+
+        # 16-bit indices halve the index buffer whenever the vertex count allows
+        self.index_type = GL_UNSIGNED_SHORT if len(self.vertex_data) <= 0xFFFF else GL_UNSIGNED_INT
+        dtype = np.uint16 if self.index_type == GL_UNSIGNED_SHORT else np.uint32
+        self.index_arrays = {m: indices.astype(dtype) for m, indices in zip(materials, remapped)}
+        self.vram_bytes = self.vertex_data.nbytes + sum(a.nbytes for a in self.index_arrays.values())
 
-        for material, vertices in final_data.items():
-            flat_data = []
-            for v in vertices:
-                flat_data.extend(v)
-            data_np = np.array(flat_data, dtype=np.float32)
-            vbo_id = vbo.VBO(data_np)
-            self.vbos[material] = (vbo_id, len(vertices))
+    def build_vbos(self):
+        name = os.path.basename(self.filename)
+        self.vertex_vbo = create_vbo(self.vertex_data, f"{name} vertices")
+        self.vbos = {}
+        for material, indices in self.index_arrays.items():
+            index_vbo = create_vbo(indices, f"{name} {material} indices", target=GL_ELEMENT_ARRAY_BUFFER)
+            self.vbos[material] = (index_vbo, len(indices))
+
+    def delete(self):
+        """Free the model's buffers; its textures belong to the shared texture cache."""
+        if self.vbos:
+            delete_vbo(self.vertex_vbo)
+            for index_vbo, _ in self.vbos.values():
+                delete_vbo(index_vbo)
+            self.vbos = {}
+
+    def material_vertex_arrays(self):
+        """Return un-indexed (n, 8) vertex data per material, for merging into static batches."""
+        return {m: self.vertex_data[indices] for m, indices in self.index_arrays.items()}
 
     def load_model(self, filename):
         dir_path = os.path.dirname(filename)
-        with open(filename, 'r') as f:
+        with open(asset_path(filename), 'r') as f:
             for line in f:
                 if line.startswith('mtllib'):
                     self.load_mtl(os.path.join(dir_path, line.split()[1]))
@@ -70,34 +151,38 @@ class OBJ:
                     self.faces.append((self.current_material, face))
 
     def load_texture(self, image_path):
-        if image_path in self.textures:
-            return self.textures[image_path]
         try:
-            texture_surface = Image.open(image_path).convert('RGB')
-            texture_data = texture_surface.tobytes("raw", "RGB", 0, -1)
-            width, height = texture_surface.size
-
-            texture_id = glGenTextures(1)
-            glBindTexture(GL_TEXTURE_2D, texture_id)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, width, height, 0, GL_RGB, GL_UNSIGNED_BYTE, texture_data)
-            glBindTexture(GL_TEXTURE_2D, 0)
-
-            self.textures[image_path] = texture_id
-            return texture_id
+            return textures.texture(image_path)
         except Exception as e:
             print(f"Failed to load texture {image_path}: {e}")
             return None
 
+    def load_textures(self):
+        """Upload the textures named by the materials; decoding started while the mtl was read."""
+        for mat in self.materials.values():
+            if mat['map_Kd']:
+                mat['texture_id'] = self.load_texture(mat['map_Kd'])
+
+    def set_texture(self, material, texture_id, uv_transform=None):
+        """Swap a material's texture; uv_transform (offset_u, offset_v, scale_u, scale_v) selects an atlas tile."""
+        mat = self.materials[material]
+        mat['texture_id'] = texture_id
+        mat['uv_transform'] = uv_transform
+
+    def uv_bounds(self, material):
+        """Smallest and largest texture coordinates used by a material."""
+        uvs = self.vertex_data[self.index_arrays[material], 3:5]
+        return tuple(uvs.min(axis=0)), tuple(uvs.max(axis=0))
+
     def load_mtl(self, filename):
+        self.material_files.append(filename)
         current = None
         dir_path = os.path.dirname(filename)
-        with open(filename, 'r') as f:
+        with open(asset_path(filename), 'r') as f:
             for line in f:
                 if line.startswith('newmtl'):
                     current = line.split()[1]
-                    self.materials[current] = {'Kd': (1, 1, 1), 'map_Kd': None, 'texture_id': None}
+                    self.materials[current] = {'Kd': (1, 1, 1), 'map_Kd': None, 'texture_id': None, 'uv_transform': None}
                 elif line.startswith('Kd') and current:
                     self.materials[current]['Kd'] = tuple(map(float, line.split()[1:4]))
                 elif line.startswith('map_Kd') and current:
@@ -107,7 +192,7 @@ class OBJ:
                         image_path = line.split(' ', 1)[1].strip().replace('\\', '/').replace(' ', '_')
                     rel_path = os.path.join(dir_path, image_path)
                     self.materials[current]['map_Kd'] = rel_path
-                    self.materials[current]['texture_id'] = self.load_texture(rel_path)
+                    textures.preload([rel_path])
 
     def render(self):
         glEnable(GL_TEXTURE_2D)
@@ -115,7 +200,13 @@ class OBJ:
         glEnableClientState(GL_TEXTURE_COORD_ARRAY)
         glEnableClientState(GL_NORMAL_ARRAY)
 
-        for material, (vbo_id, count) in self.vbos.items():
+        self.vertex_vbo.bind()
+        stride = 32  # 3 pos (12) + 2 tex (8) + 3 norm (12)
+        glVertexPointer(3, GL_FLOAT, stride, self.vertex_vbo)
+        glTexCoordPointer(2, GL_FLOAT, stride, self.vertex_vbo + 12)
+        glNormalPointer(GL_FLOAT, stride, self.vertex_vbo + 20)
+
+        for material, (index_vbo, count) in self.vbos.items():
             mat = self.materials.get(material, {})
             color = mat.get('Kd', (1, 1, 1))
             texture_id = mat.get('texture_id')
@@ -132,17 +223,22 @@ class OBJ:
             else:
                 glBindTexture(GL_TEXTURE_2D, 0)
 
-            vbo_id.bind()
-            stride = 32  # 3 pos (12) + 2 tex (8) + 3 norm (12)
-            glVertexPointer(3, GL_FLOAT, stride, vbo_id)
-            glTexCoordPointer(2, GL_FLOAT, stride, vbo_id + 12)
-            glNormalPointer(GL_FLOAT, stride, vbo_id + 20)
-            glDrawArrays(GL_TRIANGLES, 0, count)
-            vbo_id.unbind()
+            uv_transform = mat.get('uv_transform')
+            if uv_transform:
+                set_texture_matrix(uv_transform)
+
+            index_vbo.bind()
+            glDrawElements(GL_TRIANGLES, count, self.index_type, index_vbo)
+            index_vbo.unbind()
+
+            if uv_transform:
+                set_texture_matrix(None)
 
             if material and material.lower() == "window":
                 glDisable(GL_BLEND)
 
+        self.vertex_vbo.unbind()
+
         glDisableClientState(GL_VERTEX_ARRAY)
         glDisableClientState(GL_TEXTURE_COORD_ARRAY)
         glDisableClientState(GL_NORMAL_ARRAY)
@@ -0,0 +1,332 @@
+"""Asset resolver and single-file asset pack.
+
+Every loader asks this module for its data by the asset's relative path
+(e.g. 'OBJs/car.obj'). When assets.pack exists it is memory-mapped and loaders
+get zero-copy NumPy views of pre-processed blobs: compiled meshes and their LOD
+levels, decoded texture mip chains and raw PCM audio. Anything missing from the
+pack falls back to the loose file, and so does any entry whose source files
+have changed since the pack was built (by mtime and size) or that was built
+by an older version of its loader; a pack shipped without the loose files is
+always used.
+
+Build the pack from the repository root with:
+
+    python assets.py [output]
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+import numpy as np
+
+PACK_FILE = 'assets.pack'
+PACK_MAGIC = b'CARPACK1'
+PACK_VERSION = 2
+# Blob start offsets are rounded up to this, so views are aligned for any dtype and SIMD loads
+PACK_ALIGNMENT = 64
+HEADER = struct.Struct('<8sQQ')  # magic, index offset, index size
+
+# Mixer format the PCM audio is decoded to; matches viewer_mode's pre_init
+AUDIO_FORMAT = (44100, -16, 2)
+
+# Loose files live next to the code, or in the unpacked bundle of a PyInstaller build
+ASSET_ROOT = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+
+
+def asset_key(path):
+    """Normalized relative path used to name an asset inside the pack."""
+    return os.path.normpath(path).replace('\\', '/')
+
+
+def asset_path(path):
+    """Absolute path of a loose asset file."""
+    return os.path.join(ASSET_ROOT, asset_key(path))
+
+
+def source_stamp(path):
+    """[mtime_ns, size] of a loose asset file, or None when it is not there."""
+    try:
+        stat = os.stat(asset_path(path))
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def source_stamps(paths):
+    return {asset_key(path): source_stamp(path) for path in paths}
+
+
+def cache_path(source, suffix):
+    """Disk cache of arrays derived from a source file: next to it, its extension replaced by suffix."""
+    return os.path.splitext(source)[0] + suffix
+
+
+def cache_key(source, version, params):
+    stat = os.stat(source)
+    return ':'.join(str(part) for part in (version, stat.st_mtime_ns, stat.st_size) + tuple(params))
+
+
+def load_cache(source, suffix, version, *params):
+    """{name: array} saved by save_cache for a source file, or None when missing or stale.
+
+    The cache is keyed by the source's mtime and size, the version of the
+    loader that derived the arrays and the parameters it derived them with.
+    """
+    try:
+        key = cache_key(source, version, params)
+        with np.load(cache_path(source, suffix)) as data:
+            if str(data['key']) != key:
+                return None
+            return {name: data[name] for name in data.files if name != 'key'}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def save_cache(source, suffix, arrays, version, *params):
+    """Store arrays derived from a source file for load_cache; a failed write is reported and skipped."""
+    path = cache_path(source, suffix)
+    try:
+        key = cache_key(source, version, params)
+        with open(path, 'wb') as f:
+            np.savez(f, key=np.array(key), **arrays)
+    except OSError as e:
+        print(f"Failed to write cache {path}: {e}")
+
+
+class AssetPack:
+    """Read-only view of a pack file through mmap."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_offset, index_size = HEADER.unpack_from(self.data, 0)
+        if magic != PACK_MAGIC:
+            raise ValueError(f"{path} is not an asset pack")
+        index = json.loads(bytes(self.data[index_offset:index_offset + index_size]))
+        if index['version'] != PACK_VERSION:
+            raise ValueError(f"{path} is pack version {index['version']}, expected {PACK_VERSION}")
+        self.entries = index['entries']
+        self.meta = index['meta']
+
+    def __contains__(self, name):
+        return name in self.entries or name in self.meta
+
+    def array(self, name):
+        """Zero-copy NumPy view of an array blob."""
+        entry = self.entries[name]
+        count = int(np.prod(entry['shape']))
+        return np.frombuffer(self.data, entry['dtype'], count, entry['offset']).reshape(entry['shape'])
+
+    def bytes(self, name):
+        """Zero-copy memoryview of a blob."""
+        entry = self.entries[name]
+        return memoryview(self.data)[entry['offset']:entry['offset'] + entry['size']]
+
+
+class PackWriter:
+    """Writes blobs back to back at aligned offsets, then the JSON index."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path + '.tmp', 'wb')
+        self.file.write(b'\0' * PACK_ALIGNMENT)  # header is filled in by close()
+        self.entries = {}
+        self.meta = {}
+
+    def _align(self):
+        padding = -self.file.tell() % PACK_ALIGNMENT
+        self.file.write(b'\0' * padding)
+
+    def add_array(self, name, array):
+        array = np.ascontiguousarray(array)
+        self._align()
+        self.entries[name] = {
+            'offset': self.file.tell(), 'size': array.nbytes,
+            'dtype': array.dtype.str, 'shape': list(array.shape),
+        }
+        self.file.write(array.tobytes())
+
+    def add_bytes(self, name, data):
+        self.add_array(name, np.frombuffer(data, dtype=np.uint8))
+
+    def close(self):
+        self._align()
+        index = json.dumps({'version': PACK_VERSION, 'entries': self.entries, 'meta': self.meta}).encode()
+        index_offset = self.file.tell()
+        self.file.write(index)
+        self.file.seek(0)
+        self.file.write(HEADER.pack(PACK_MAGIC, index_offset, len(index)))
+        self.file.close()
+        os.replace(self.path + '.tmp', self.path)
+
+
+_pack = None  # AssetPack once opened, False when there is none
+_stale = set()  # entries already reported as out of date
+
+
+def get_pack():
+    """The installed asset pack, or None to use loose files only."""
+    global _pack
+    if _pack is None:
+        path = asset_path(PACK_FILE)
+        _pack = False
+        if os.path.exists(path):
+            try:
+                _pack = AssetPack(path)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring asset pack {path}: {e}")
+    return _pack or None
+
+
+def packed_entry(key, version=None):
+    """The pack's meta for key if it is there and current, else None.
+
+    An entry is current when it was built with the given loader version and
+    none of its source files that exist on disk differ from when it was packed.
+    """
+    pack = get_pack()
+    if pack is None or key not in pack.meta:
+        return None
+    meta = pack.meta[key]
+    changed = [source for source, stamp in meta['sources'].items() if source_stamp(source) not in (None, stamp)]
+    if meta.get('version') != version or changed:
+        if key not in _stale:
+            _stale.add(key)
+            print(f"{PACK_FILE}: {key} is out of date, using the loose file")
+        return None
+    return meta
+
+
+def packed_mesh(path, version):
+    """(meta, arrays) of a compiled mesh from the pack, or None."""
+    pack = get_pack()
+    key = asset_key(path)
+    if packed_entry(key, version) is None:
+        return None
+    meta = pack.meta[key]
+    arrays = {name: pack.array(f'{key}#{name}') for name in meta['arrays']}
+    return meta, arrays
+
+
+def packed_lod_levels(path, cell_fractions, version):
+    """LOD levels in lod.build_levels' format from the pack, or None if absent or built differently."""
+    pack = get_pack()
+    key = asset_key(path) + '#lod'
+    if packed_entry(key, version) is None:
+        return None
+    meta = pack.meta[key]
+    if meta['cell_fractions'] != list(cell_fractions):
+        return None
+    return [
+        (pack.array(f'{key}{i}/vertices'), pack.array(f'{key}{i}/faces'),
+         pack.array(f'{key}{i}/materials'), meta['material_names'])
+        for i in range(len(cell_fractions))
+    ]
+
+
+def packed_texture_levels(path, version):
+    """Decoded mip chain of an image from the pack, or None."""
+    pack = get_pack()
+    key = asset_key(path)
+    if packed_entry(key, version) is None:
+        return None
+    return [pack.array(f'{key}#level{i}') for i in range(pack.meta[key]['levels'])]
+
+
+def load_sound(path):
+    """pygame Sound for an audio asset, from packed PCM when the mixer format matches."""
+    import pygame.mixer
+    pack = get_pack()
+    key = asset_key(path)
+    if packed_entry(key) is not None and tuple(pack.meta[key]['format']) == pygame.mixer.get_init():
+        return pygame.mixer.Sound(buffer=pack.bytes(key))
+    return pygame.mixer.Sound(asset_path(path))
+
+
+def add_mesh(writer, path):
+    from OBJ import OBJ, MESH_FORMAT_VERSION
+    from lod import LOD_CELL_FRACTIONS, LOD_CACHE_VERSION, build_levels, faces_to_array
+
+    model = OBJ(path, upload=False)
+    key = asset_key(path)
+    faces, face_materials, names = faces_to_array(model)
+    arrays = {
+        'vertex_data': model.vertex_data,
+        'vertices': np.array(model.vertices, dtype=np.float64).reshape(-1, 3),
+        'texcoords': np.array(model.texcoords, dtype=np.float64).reshape(-1, 2),
+        'normals': np.array(model.normals, dtype=np.float64).reshape(-1, 3),
+        'faces': faces,
+        'face_materials': face_materials,
+    }
+    materials = list(model.index_arrays)
+    for i, material in enumerate(materials):
+        arrays[f'indices{i}'] = model.index_arrays[material]
+    for name, array in arrays.items():
+        writer.add_array(f'{key}#{name}', array)
+    writer.meta[key] = {
+        'arrays': list(arrays),
+        'materials': {name: {'Kd': list(mat['Kd']), 'map_Kd': mat['map_Kd'] and asset_key(mat['map_Kd'])}
+                      for name, mat in model.materials.items()},
+        'index_materials': materials,
+        'face_material_names': names,
+        'version': MESH_FORMAT_VERSION,
+        'sources': source_stamps([path] + model.material_files),
+    }
+
+    levels = build_levels(model, LOD_CELL_FRACTIONS)
+    for i, (vertices, level_faces, level_materials, _) in enumerate(levels):
+        writer.add_array(f'{key}#lod{i}/vertices', vertices)
+        writer.add_array(f'{key}#lod{i}/faces', level_faces)
+        writer.add_array(f'{key}#lod{i}/materials', level_materials)
+    writer.meta[key + '#lod'] = {'cell_fractions': list(LOD_CELL_FRACTIONS), 'material_names': levels[0][3],
+                                 'version': LOD_CACHE_VERSION, 'sources': writer.meta[key]['sources']}
+
+
+def add_texture(writer, path):
+    from texture_manager import TEXTURE_CACHE_VERSION, load_levels
+
+    key = asset_key(path)
+    levels = load_levels(path)
+    for i, level in enumerate(levels):
+        writer.add_array(f'{key}#level{i}', level)
+    writer.meta[key] = {'levels': len(levels), 'version': TEXTURE_CACHE_VERSION, 'sources': source_stamps([path])}
+
+
+def add_sound(writer, path):
+    import pygame.mixer
+
+    key = asset_key(path)
+    writer.add_bytes(key, pygame.mixer.Sound(asset_path(path)).get_raw())
+    writer.meta[key] = {'format': list(pygame.mixer.get_init()), 'sources': source_stamps([path])}
+
+
+def build_pack(output=PACK_FILE):
+    """Compile every model, texture and sound under ASSET_ROOT into one pack file."""
+    global _pack
+    _pack = False  # read loose files only, never a previous pack
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import pygame.mixer
+    pygame.mixer.init(*AUDIO_FORMAT)
+
+    def relative(pattern):
+        return sorted(os.path.relpath(p, ASSET_ROOT) for p in glob.glob(os.path.join(ASSET_ROOT, pattern)))
+
+    writer = PackWriter(output)
+    for path in relative('OBJs/*.obj'):
+        add_mesh(writer, path)
+        print(f"mesh     {asset_key(path)}")
+    for path in relative('OBJs/textures/*.png'):
+        add_texture(writer, path)
+        print(f"texture  {asset_key(path)}")
+    for path in relative('audio/*.mp3'):
+        add_sound(writer, path)
+        print(f"audio    {asset_key(path)}")
+    writer.close()
+    print(f"Wrote {output}: {len(writer.entries)} blobs, {os.path.getsize(output) / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    build_pack(sys.argv[1] if len(sys.argv) > 1 else asset_path(PACK_FILE))
@@ -0,0 +1,246 @@
+"""CPU-side regression suite for the loading, generation and simulation hot paths.
+
+Runs without a display, on the shipped assets and on scaled-up synthetic
+inputs. From the repository root:
+
+    python -m benchmarks.cpu_suite              compare against the committed baseline
+    python -m benchmarks.cpu_suite --update     record a new baseline
+    python -m benchmarks.cpu_suite -k road      only benchmarks whose name contains 'road'
+
+Exits with status 1 when any benchmark is slower than its baseline by more
+than the threshold (BENCHMARK_THRESHOLD, default 25%), and with status 2
+when there is no baseline to compare against. The baseline is committed
+along with the time of a fixed reference workload, timed right before
+each benchmark on the machine that recorded it. Each run times that
+workload again and scales the baseline by the ratio, so the baseline
+carries over to faster or slower machines and to load that comes and goes
+during a run.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import assets
+import driving_game_mode as game
+import viewer_mode
+from OBJ import OBJ
+from placement import Scatter
+from road_mesh import RoadIndex, centre_line_segments
+from terrain import Terrain
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cpu_baseline.json')
+BENCHMARK_THRESHOLD = float(os.environ.get('BENCHMARK_THRESHOLD', 0.25))
+# Each benchmark reports the fastest of this many runs, after one warm-up run
+REPEATS = 5
+# Benchmarks whose warm-up takes longer than this many seconds report that run alone
+SLOW_BENCHMARK = 1.0
+
+LARGE_ROAD_SEGMENTS = 10000
+LARGE_MESH_FACES = 100000
+
+
+def write_grid_obj(path, faces):
+    """Write a flat grid OBJ with about the given number of triangles, with UVs and normals."""
+    side = int((faces / 2) ** 0.5)
+    with open(path, 'w') as f:
+        for z in range(side + 1):
+            for x in range(side + 1):
+                f.write(f"v {x * 0.1:.3f} {((x * 7 + z * 13) % 17) * 0.01:.3f} {z * 0.1:.3f}\n")
+                f.write(f"vt {x / side:.5f} {z / side:.5f}\n")
+        f.write("vn 0 1 0\n")
+        for z in range(side):
+            for x in range(side):
+                a = z * (side + 1) + x + 1
+                b, c, d = a + 1, a + side + 1, a + side + 2
+                f.write(f"f {a}/{a}/1 {c}/{c}/1 {b}/{b}/1\n")
+                f.write(f"f {b}/{b}/1 {c}/{c}/1 {d}/{d}/1\n")
+
+
+def reference():
+    """Fixed mix of interpreter and numpy work that every baseline is scaled by."""
+    total = 0.0
+    for i in range(60000):
+        total += (i * 7 % 13) ** 0.5
+    values = np.random.default_rng(0).random(1 << 18)
+    for _ in range(3):
+        values = np.sort(np.sqrt(values * values + total % 1))
+    return values
+
+
+def seeded_road(count):
+    random.seed(0)
+    return game.generate_road(count)
+
+
+class HeldKeys(dict):
+    """Stand-in for pygame.key.get_pressed(): keys not in the dict are up."""
+
+    def __missing__(self, key):
+        return False
+
+
+def drive(road, ticks=1000):
+    """Run the car physics for a number of fixed ticks with the throttle held, steering now and then."""
+    keys = HeldKeys({game.pygame.K_UP: True})
+    car_speed, car_angle, car_pos, times = 0.0, 0.0, list(road[0].p2), 1
+    max_speed, acceleration, brake_force, friction = 0.5, 0.1, 0.05, 0.02
+    for i in range(ticks):
+        keys[game.pygame.K_LEFT] = i % 120 < 30
+        car_speed, car_angle, car_pos, times, max_speed, acceleration, brake_force, friction, _, _ = (
+            game.update_car_physics(keys, car_speed, car_angle, car_pos, times, max_speed,
+                                    acceleration, brake_force, friction, False, False, 1 / 60)
+        )
+
+
+def probe_points(road, count):
+    """Points alternating on and off the road, spread along its length."""
+    rng = random.Random(1)
+    points = []
+    for i in range(count):
+        seg = road[i * len(road) // count]
+        offset = 1.0 if i % 2 else 6.0
+        points.append((seg.p1[0] + rng.uniform(-offset, offset), seg.p1[1] + rng.uniform(-offset, offset)))
+    return points
+
+
+def check_points(road, points):
+    for point in points:
+        game.check_on_road(point, road)
+
+
+def benchmarks(workdir):
+    """Return {name: function} for every benchmark; inputs are built here, outside the timed code."""
+    large_mesh = os.path.join(workdir, 'grid.obj')
+    write_grid_obj(large_mesh, LARGE_MESH_FACES)
+    road = seeded_road(99)
+    large_road = seeded_road(LARGE_ROAD_SEGMENTS)
+    # Scenery goes along the drawn centre line, which the game builds with the road mesh beforehand
+    drawn = centre_line_segments(road)
+    large_drawn = centre_line_segments(large_road)
+    tree = object()
+
+    suite = {}
+    for name in ('car', 'tree', 'grass1', 'grass2'):
+        # load_model parsing plus build_arrays, the CPU half of building the VBOs
+        suite[f'obj_load[{name}]'] = lambda path=f'OBJs/{name}.obj': OBJ(path, upload=False)
+    suite[f'obj_load[grid {LARGE_MESH_FACES // 1000}k faces]'] = lambda: OBJ(large_mesh, upload=False)
+    suite['generate_road[99]'] = lambda: seeded_road(99)
+    suite[f'generate_road[{LARGE_ROAD_SEGMENTS}]'] = lambda: seeded_road(LARGE_ROAD_SEGMENTS)
+    suite['generate_scenery[99]'] = lambda: game.generate_scenery(road, tree, Scatter(seed=0), drawn)
+    suite[f'generate_scenery[{LARGE_ROAD_SEGMENTS}]'] = lambda: game.generate_scenery(
+        large_road, tree, Scatter(seed=0), large_drawn)
+    points = probe_points(road, 1000)
+    suite['check_on_road[99 x 1000]'] = lambda: check_points(road, points)
+    large_points = probe_points(large_road, 100)
+    suite[f'check_on_road[{LARGE_ROAD_SEGMENTS} x 100]'] = lambda: check_points(large_road, large_points)
+    large_index = RoadIndex(large_road)
+    suite[f'check_on_road[{LARGE_ROAD_SEGMENTS} x 100 indexed]'] = lambda: check_points(large_index, large_points)
+    suite['update_car_physics[1000 ticks]'] = lambda: drive(road)
+    suite['generate_grass_positions[250]'] = lambda: viewer_mode.generate_grass_positions(
+        object_positions=[], grass_models=[0, 1], seed=0)
+    suite['generate_grass_positions[2500]'] = lambda: viewer_mode.generate_grass_positions(
+        count=2500, max_radius=70, object_positions=[], grass_models=[0, 1], seed=0)
+    terrain = Terrain(centre_line_segments(road), road[0].p1, road[-1].p2, seed=0)
+    # Heights and every level's vertices of one chunk crossed by the road, all but the GL upload
+    suite['terrain_chunk[road]'] = lambda key=(0, 0): terrain.chunk_vertices(key, terrain.chunk_heights(key))
+    suite['terrain_chunk[open]'] = lambda key=(40, 40): terrain.chunk_vertices(key, terrain.chunk_heights(key))
+    return suite
+
+
+def measure(function, repeats=REPEATS):
+    """Fastest wall time of the function in milliseconds, after one warm-up call."""
+    start = time.perf_counter()
+    function()
+    timings = [time.perf_counter() - start]
+    if timings[0] > SLOW_BENCHMARK:
+        return timings[0] * 1000
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings[1:]) * 1000
+
+
+def load_baseline(path=BASELINE_FILE):
+    """({name: ms}, {name: reference ms}) of the committed baseline, or None when there is none."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        return data['results'], data['references']
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(results, references, path=BASELINE_FILE):
+    with open(path, 'w') as f:
+        json.dump({'machine': platform.machine(), 'python': sys.version.split()[0],
+                   'results': results, 'references': references}, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--update', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=BENCHMARK_THRESHOLD,
+                        help="allowed slowdown as a fraction of the baseline")
+    parser.add_argument('-k', dest='select', default='', help="only run benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    # Time the loaders on the loose files, not on pre-compiled pack data
+    assets._pack = False
+    baseline = load_baseline()
+    if baseline is None and not args.update:
+        print(f"No baseline at {BASELINE_FILE}; record one with --update")
+        return 2
+    expected, expected_references = baseline or ({}, {})
+
+    results, references = {}, {}
+    regressions = []
+    missing = []
+    with tempfile.TemporaryDirectory() as workdir:
+        suite = benchmarks(workdir)
+        print(f"{'benchmark':<40} {'ms':>10} {'baseline':>10} {'change':>8}")
+        for name, function in suite.items():
+            if args.select not in name:
+                continue
+            references[name] = round(measure(reference), 3)
+            ms = measure(function)
+            results[name] = round(ms, 3)
+            line = f"{name:<40} {ms:>10.2f}"
+            if name in expected:
+                # The baseline time as this machine would take it now, going by the reference workload
+                scaled = expected[name] * references[name] / expected_references[name]
+                change = ms / scaled - 1
+                line += f" {scaled:>10.2f} {change:>+7.0%}"
+                if change > args.threshold:
+                    line += "  REGRESSION"
+                    regressions.append(name)
+            elif not args.update:
+                line += "  NO BASELINE"
+                missing.append(name)
+            print(line)
+
+    if args.update:
+        save_baseline({**expected, **results}, {**expected_references, **references})
+        print(f"Baseline written to {BASELINE_FILE}")
+        return 0
+    if missing:
+        print(f"{len(missing)} benchmark(s) missing from the baseline; record them with --update")
+        return 2
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
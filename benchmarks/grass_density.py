@@ -0,0 +1,72 @@
+"""Frame time against road-side grass tuft count.
+
+Needs a display. Run from the repository root:
+
+    python -m benchmarks.grass_density
+"""
+import time
+import pygame
+from pygame.locals import *
+from OpenGL.GL import *
+from OpenGL.GLU import *
+
+import driving_game_mode as game
+from OBJ import OBJ
+from placement import Scatter
+from render_queue import RenderQueue
+from road_mesh import RoadMesh
+
+DENSITIES = (0.05, 0.1, 0.2, 0.35, 0.5, 0.75, 1.0)
+FRAMES = 120
+
+
+def measure_frames(road, road_mesh, batches, frames=FRAMES):
+    """Fly the camera along the road and return the mean frame time in milliseconds."""
+    queue = RenderQueue()
+    glFinish()
+    start = time.perf_counter()
+    for frame in range(frames):
+        seg = road[frame * (len(road) - 3) // frames]
+        ahead = road[frame * (len(road) - 3) // frames + 2]
+        cam_x, cam_z = seg.p1
+
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        glLoadIdentity()
+        gluLookAt(cam_x, 4, cam_z, ahead.p2[0], 0, ahead.p2[1], 0, 1, 0)
+        queue.begin((cam_x, 4, cam_z))
+        game.draw_road_and_scenery(queue, road_mesh, [], (cam_x, cam_z), None, batches)
+        queue.flush()
+        pygame.display.flip()
+        pygame.event.pump()
+    glFinish()
+    return (time.perf_counter() - start) * 1000 / frames
+
+
+def main():
+    pygame.init()
+    display = (1000, 800)
+    pygame.display.set_mode(display, DOUBLEBUF | OPENGL)
+    game.initialize_opengl(display)
+
+    grass_models = [OBJ('OBJs/grass1.obj'), OBJ('OBJs/grass2.obj')]
+    road = game.generate_road()
+    road_mesh = RoadMesh(road)
+
+    print(f"{'density':>8} {'tufts':>8} {'batches':>8} {'vertices':>10} {'build ms':>9} {'frame ms':>9}")
+    baseline = measure_frames(road, road_mesh, [])
+    print(f"{'-':>8} {0:>8} {0:>8} {0:>10} {'-':>9} {baseline:>9.2f}")
+    for density in DENSITIES:
+        start = time.perf_counter()
+        batches = game.build_grass_batches(road, grass_models, Scatter(seed=0), density)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        tufts = sum(batch.instance_count for batch in batches)
+        vertices = sum(batch.vertex_count for batch in batches)
+        frame_ms = measure_frames(road, road_mesh, batches)
+        print(f"{density:>8.2f} {tufts:>8} {len(batches):>8} {vertices:>10} {build_ms:>9.1f} {frame_ms:>9.2f}")
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
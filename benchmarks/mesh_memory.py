@@ -0,0 +1,47 @@
+"""Load time, GPU buffer size and vertex cache efficiency for every shipped OBJ model.
+
+Runs without a display. From the repository root:
+
+    python -m benchmarks.mesh_memory
+"""
+import glob
+import time
+
+from OBJ import OBJ
+from vertex_cache import average_cache_miss_ratio
+
+REPEATS = 5
+
+
+def file_order_indices(model):
+    """Corner indices in the order the OBJ file lists them, before any reordering."""
+    ids = {}
+    indices = []
+    for _, face in model.faces:
+        for key in face:
+            indices.append(ids.setdefault(key, len(ids)))
+    return indices
+
+
+def main():
+    print(f"{'model':<20} {'faces':>6} {'verts':>6} {'load ms':>8} "
+          f"{'arrays B':>9} {'indexed B':>10} {'ACMR file':>10} {'ACMR opt':>9}")
+    for filename in sorted(glob.glob('OBJs/*.obj')):
+        timings = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            model = OBJ(filename)
+            timings.append(time.perf_counter() - start)
+
+        corners = sum(count for _, count in model.vbos.values())
+        # Non-indexed layout: the full 32-byte vertex repeated for every face corner
+        array_bytes = corners * 32
+        optimized = [i for indices in model.index_arrays.values() for i in indices.tolist()]
+        print(f"{filename:<20} {len(model.faces):>6} {len(model.vertex_data):>6} "
+              f"{min(timings) * 1000:>8.1f} {array_bytes:>9} {model.vram_bytes:>10} "
+              f"{average_cache_miss_ratio(file_order_indices(model)):>10.3f} "
+              f"{average_cache_miss_ratio(optimized):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
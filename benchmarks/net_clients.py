@@ -0,0 +1,89 @@
+"""Server tick cost and per-client bandwidth of netplay against the number of clients.
+
+Runs a GameServer in a separate process on localhost and drives simulated
+clients from this one, each sending inputs at the physics rate and decoding
+every snapshot. From the repository root:
+
+    python -m benchmarks.net_clients
+    python -m benchmarks.net_clients 4 16 64
+"""
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import netplay
+from frame_timing import PHYSICS_HZ
+
+CLIENT_COUNTS = (1, 8, 24, 48)
+# Seconds of driving measured per run, after the clients have joined
+DURATION = 5.0
+
+
+def serve(port, duration, delta, results):
+    server = netplay.GameServer(port=port, seed=0, delta=delta)
+    server.run(duration)
+    ticks = sorted(server.stats['tick_seconds'])
+    results.put({
+        'mean': sum(ticks) / len(ticks) * 1000,
+        'p95': ticks[int(len(ticks) * 0.95)] * 1000,
+        'bytes_sent': server.stats['bytes_sent'],
+        'packets_sent': server.stats['packets_sent'],
+    })
+
+
+def driver_bits(rng, bits):
+    """Throttle held, with steering that changes now and then like a player's, restarting after a crash."""
+    if rng.random() < 0.02:
+        bits = netplay.KEY_UP | rng.choice((0, netplay.KEY_LEFT, netplay.KEY_RIGHT))
+    if rng.random() < 0.01:
+        return bits | netplay.KEY_RESTART
+    return bits
+
+
+def run(count, delta=True, duration=DURATION, port=netplay.NET_PORT + 1):
+    results = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(port, duration + 2.0, delta, results))
+    server.start()
+    time.sleep(1.0)
+
+    clients = [netplay.GameClient(('127.0.0.1', port)) for _ in range(count)]
+    rng = random.Random(count)
+    bits = [netplay.KEY_UP] * count
+    start = time.perf_counter()
+    end = start + duration
+    next_tick = start
+    while time.perf_counter() < end:
+        for i, client in enumerate(clients):
+            bits[i] = driver_bits(rng, bits[i])
+            client.send_input(bits[i])
+            client.receive()
+            client.poses()
+        next_tick += 1 / PHYSICS_HZ
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+    received = sum(client.bytes_received for client in clients)
+    for client in clients:
+        client.close()
+
+    stats = results.get()
+    server.join()
+    return stats, received / count / elapsed
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    counts = [int(arg) for arg in argv] or CLIENT_COUNTS
+    print(f"{'clients':>7} {'snapshots':>9} {'tick mean ms':>12} {'tick p95 ms':>11} {'KB/s per client':>15}")
+    for count in counts:
+        for delta in (False, True):
+            stats, per_client = run(count, delta)
+            print(f"{count:>7} {'delta' if delta else 'full':>9} {stats['mean']:>12.3f} {stats['p95']:>11.3f} "
+                  f"{per_client / 1024:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import ctypes
+import os
+import queue
+import threading
+import time
+from PIL import Image
+from OpenGL.GL import *
+import pygame
+from gpu_resources import gen_buffers, delete_buffers
+
+# 'png' writes a numbered PNG per frame, 'raw' appends bottom-up RGBA frames to one .rgba file
+CAPTURE_FORMATS = ('png', 'raw')
+CAPTURE_FORMAT = os.environ.get('CAPTURE_FORMAT', 'png')
+CAPTURE_DIR = os.environ.get('CAPTURE_DIR', 'captures')
+# Set CAPTURE=1 to start recording as soon as a mode starts; CAPTURE_KEY toggles it at any time
+CAPTURE_ON_START = bool(os.environ.get('CAPTURE'))
+CAPTURE_KEY = pygame.K_F12
+# Pixel buffers in the readback ring; a frame is copied out about this many frames after it was drawn
+CAPTURE_RING = 3
+# Frames handed to the writer thread but not yet on disk; beyond this new frames are dropped
+CAPTURE_QUEUE = 60
+# Fast zlib level: the writer has to keep up with the frame rate, not win on size
+PNG_COMPRESS_LEVEL = 1
+
+
+def write_frames(frames, directory, fmt, size):
+    """Writer thread body: encode frames from the queue until it yields None."""
+    raw = open(os.path.join(directory, f'capture_{size[0]}x{size[1]}.rgba'), 'wb') if fmt == 'raw' else None
+    try:
+        while True:
+            item = frames.get()
+            if item is None:
+                return
+            index, pixels = item
+            if raw:
+                raw.write(pixels)
+            else:
+                image = Image.frombuffer('RGBA', size, pixels, 'raw', 'RGBA', 0, -1).convert('RGB')
+                image.save(os.path.join(directory, f'frame_{index:06d}.png'), compress_level=PNG_COMPRESS_LEVEL)
+    finally:
+        if raw:
+            raw.close()
+
+
+class FrameCapture:
+    """Records the back buffer through a ring of pixel buffer objects.
+
+    capture() queues an asynchronous glReadPixels into the next PBO and fences
+    it; the pixels are copied out only once a later frame finds the fence
+    signalled, so the render loop never waits for the GPU. Copied frames go to
+    a writer thread through a bounded queue, so it never waits for the disk
+    either. A frame is dropped instead whenever its PBO is still in flight or
+    the writer is behind.
+    """
+
+    def __init__(self, display, fmt=CAPTURE_FORMAT, directory=CAPTURE_DIR, ring=CAPTURE_RING):
+        if fmt not in CAPTURE_FORMATS:
+            print(f"Unknown capture format {fmt!r}, using 'png'")
+            fmt = 'png'
+        self.display = display
+        self.fmt = fmt
+        self.directory = directory
+        self.ring = ring
+        self.size = display[0] * display[1] * 4
+        self.recording = False
+
+    def toggle(self, name):
+        if self.recording:
+            self.stop()
+        else:
+            self.start(name)
+
+    def start(self, name):
+        """Begin a new recording in a timestamped folder under the capture directory."""
+        self.path = os.path.join(self.directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}")
+        os.makedirs(self.path, exist_ok=True)
+        self.buffers = gen_buffers(self.ring, self.size, 'capture PBO')
+        for pbo in self.buffers:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.size, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.fences = [None] * self.ring
+        self.frame_numbers = [None] * self.ring
+        self.next_buffer = 0
+        self.frames = 0
+        self.written = 0
+        self.dropped_gpu = 0
+        self.dropped_writer = 0
+        self.queue = queue.Queue(CAPTURE_QUEUE)
+        self.writer = threading.Thread(target=write_frames, args=(self.queue, self.path, self.fmt, self.display),
+                                       daemon=True)
+        self.writer.start()
+        self.recording = True
+        print(f"[capture] recording {self.fmt} to {self.path}")
+
+    def _collect(self, wait=False):
+        """Copy out every PBO whose readback has finished; with wait, block until all have."""
+        for offset in range(self.ring):
+            slot = (self.next_buffer + offset) % self.ring
+            fence = self.fences[slot]
+            if fence is None:
+                continue
+            timeout = GL_TIMEOUT_IGNORED if wait else 0
+            status = glClientWaitSync(fence, GL_SYNC_FLUSH_COMMANDS_BIT if wait else 0, timeout)
+            if status not in (GL_ALREADY_SIGNALED, GL_CONDITION_SATISFIED):
+                continue
+            glDeleteSync(fence)
+            self.fences[slot] = None
+
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, self.buffers[slot])
+            pointer = glMapBufferRange(GL_PIXEL_PACK_BUFFER, 0, self.size, GL_MAP_READ_BIT)
+            pixels = ctypes.string_at(pointer, self.size)
+            glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+            try:
+                self.queue.put((self.frame_numbers[slot], pixels), block=wait)
+                self.written += 1
+            except queue.Full:
+                self.dropped_writer += 1
+
+    def capture(self):
+        """Queue a readback of the frame just drawn; call before flipping."""
+        if not self.recording:
+            return
+        self.frames += 1
+        self._collect()
+        slot = self.next_buffer
+        if self.fences[slot] is not None:
+            # The GPU has not finished the read that last used this buffer
+            self.dropped_gpu += 1
+            return
+
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.buffers[slot])
+        glPixelStorei(GL_PACK_ALIGNMENT, 4)
+        glReadBuffer(GL_BACK)
+        glReadPixels(0, 0, self.display[0], self.display[1], GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.fences[slot] = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        self.frame_numbers[slot] = self.frames
+        self.next_buffer = (slot + 1) % self.ring
+
+    def stop(self):
+        """Flush the frames still in flight, wait for the writer and print the report."""
+        if not self.recording:
+            return
+        self.recording = False
+        self._collect(wait=True)
+        delete_buffers(self.buffers)
+        self.queue.put(None)
+        self.writer.join()
+
+        dropped = self.dropped_gpu + self.dropped_writer
+        print(f"[capture] {self.written} of {self.frames} frames written to {self.path}, {dropped} dropped "
+              f"({self.dropped_gpu} readback not ready, {self.dropped_writer} writer behind)")
+        if self.fmt == 'raw':
+            print(f"[capture] encode with: ffmpeg -f rawvideo -pix_fmt rgba -s {self.display[0]}x{self.display[1]} "
+                  f"-r 60 -i {os.path.join(self.path, f'capture_{self.display[0]}x{self.display[1]}.rgba')} "
+                  f"-vf vflip capture.mp4")
@@ -0,0 +1,165 @@
+import math
+
+
+def box_extents_from_model(model, scale=1.0, padding=0.0):
+    """Return (half_width, half_length, offset_x, offset_z) of a model's x/z footprint."""
+    xs = [v[0] for v in model.vertices]
+    zs = [v[2] for v in model.vertices]
+    min_x, max_x = min(xs) * scale, max(xs) * scale
+    min_z, max_z = min(zs) * scale, max(zs) * scale
+
+    half_width = (max_x - min_x) / 2 + padding
+    half_length = (max_z - min_z) / 2 + padding
+    offset_x = (max_x + min_x) / 2
+    offset_z = (max_z + min_z) / 2
+    return half_width, half_length, offset_x, offset_z
+
+
+class CollisionBody:
+    """A car footprint: an oriented box in the x/z plane that turns with car_angle."""
+
+    def __init__(self, pos, angle, speed, extents, mass=1.0):
+        self.pos = pos  # [x, z], shared with the caller where possible
+        self.angle = angle  # degrees, same convention as glRotatef(angle, 0, 1, 0)
+        self.speed = speed
+        self.half_width, self.half_length, self.offset_x, self.offset_z = extents
+        self.mass = mass
+
+    def axes(self):
+        """Return the box's local right and forward axes in world space."""
+        rad = math.radians(self.angle)
+        sin_a, cos_a = math.sin(rad), math.cos(rad)
+        return (cos_a, -sin_a), (sin_a, cos_a)
+
+    def center(self):
+        (rx, rz), (fx, fz) = self.axes()
+        return (self.pos[0] + rx * self.offset_x + fx * self.offset_z,
+                self.pos[1] + rz * self.offset_x + fz * self.offset_z)
+
+    def corners(self):
+        cx, cz = self.center()
+        (rx, rz), (fx, fz) = self.axes()
+        w, l = self.half_width, self.half_length
+        return [
+            (cx + rx * sx * w + fx * sz * l, cz + rz * sx * w + fz * sz * l)
+            for sx, sz in ((-1, -1), (1, -1), (1, 1), (-1, 1))
+        ]
+
+    def bounds(self):
+        """Axis-aligned bounds (min_x, max_x, min_z, max_z) used by the broad phase."""
+        cx, cz = self.center()
+        (rx, rz), (fx, fz) = self.axes()
+        ex = abs(rx) * self.half_width + abs(fx) * self.half_length
+        ez = abs(rz) * self.half_width + abs(fz) * self.half_length
+        return cx - ex, cx + ex, cz - ez, cz + ez
+
+    def velocity(self):
+        rad = math.radians(self.angle)
+        return math.sin(rad) * self.speed, math.cos(rad) * self.speed
+
+
+def sweep_and_prune(bodies):
+    """Return index pairs whose bounds overlap, sweeping along x.
+
+    Sorting is the only super-linear step, so the cost stays close to linear
+    while cars are spread out along the track.
+    """
+    boxes = [(body.bounds(), i) for i, body in enumerate(bodies)]
+    boxes.sort(key=lambda item: item[0][0])
+
+    pairs = []
+    active = []
+    for bounds, i in boxes:
+        min_x, _, min_z, max_z = bounds
+        # Drop boxes that end before this one starts
+        active = [item for item in active if item[0][1] >= min_x]
+        for other_bounds, j in active:
+            if other_bounds[2] <= max_z and min_z <= other_bounds[3]:
+                pairs.append((j, i) if j < i else (i, j))
+        active.append((bounds, i))
+    return pairs
+
+
+def _project(corners, axis):
+    dots = [x * axis[0] + z * axis[1] for x, z in corners]
+    return min(dots), max(dots)
+
+
+def obb_overlap(a, b):
+    """Separating axis test between two bodies.
+
+    Returns (depth, (nx, nz)) with the normal pointing from a to b, or None.
+    """
+    corners_a = a.corners()
+    corners_b = b.corners()
+    best_depth = None
+    best_axis = None
+
+    for axis in a.axes() + b.axes():
+        min_a, max_a = _project(corners_a, axis)
+        min_b, max_b = _project(corners_b, axis)
+        depth = min(max_a, max_b) - max(min_a, min_b)
+        if depth <= 0:
+            return None
+        if best_depth is None or depth < best_depth:
+            best_depth = depth
+            best_axis = axis
+
+    ax, az = a.center()
+    bx, bz = b.center()
+    nx, nz = best_axis
+    if (bx - ax) * nx + (bz - az) * nz < 0:
+        nx, nz = -nx, -nz
+    return best_depth, (nx, nz)
+
+
+def apply_impulse(a, b, depth, normal, restitution=0.3, spin=25.0):
+    """Separate two bodies and exchange momentum along the contact normal.
+
+    The resulting velocity is folded back into speed along each car's heading,
+    and the sideways part becomes a yaw kick on car_angle.
+    """
+    nx, nz = normal
+    inv_a = 1.0 / a.mass
+    inv_b = 1.0 / b.mass
+    inv_total = inv_a + inv_b
+
+    # Positional correction so the boxes stop overlapping
+    a.pos[0] -= nx * depth * inv_a / inv_total
+    a.pos[1] -= nz * depth * inv_a / inv_total
+    b.pos[0] += nx * depth * inv_b / inv_total
+    b.pos[1] += nz * depth * inv_b / inv_total
+
+    vax, vaz = a.velocity()
+    vbx, vbz = b.velocity()
+    closing = (vbx - vax) * nx + (vbz - vaz) * nz
+    if closing >= 0:
+        return  # Already separating
+
+    j = -(1 + restitution) * closing / inv_total
+    vax -= nx * j * inv_a
+    vaz -= nz * j * inv_a
+    vbx += nx * j * inv_b
+    vbz += nz * j * inv_b
+
+    for body, vx, vz in ((a, vax, vaz), (b, vbx, vbz)):
+        (rx, rz), (fx, fz) = body.axes()
+        body.speed = vx * fx + vz * fz
+        lateral = vx * rx + vz * rz
+        body.angle -= lateral * spin
+
+
+def resolve_collisions(bodies, restitution=0.3):
+    """Run broad and narrow phase over all bodies and respond to every contact.
+
+    Returns the list of colliding index pairs.
+    """
+    contacts = []
+    for i, j in sweep_and_prune(bodies):
+        hit = obb_overlap(bodies[i], bodies[j])
+        if hit is None:
+            continue
+        depth, normal = hit
+        apply_impulse(bodies[i], bodies[j], depth, normal, restitution)
+        contacts.append((i, j))
+    return contacts
@@ -13,17 +13,59 @@ import time
 import pygame.freetype
 import pygame.mixer
 import numpy as np
+from collections import namedtuple
 from OBJ import OBJ
 from RoadSegment import RoadSegment
-
-# Initialize Pygame and OpenGL
-pygame.init()
-global font
-font = pygame.freetype.SysFont("Arial", 24)
+from road_mesh import RoadMesh, RoadIndex, centre_line_segments
+from terrain import Terrain
+from track_import import TRACK, load_track
+from collision import CollisionBody, box_extents_from_model, resolve_collisions
+from lod import LODSet
+from impostor import ImpostorAtlas, IMPOSTOR_DISTANCE
+from placement import Scatter, RoadBand
+from static_batch import build_chunked_batches
+from render_queue import RenderQueue, OVERLAY
+from assets import load_sound
+from fonts import get_font
+from frame_timing import FixedStep, FramePacer, PACING, interpolate_pose
+from dynamic_resolution import ResolutionController, SceneTimer, ScaledFramebuffer
+from quality import QualityGovernor, QUALITY_PRESETS, scenery_visible
+from capture import FrameCapture, CAPTURE_KEY, CAPTURE_ON_START
+from profiler import SamplingProfiler, PROFILE_KEY, PROFILE_ON_START
+from telemetry import TelemetryPublisher, TELEMETRY, resolve_path
+from gpu_resources import resources, gen_texture, delete_texture, GPU_REPORT_KEY
+from voices import VoiceManager, PRIORITY_AMBIENT, PRIORITY_TRAFFIC, PRIORITY_ENGINE
+from sim_thread import SnapshotBuffer, SimulationThread, TimingStats, SIM_THREAD
 
 global texture_index
 texture_index = 0
 
+TRAFFIC_COUNT = 4
+TRAFFIC_SPEED = 0.15
+# Traffic engines loop at this fraction of the engine sound's volume, attenuated with distance
+TRAFFIC_ENGINE_VOLUME = 0.5
+# Trees fill a band beside the road; distant ones are cheap billboards
+TREE_ROAD_CLEARANCE = 4.0
+TREE_MAX_DISTANCE = 12.0
+TREE_SPACING = 2.5
+# Fraction of the densest Poisson-disk packing that is actually planted
+TREE_DENSITY = 0.4
+
+# Grass tufts line the road edges and are merged into static batches per track chunk
+GRASS_ROAD_CLEARANCE = 2.3
+GRASS_MAX_DISTANCE = 7.0
+GRASS_SPACING = 0.6
+GRASS_DENSITY = 0.35
+GRASS_SCALE = 0.5
+GRASS_CHUNK_SEGMENTS = 10
+
+# Handling is tuned as per-frame steps at these reference rates; times dt they become per-second rates
+ACCEL_RATE = 15  # acceleration, braking, friction and speed multiplier steps
+MOVE_RATE = 30  # car_speed is distance per 1/30 s
+STEER_RATE = 60  # steering degrees
+# Slow drift of the sun, in degrees per second
+LIGHT_DRIFT = 6.0
+
 def setup_lighting():
     """Configure basic lighting for the scene."""
     glEnable(GL_LIGHTING)
@@ -79,11 +121,11 @@ def draw_ground_tile(center_x, center_z, size=70.0):
 
 
 # -------------------- Game Logic Functions --------------------
-def generate_road():
-    """Generate a random road path with connected segments."""
+def generate_road(count=99):
+    """Generate a random road path of count connected segments."""
     segments = []
     path = [(0, 0)]
-    for i in range(1, 100):
+    for i in range(count):
         last = path[-1]
         angle = random.uniform(-30, 30)
         dist = 6
@@ -96,8 +138,10 @@ def generate_road():
     return segments
 
 def check_on_road(car_pos, road, road_width=2.0):
-    """Check if car is on the road."""
+    """Check if car is on the road; a RoadIndex limits the test to the segments nearby."""
     cx, cz = car_pos
+    if isinstance(road, RoadIndex):
+        road = road.near(car_pos, road_width)
 
     for seg in road:
         x1, z1 = seg.p1
@@ -144,11 +188,11 @@ def draw_text(text, x, y, color=(255, 255, 255)):
     glLoadIdentity()
     
     # Render text to a surface
-    text_surface, rect = font.render(text, color)
+    text_surface, rect = get_font().render(text, color)
     text_data = pygame.image.tostring(text_surface, "RGBA", True)
     
     # Create a texture
-    text_texture = glGenTextures(1)
+    text_texture = gen_texture('HUD text')
     glBindTexture(GL_TEXTURE_2D, text_texture)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
@@ -172,7 +216,7 @@ def draw_text(text, x, y, color=(255, 255, 255)):
     glDisable(GL_BLEND)
     glDisable(GL_TEXTURE_2D)
     glBindTexture(GL_TEXTURE_2D, 0)
-    glDeleteTextures([text_texture])
+    delete_texture(text_texture)
     
     # Restore previous state
     glMatrixMode(GL_PROJECTION)
@@ -190,12 +234,12 @@ def setup_audio():
     
     # Load sound effects
     sounds = {
-        'acceleration': pygame.mixer.Sound('audio/acceleration.mp3'),
-        'brake': pygame.mixer.Sound('audio/brakes.mp3'),
-        'engine': pygame.mixer.Sound('audio/engine.mp3'),
-        'horn': pygame.mixer.Sound('audio/horn.mp3'),
-        'crash': pygame.mixer.Sound('audio/crash.mp3'),
-        'nature': pygame.mixer.Sound('audio/nature.mp3')
+        'acceleration': load_sound('audio/acceleration.mp3'),
+        'brake': load_sound('audio/brakes.mp3'),
+        'engine': load_sound('audio/engine.mp3'),
+        'horn': load_sound('audio/horn.mp3'),
+        'crash': load_sound('audio/crash.mp3'),
+        'nature': load_sound('audio/nature.mp3')
     }
     
     # Set volumes
@@ -236,40 +280,94 @@ def load_models():
     
     return car_model, tree_model, grass1_model, grass2_model
 
-def generate_scenery(road,tree_model):
-    """Generate random scenery (trees and grass) along the road."""
-    scenery = []
-    for seg in road:
-        mid_x = (seg.p1[0] + seg.p2[0]) / 2
-        mid_z = (seg.p1[1] + seg.p2[1]) / 2
-        angle = math.atan2(seg.p2[1] - seg.p1[1], seg.p2[0] - seg.p1[0])
-        
-        tree_count = random.randint(1, 3)
-        
-        # Helper function to place objects along the road
-        def place_objects(model, count, min_dist, max_dist, scale):
-            for _ in range(count):
-                side = random.choice([-1, 1])
-                dist = random.uniform(min_dist, max_dist)
-                dx = math.cos(angle + math.pi / 2) * dist
-                dz = math.sin(angle + math.pi / 2) * dist
-                offset_x = mid_x + dx * side
-                offset_z = mid_z + dz * side
-                scenery.append((model, offset_x, offset_z, scale))
-
-        # Place trees
-        place_objects(tree_model, tree_count, 4, 12, 1.0)
-        
-    return scenery
+def generate_scenery(road, tree_model, scatter=None, drawn=None):
+    """Generate random scenery (trees) along the road, keeping clear of the road and each other.
+
+    Clearances are measured from drawn, the centre line segments the road is
+    drawn along (RoadMesh.segments), which are worked out from road if not given.
+    """
+    if scatter is None:
+        scatter = Scatter()
+    band = RoadBand(drawn or centre_line_segments(road), TREE_ROAD_CLEARANCE, TREE_MAX_DISTANCE)
+    positions = scatter.place(band, TREE_SPACING, density=TREE_DENSITY)
+    return [(tree_model, x, z, 1.0) for x, z in positions]
+
+def generate_grass(road, grass_models, scatter=None, density=GRASS_DENSITY, drawn=None):
+    """Place grass tufts along both road edges, returning (model, x, y, z, scale, angle) instances."""
+    if scatter is None:
+        scatter = Scatter()
+    band = RoadBand(drawn or centre_line_segments(road), GRASS_ROAD_CLEARANCE, GRASS_MAX_DISTANCE)
+    positions = scatter.place(band, GRASS_SPACING, density=density)
+    models = scatter.rng.integers(len(grass_models), size=len(positions))
+    angles = scatter.rng.uniform(0, 360, size=len(positions))
+    return [
+        (grass_models[m], x, -0.01, z, GRASS_SCALE, angle)
+        for (x, z), m, angle in zip(positions, models.tolist(), angles.tolist())
+    ]
 
-def handle_audio(keys, car_speed, moving_forward, moving_backward, 
+def build_grass_batches(road, grass_models, scatter=None, density=GRASS_DENSITY, drawn=None):
+    """Merge the road-side grass into one static batch per GRASS_CHUNK_SEGMENTS segments."""
+    instances = generate_grass(road, grass_models, scatter, density, drawn)
+    return build_chunked_batches(instances, road, GRASS_CHUNK_SEGMENTS)
+
+def generate_traffic(road, extents, count=TRAFFIC_COUNT):
+    """Place AI cars along the road, each heading for the next road point."""
+    traffic = []
+    if count <= 0:
+        return traffic
+    spacing = max(1, (len(road) - 10) // count)
+    for i in range(count):
+        index = min(len(road) - 1, 10 + i * spacing)
+        seg = road[index]
+        angle = math.degrees(math.atan2(seg.p2[0] - seg.p1[0], seg.p2[1] - seg.p1[1]))
+        body = CollisionBody(list(seg.p1), angle, TRAFFIC_SPEED, extents)
+        body.target = index
+        traffic.append(body)
+    return traffic
+
+def update_traffic(traffic, road, dt):
+    """Steer each AI car towards its next road point and move it."""
+    for body in traffic:
+        if body.target >= len(road):
+            body.speed = max(0.0, body.speed - 0.02 * dt * ACCEL_RATE)
+        else:
+            tx, tz = road[body.target].p2
+            if math.dist(body.pos, (tx, tz)) < 2.0:
+                body.target += 1
+            desired = math.degrees(math.atan2(tx - body.pos[0], tz - body.pos[1]))
+            turn = (desired - body.angle + 180) % 360 - 180
+            max_turn = 2.0 * dt * STEER_RATE
+            body.angle += max(-max_turn, min(max_turn, turn))
+
+            # Recover towards cruising speed after being bumped
+            body.speed += (TRAFFIC_SPEED - body.speed) * min(1.0, dt * 2)
+
+        rad = math.radians(body.angle)
+        movement = body.speed * dt * MOVE_RATE
+        body.pos[0] += math.sin(rad) * movement
+        body.pos[1] += math.cos(rad) * movement
+
+def handle_collisions(player_body, car_pos, car_speed, car_angle, traffic):
+    """Collide the player with traffic and feed the response back into the car state."""
+    player_body.pos = car_pos
+    player_body.speed = car_speed
+    player_body.angle = car_angle
+    contacts = resolve_collisions([player_body] + traffic)
+    return player_body.speed, player_body.angle, contacts
+
+def play_car_sound(voices, name, car_pos):
+    """Switch the player's car to another sound; the crash plays once, the rest loop."""
+    voices.play('player', name, car_pos, PRIORITY_ENGINE, loop=name != 'crash')
+    return name
+
+def handle_audio(keys, car_pos, car_speed, moving_forward, moving_backward, 
                  game_over, game_win, currently_playing, horn_playing, 
-                 crash_played, sounds):
+                 crash_played, voices):
     """Handle game audio based on current state."""
     if not (game_over or game_win):
         # Horn sound (non-looping, play once per press)
         if keys[pygame.K_h] and not horn_playing:
-            sounds['horn'].play(0)  # Play once
+            voices.play('horn', position=car_pos)
             horn_playing = True
         elif not keys[pygame.K_h]:
             horn_playing = False
@@ -277,33 +375,31 @@ def handle_audio(keys, car_speed, moving_forward, moving_backward,
         # Car movement sounds (looping)
         if (moving_forward and car_speed > 0) or (moving_backward and car_speed < 0):
             if currently_playing != 'acceleration':
-                sounds[currently_playing].stop()
-                sounds['acceleration'].play(-1)
-                currently_playing = 'acceleration'
+                currently_playing = play_car_sound(voices, 'acceleration', car_pos)
         elif (moving_backward and car_speed > 0) or (moving_forward and car_speed < 0):
             if currently_playing != 'brake':
-                sounds[currently_playing].stop()
-                sounds['brake'].play(-1)
-                currently_playing = 'brake'
+                currently_playing = play_car_sound(voices, 'brake', car_pos)
         elif car_speed == 0 or moving_forward==False or moving_backward==False:
             if currently_playing != 'engine':
-                sounds[currently_playing].stop()
-                sounds['engine'].play(-1)
-                currently_playing = 'engine'
+                currently_playing = play_car_sound(voices, 'engine', car_pos)
     # Game over - play crash sound once
     if game_over and not crash_played:
-        sounds[currently_playing].stop()
-        sounds['crash'].play()
+        currently_playing = play_car_sound(voices, 'crash', car_pos)
         crash_played = True
-        currently_playing = 'crash'
     
-    if game_win:
-        sounds[currently_playing].stop()
-        sounds['engine'].play(-1)
-        currently_playing = 'engine'
+    if game_win and currently_playing != 'engine':
+        currently_playing = play_car_sound(voices, 'engine', car_pos)
         
     return currently_playing, horn_playing, crash_played
 
+def update_voices(voices, camera, car_pos, traffic_poses):
+    """Move the car emitters to where they are drawn and mix them for the camera."""
+    voices.move('player', car_pos)
+    voices.move('horn', car_pos)
+    for i, (pos, _) in enumerate(traffic_poses):
+        voices.move(('traffic', i), pos)
+    voices.update(camera, car_pos)
+
 def update_car_physics(keys, car_speed, car_angle, car_pos, times, max_speed, 
                       acceleration, brake_force, friction, game_over, game_win, dt):
     """Update car physics based on inputs and current state and time elapsed."""
@@ -317,9 +413,9 @@ def update_car_physics(keys, car_speed, car_angle, car_pos, times, max_speed,
     moving_backward = keys[pygame.K_DOWN]
     
     # Scale all physics values by delta time (dt)
-    frame_acceleration = acceleration * dt * 15  # Scale to make it feel similar at 15fps
-    frame_brake_force = brake_force * dt * 15
-    frame_friction = friction * dt * 15
+    frame_acceleration = acceleration * dt * ACCEL_RATE
+    frame_brake_force = brake_force * dt * ACCEL_RATE
+    frame_friction = friction * dt * ACCEL_RATE
     
     # Acceleration & Braking
     if moving_forward:
@@ -347,20 +443,20 @@ def update_car_physics(keys, car_speed, car_angle, car_pos, times, max_speed,
 
     # Adjust speed multiplier - scale by dt to make consistent at any frame rate
     if keys[pygame.K_r] and times < 4.9:
-        times += 0.1 * dt * 15
+        times += 0.1 * dt * ACCEL_RATE
         max_speed = 0.5 * times
         acceleration = 0.1 * times
         brake_force = 0.05 * times
         friction = 0.02 * times
     if keys[pygame.K_f] and times > 0.51:
-        times -= 0.1 * dt * 15
+        times -= 0.1 * dt * ACCEL_RATE
         max_speed = 0.5 * times
         acceleration = 0.1 * times
         brake_force = 0.05 * times
         friction = 0.02 * times
 
     # Steering - scale rotation by dt
-    steering_speed = 1.0 * dt * 60  # Base steering speed
+    steering_speed = 1.0 * dt * STEER_RATE  # Base steering speed
     if car_speed != 0:
         if keys[pygame.K_LEFT]:
             car_angle += (steering_speed * times * car_speed / max_speed * 0.7)
@@ -369,7 +465,7 @@ def update_car_physics(keys, car_speed, car_angle, car_pos, times, max_speed,
 
     # Move car - actual movement scaled by dt
     rad = math.radians(car_angle)
-    movement = car_speed * dt * 30  # Scale movement by dt
+    movement = car_speed * dt * MOVE_RATE  # Scale movement by dt
     car_pos[0] += math.sin(rad) * movement
     car_pos[1] += math.cos(rad) * movement
     
@@ -397,8 +493,8 @@ def update_camera(keys, car_pos, car_angle):
 
 def update_lighting(keys, light_angle, dt):
     """Update the light position based on user input and time elapsed."""
-    rotation_speed = 2.0 * dt * 60  # Scale by dt
-    light_angle += 0.1
+    rotation_speed = 2.0 * dt * STEER_RATE  # Scale by dt
+    light_angle = (light_angle + LIGHT_DRIFT * dt) % 360.0
     if keys[pygame.K_q]:
         light_angle = (light_angle + rotation_speed) % 360.0
     if keys[pygame.K_e]:
@@ -426,59 +522,97 @@ def draw_sun(light_x, light_height, light_z):
     glEnable(GL_LIGHTING)
     glPopMatrix()
 
-def draw_road_and_scenery(road, scenery):
-    """Draw the road, grass, and scenery objects."""
+def draw_road(road_mesh):
+    """Draw the ground tiles, road and grass strips."""
     # Ground start and end
-    draw_ground_tile(*road[0].p1)
-    draw_ground_tile(*road[-1].p2)
+    draw_ground_tile(*road_mesh.start)
+    draw_ground_tile(*road_mesh.end)
 
     # Draw road and grass
-    for i, seg in enumerate(road):
-        seg.draw()
-        seg.draw_grass_strip()
-        if i < len(road) - 1:
-            seg.draw_connection(road[i + 1])
-            seg.draw_grass_connection(road[i + 1])
+    road_mesh.render()
+
+def draw_road_and_scenery(queue, road_mesh, scenery, camera=None, impostors=None, grass_batches=(), quality=None):
+    """Submit the road, grass, and scenery objects to the render queue.
+
+    Models listed in impostors are drawn as one billboard batch beyond IMPOSTOR_DISTANCE.
+    quality is a preset from quality.QUALITY_PRESETS and defaults to the highest.
+    """
+    quality = quality or QUALITY_PRESETS[0]
+    queue.submit_draw(lambda: draw_road(road_mesh))
 
     # Draw trees and grass
-    for model, x, z, scale in scenery:
-        glPushMatrix()
-        glTranslatef(x, 0, z)
-        glScalef(0.2, 0.2, 0.2)
-        model.render()
-        glPopMatrix()
-
-def draw_car(car_pos, car_angle, car_model):
-    """Draw the car at its current position and rotation."""
-    glPushMatrix()
-    glTranslatef(car_pos[0], 0.0, car_pos[1])
-    glRotatef(car_angle, 0, 1, 0)
-    glScalef(1, 1, 1)
-    car_model.render()
-    glPopMatrix()
+    for batch in grass_batches:
+        if camera is not None:
+            distance = math.hypot(batch.center[0] - camera[0], batch.center[1] - camera[1])
+            if distance - batch.radius > quality['grass_distance']:
+                continue
+        queue.submit_batch(batch)
+
+    far = {}
+    for i, (model, x, z, scale) in enumerate(scenery):
+        if not scenery_visible(i, quality['scenery_density']):
+            continue
+        if camera is not None:
+            distance = math.hypot(x - camera[0], z - camera[1])
+            if distance > quality['draw_distance']:
+                continue
+            if impostors and model in impostors and distance > IMPOSTOR_DISTANCE:
+                # Without impostors distant trees are dropped rather than drawn as meshes
+                if quality['impostors']:
+                    far.setdefault(model, []).append((x, z, 0.2))
+                continue
+            if isinstance(model, LODSet):
+                model = model.select(i, distance)
+        queue.submit_model(model, x, 0, z, scale=0.2)
+
+    for model, instances in far.items():
+        xs, zs, scales = zip(*instances)
+        queue.submit_draw(lambda atlas=impostors[model], xs=xs, zs=zs, scales=scales: atlas.draw(xs, zs, scales, camera))
+
+def set_draw_distance(display, draw_distance):
+    """Move the far clipping plane."""
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    gluPerspective(45, display[0] / display[1], 0.1, draw_distance)
+    glMatrixMode(GL_MODELVIEW)
+
+def draw_car(queue, car_pos, car_angle, car_model):
+    """Submit the car at its current position and rotation."""
+    queue.submit_model(car_model, car_pos[0], 0.0, car_pos[1], car_angle)
+
+def draw_traffic(queue, poses, car_lods, camera):
+    """Submit every AI car ([x, z], angle) pose at a detail level chosen by camera distance."""
+    for i, (pos, angle) in enumerate(poses):
+        distance = math.hypot(pos[0] - camera[0], pos[1] - camera[1])
+        draw_car(queue, pos, angle, car_lods.select(i, distance))
+
+def draw_hud(queue, best_time, car_speed, times, start_time, game_over, game_win, elapsed_time, render_scale=1.0):
+    """Submit the heads-up display with game information as overlay items."""
+    def text(*args):
+        queue.submit_draw(lambda: draw_text(*args), OVERLAY)
 
-def draw_hud(best_time, car_speed, times, start_time, game_over, game_win, elapsed_time):
-    """Draw the heads-up display with game information."""
     # Draw best time    
-    draw_text(f"Best Time: {best_time:.2f}s", 10, 10, (255, 255, 255))
+    text(f"Best Time: {best_time:.2f}s", 10, 10, (255, 255, 255))
     # Draw car speed
     current_speed = car_speed * 100
-    draw_text(f"Speed: {int(current_speed)}", 10, 40, (255, 255, 255))
+    text(f"Speed: {int(current_speed)}", 10, 40, (255, 255, 255))
     # Draw times speed
-    draw_text(f"Times: {times:.1f}", 10, 70, (255, 255, 255))
+    text(f"Times: {times:.1f}", 10, 70, (255, 255, 255))
+    # Draw the dynamic resolution scale
+    text(f"Render scale: {render_scale * 100:.0f}%", 10, 100, (255, 255, 0))
 
     if start_time and not game_over and not game_win:
         elapsed = float(time.time() - start_time)
-        draw_text(f"Time: {elapsed:.2f}s", 10, 740, (255, 255, 255))
+        text(f"Time: {elapsed:.2f}s", 10, 740, (255, 255, 255))
 
     if game_over:
-        draw_text("GAME OVER", 400, 420, (255, 0, 0))  # Centered, red
-        draw_text("Press ENTER to Restart", 350, 370, (255, 255, 255))
+        text("GAME OVER", 400, 420, (255, 0, 0))  # Centered, red
+        text("Press ENTER to Restart", 350, 370, (255, 255, 255))
 
     if game_win:
         elapsed = float(elapsed_time)
-        draw_text(f"YOU WIN! Time: {elapsed:.2f}s", 350, 420, (0, 255, 0))  # Centered, green
-        draw_text("Press ENTER to Restart", 350, 370, (255, 255, 255))
+        text(f"YOU WIN! Time: {elapsed:.2f}s", 350, 420, (0, 255, 0))  # Centered, green
+        text("Press ENTER to Restart", 350, 370, (255, 255, 255))
 
 def check_game_status(car_pos, road, start_time, game_over, game_win, elapsed_time):
     """Check if the game has been won or lost."""
@@ -496,37 +630,22 @@ def check_game_status(car_pos, road, start_time, game_over, game_win, elapsed_ti
         
     return game_over, game_win, elapsed_time
 
-def handle_events(keys, start_time):
+def handle_events(capture=None, profiler=None):
     """Handle pygame events and check for game exit."""
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            if capture:
+                capture.stop()
+            if profiler:
+                profiler.stop()
             pygame.quit()
             sys.exit()
-            
-    # Start the timer when any movement key is pressed
-    if start_time is None and (keys[pygame.K_UP] or keys[pygame.K_DOWN] or 
-                              keys[pygame.K_LEFT] or keys[pygame.K_RIGHT]):
-        start_time = time.time()
-        
-    return start_time
-
-def handle_restart(keys, game_over, game_win, road, sounds, currently_playing, crash_played):
-    """Handle game restart if needed."""
-    if (game_over or game_win) and keys[pygame.K_RETURN]:
-        # Reset game
-        car_pos = list(road[0].p2)
-        car_speed = 0.0
-        car_angle = 0.0
-        start_time = None
-        game_over = False
-        game_win = False
-        sounds[currently_playing].stop()
-        sounds['engine'].play(-1)
-        currently_playing = 'engine'
-        crash_played = False
-        return True, car_pos, car_speed, car_angle, start_time, game_over, game_win, currently_playing, crash_played
-    
-    return False, None, None, None, None, game_over, game_win, currently_playing, crash_played
+        elif event.type == pygame.KEYDOWN and event.key == CAPTURE_KEY and capture:
+            capture.toggle('driving')
+        elif event.type == pygame.KEYDOWN and event.key == PROFILE_KEY and profiler:
+            profiler.toggle('driving')
+        elif event.type == pygame.KEYDOWN and event.key == GPU_REPORT_KEY:
+            resources.report()
 
 def update_best_time(best_time, game_win, elapsed_time):
     """Update the best time if appropriate."""
@@ -535,113 +654,281 @@ def update_best_time(best_time, game_win, elapsed_time):
             return elapsed_time
     return best_time
 
-def run_driving_game(display, Texture_index):
-    from OpenGL.GLUT import glutInit
-    glutInit()
+SimSnapshot = namedtuple('SimSnapshot', [
+    'tick', 'tick_time', 'input_time', 'car_pos', 'car_angle', 'previous_car', 'traffic', 'previous_traffic',
+    'car_speed', 'times', 'light_angle', 'start_time', 'elapsed_time', 'best_time', 'game_over', 'game_win',
+    'moving_forward', 'moving_backward', 'restarts',
+])
+
+class DrivingSimulation:
+    """Game state advanced by the fixed physics tick, on the render thread or its own.
+
+    Keys come in as (keys, sample time) through inputs; after every tick an
+    immutable SimSnapshot with the last two poses of every car goes out
+    through snapshots, which is all the renderer reads.
+    """
+
+    def __init__(self, road, track, car_extents, inputs, telemetry=None):
+        self.road = road
+        self.track = RoadIndex(track)
+        self.car_extents = car_extents
+        self.inputs = inputs
+        self.telemetry = telemetry
+        # Timings of the last finished frame, set by the render loop for telemetry
+        self.frame_info = (0.0, 0.0, None, 0.0, 1.0, 0)
+        self.times = 1
+        self.max_speed = 0.5 * self.times
+        self.acceleration = 0.1
+        self.brake_force = 0.05
+        self.friction = 0.02
+        self.elapsed_time = 0
+        self.light_angle = 0
+        self.best_time = 0
+        self.moving_forward = self.moving_backward = False
+        self.tick_count = 0
+        self.restarts = 0
+        self.input_time = inputs.latest()[1]
+        self.restart()
+        self.player_body = CollisionBody(self.car_pos, self.car_angle, self.car_speed, car_extents)
+        self.snapshots = SnapshotBuffer(self.snapshot(self.input_time))
+
+    def restart(self):
+        self.car_pos = list(self.road[0].p2)
+        self.car_speed = 0.0
+        self.car_angle = 0.0
+        self.start_time = None
+        self.game_over = False
+        self.game_win = False
+        self.traffic = generate_traffic(self.road, self.car_extents)
+        self.previous_car = (tuple(self.car_pos), self.car_angle)
+        self.previous_traffic = tuple((tuple(body.pos), body.angle) for body in self.traffic)
+
+    def snapshot(self, tick_time):
+        return SimSnapshot(
+            self.tick_count, tick_time, self.input_time, tuple(self.car_pos), self.car_angle, self.previous_car,
+            tuple((tuple(body.pos), body.angle) for body in self.traffic), self.previous_traffic,
+            self.car_speed, self.times, self.light_angle, self.start_time, self.elapsed_time, self.best_time,
+            self.game_over, self.game_win, self.moving_forward, self.moving_backward, self.restarts,
+        )
+
+    def tick(self, dt):
+        keys, self.input_time = self.inputs.latest()
+        if (self.game_over or self.game_win) and keys[pygame.K_RETURN]:
+            self.restart()
+            self.restarts += 1
+
+        # Start the timer when any movement key is pressed
+        if self.start_time is None and (keys[pygame.K_UP] or keys[pygame.K_DOWN] or
+                                        keys[pygame.K_LEFT] or keys[pygame.K_RIGHT]):
+            self.start_time = time.time()
+
+        self.previous_car = (tuple(self.car_pos), self.car_angle)
+        self.previous_traffic = tuple((tuple(body.pos), body.angle) for body in self.traffic)
+
+        (self.car_speed, self.car_angle, self.car_pos, self.times, self.max_speed, self.acceleration,
+         self.brake_force, self.friction, self.moving_forward, self.moving_backward) = update_car_physics(
+            keys, self.car_speed, self.car_angle, self.car_pos, self.times, self.max_speed,
+            self.acceleration, self.brake_force, self.friction, self.game_over, self.game_win, dt)
+
+        # Move traffic and resolve car-to-car contacts
+        update_traffic(self.traffic, self.road, dt)
+        self.car_speed, self.car_angle, contacts = handle_collisions(
+            self.player_body, self.car_pos, self.car_speed, self.car_angle, self.traffic)
+
+        # Check game status (win/lose)
+        self.game_over, self.game_win, self.elapsed_time = check_game_status(
+            self.car_pos, self.track, self.start_time, self.game_over, self.game_win, self.elapsed_time)
+
+        # Update best time if needed
+        self.best_time = update_best_time(self.best_time, self.game_win, self.elapsed_time)
+
+        self.light_angle = update_lighting(keys, self.light_angle, dt)
+        self.tick_count += 1
+
+        if self.telemetry:
+            frame_ms, work_ms, scene_ms, fps, render_scale, quality = self.frame_info
+            self.telemetry.publish(self.car_pos, self.car_angle, self.car_speed, self.times, self.light_angle,
+                                   self.elapsed_time, frame_ms, work_ms, scene_ms, fps, render_scale,
+                                   self.game_over, self.game_win, quality)
+        self.snapshots.publish(self.snapshot(time.perf_counter()))
+
+def run_driving_game(display, Texture_index, pacing=None, threaded=None):
     global texture_index
     texture_index = Texture_index
+    pacer = FramePacer(pacing or PACING)
+    pacer.setup(display)
+    resources.enter('driving')
 
     # Setup game components
     car_model, tree_model, grass1_model, grass2_model = load_models()
-    road = generate_road()
-    scenery = generate_scenery(road, tree_model)
-    sounds = setup_audio()
+    road = load_track(TRACK) if TRACK else generate_road()
+    road_mesh = RoadMesh(road)
+    terrain = Terrain(road_mesh.segments, road_mesh.start, road_mesh.end)
+    tree_lods = LODSet(tree_model)
+    car_lods = LODSet(car_model)
+    impostors = {tree_lods: ImpostorAtlas(tree_model)}
+    scatter = Scatter()
+    # Trees and grass keep clear of the spline the road is drawn along, not of its control polyline
+    scenery = generate_scenery(road, tree_lods, scatter, road_mesh.segments)
+    grass_batches = build_grass_batches(road, [grass1_model, grass2_model], scatter, drawn=road_mesh.segments)
+    car_extents = box_extents_from_model(car_model)
+    voices = VoiceManager(setup_audio())
+
+    # Game state lives in the simulation; the loop below only reads its snapshots
+    threaded = SIM_THREAD if threaded is None else threaded
+    inputs = SnapshotBuffer((pygame.key.get_pressed(), time.perf_counter()))
+    telemetry = TelemetryPublisher(resolve_path(TELEMETRY)) if TELEMETRY else None
+    sim = DrivingSimulation(road, road_mesh.segments, car_extents, inputs, telemetry)
+    timing = TimingStats('threaded' if threaded else 'single-threaded')
     
     # Start ambient nature sound
-    sounds['nature'].play(-1)
+    voices.play('nature', priority=PRIORITY_AMBIENT, loop=True)
+    for i, body in enumerate(sim.traffic):
+        voices.play(('traffic', i), 'engine', body.pos, PRIORITY_TRAFFIC, loop=True, volume=TRAFFIC_ENGINE_VOLUME)
     
-    # Game state initialization
-    clock = pygame.time.Clock()
-    car_pos = list(road[0].p2)
-    car_speed = 0.0
-    car_angle = 0.0
-    currently_playing = 'engine'
-    sounds['engine'].play(-1)
+    currently_playing = play_car_sound(voices, 'engine', sim.car_pos)
     horn_playing = False
     crash_played = False
-    times = 1
-    max_speed = 0.5 * times
-    acceleration = 0.1
-    brake_force = 0.05
-    friction = 0.02
-    start_time = None
-    elapsed_time = 0
-    light_angle = 0
-    best_time = 0
-    game_over = False
-    game_win = False
-    last_time = time.time()
+    restarts = 0
+    queue = RenderQueue()
+    step = FixedStep()
+    resolution = ResolutionController()
+    framebuffer = ScaledFramebuffer(display, resolution.max_scale)
+    scene_timer = SceneTimer()
+    governor = QualityGovernor('driving', resolution=resolution)
+    set_draw_distance(display, governor.preset['draw_distance'])
+    # Everything in view at the start is built up front, the rest streams in while driving
+    terrain.update(sim.car_pos, governor.preset['draw_distance'], budget=None)
+    capture = FrameCapture(display)
+    if CAPTURE_ON_START:
+        capture.start('driving')
+    profiler = SamplingProfiler()
+    if PROFILE_ON_START:
+        profiler.start('driving')
+    frame_ms = work_ms = 0.0
+    scene_ms = None
+    last_frame_start = time.perf_counter()
+    sim_thread = None
+    if threaded:
+        sim_thread = SimulationThread(sim.tick, timing)
+        sim_thread.start()
 
     # Main game loop
     while True:
-        # Time tracking - calculate real delta time between frames
-        current_time = time.time()
-        dt = current_time - last_time
-        last_time = current_time
-        
-        # Cap dt to avoid physics issues on very slow frames
-        dt = min(dt, 0.1)
+        frame_start = time.perf_counter()
+        frame_ms = (frame_start - last_frame_start) * 1000
+        last_frame_start = frame_start
+        profiler.phase('events')
+        fps = pacer.fps()
+        stats = queue.stats
+        pygame.display.set_caption(f"3D Car Driving Game - FPS: {int(fps)} ({pacer.mode}) - "
+                                   f"GL state changes: {stats['state_changes']} "
+                                   f"(saved {stats['saved']} of {stats['naive_state_changes']})")
         
-        fps = clock.get_fps()
-        pygame.display.set_caption(f"3D Car Driving Game - FPS: {int(fps)}")
-        
-        # Get keyboard input
+        # Get keyboard input and hand it to the simulation
         keys = pygame.key.get_pressed()
+        inputs.publish((keys, time.perf_counter()))
+        handle_events(capture, profiler)
+        sim.frame_info = (frame_ms, work_ms, scene_ms, fps, resolution.scale, governor.level)
+
+        # Run as many fixed physics ticks as the elapsed time calls for, unless the simulation thread does
+        profiler.phase('physics')
+        if sim_thread:
+            sim_thread.check()
+        else:
+            for _ in range(step.advance()):
+                timing.tick(time.perf_counter())
+                sim.tick(step.dt)
+        snap = sim.snapshots.latest()
+        alpha = min(1.0, (time.perf_counter() - snap.tick_time) / step.dt) if sim_thread else step.alpha
+
+        if snap.restarts != restarts:
+            restarts = snap.restarts
+            currently_playing = play_car_sound(voices, 'engine', snap.car_pos)
+            crash_played = False
         
-        # Handle events and possible restart
-        start_time = handle_events(keys, start_time)
-        restart, new_car_pos, new_car_speed, new_car_angle, new_start_time, game_over, game_win, currently_playing, crash_played = (
-            handle_restart(keys, game_over, game_win, road, sounds, currently_playing, crash_played)
-        )
-        
-        if restart:
-            car_pos, car_speed, car_angle, start_time = new_car_pos, new_car_speed, new_car_angle, new_start_time
-            
-        # Update car physics - now passing dt
-        car_speed, car_angle, car_pos, times, max_speed, acceleration, brake_force, friction, moving_forward, moving_backward = (
-            update_car_physics(keys, car_speed, car_angle, car_pos, times, max_speed, 
-                              acceleration, brake_force, friction, game_over, game_win, dt)
-        )
-        
-        # Check game status (win/lose)
-        game_over, game_win, elapsed_time = check_game_status(
-            car_pos, road, start_time, game_over, game_win, elapsed_time
-        )
-        
-        # Update best time if needed
-        best_time = update_best_time(best_time, game_win, elapsed_time)
-        
-        # Handle audio
+        # Render between the last two ticks so motion stays smooth at any refresh rate
+        draw_pos, draw_angle = interpolate_pose(snap.previous_car, (snap.car_pos, snap.car_angle), alpha)
+        traffic_poses = [
+            interpolate_pose(previous, current, alpha)
+            for previous, current in zip(snap.previous_traffic, snap.traffic)
+        ]
+        cam_x, cam_z = update_camera(keys, draw_pos, draw_angle)
+
+        # Handle audio, mixed for where the camera is this frame
+        profiler.phase('audio')
         currently_playing, horn_playing, crash_played = handle_audio(
-            keys, car_speed, moving_forward, moving_backward, 
-            game_over, game_win, currently_playing, horn_playing, 
-            crash_played, sounds
+            keys, snap.car_pos, snap.car_speed, snap.moving_forward, snap.moving_backward, 
+            snap.game_over, snap.game_win, currently_playing, horn_playing, 
+            crash_played, voices
         )
-        
-        # Start rendering
+        update_voices(voices, (cam_x, cam_z), draw_pos, traffic_poses)
+
+        # Start rendering the scene, offscreen when it runs below full resolution
+        profiler.phase('scene')
+        terrain.update((cam_x, cam_z), governor.preset['draw_distance'])
+        scene_timer.begin()
+        framebuffer.begin(resolution.scale)
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         glLoadIdentity()
         
-        # Update camera
-        cam_x, cam_z = update_camera(keys, car_pos, car_angle)
-        gluLookAt(cam_x, 4, cam_z, car_pos[0], 0, car_pos[1], 0, 1, 0)
+        # Camera
+        gluLookAt(cam_x, 4, cam_z, draw_pos[0], 0, draw_pos[1], 0, 1, 0)
         
-        # Update lighting - now passing dt
-        light_angle = update_lighting(keys, light_angle, dt)
-        light_x, light_height, light_z = calculate_light_position(light_angle)
+        light_x, light_height, light_z = calculate_light_position(snap.light_angle)
         glLightfv(GL_LIGHT0, GL_POSITION, [light_x, light_height, light_z, 1])
         
         # Draw scene elements
-        draw_sun(light_x, light_height, light_z)
-        draw_road_and_scenery(road, scenery)
-        draw_car(car_pos, car_angle, car_model)
-        draw_hud(best_time, car_speed, times, start_time, game_over, game_win, elapsed_time)
+        queue.begin((cam_x, 4, cam_z))
+        queue.submit_draw(lambda: draw_sun(light_x, light_height, light_z))
+        queue.submit_draw(lambda: terrain.render((cam_x, cam_z), draw_pos, governor.preset['draw_distance']))
+        draw_road_and_scenery(queue, road_mesh, scenery, (cam_x, cam_z), impostors, grass_batches, governor.preset)
+        draw_car(queue, draw_pos, draw_angle, car_model)
+        draw_traffic(queue, traffic_poses, car_lods, (cam_x, cam_z))
+        queue.flush()
+        framebuffer.end()
+
+        # Adjust the scale from the scene's GPU time, or without timer queries from the last frame's
+        # CPU work; the frame time would include the wait in flip() and always read as over budget
+        scene_ms = scene_timer.end()
+        if scene_ms is None and not scene_timer.queries:
+            scene_ms = work_ms
+        if scene_ms is not None:
+            resolution.update(scene_ms)
+
+        # HUD at native resolution over the upscaled scene
+        profiler.phase('hud')
+        draw_hud(queue, snap.best_time, snap.car_speed, snap.times, snap.start_time, snap.game_over, snap.game_win,
+                 snap.elapsed_time, framebuffer.scale)
+        queue.flush()
 
         if keys[pygame.K_ESCAPE]:
+            if sim_thread:
+                sim_thread.stop()
+            timing.report()
+            terrain.report()
+            capture.stop()
+            profiler.stop()
+            if telemetry:
+                telemetry.close()
+            framebuffer.delete()
+            scene_timer.delete()
+            for gpu_object in [road_mesh, terrain, tree_lods, car_lods, *impostors.values(), *grass_batches,
+                               car_model, tree_model, grass1_model, grass2_model]:
+                gpu_object.delete()
+            resources.leave('driving')
+            voices.stop_all()
             return
+
+        # CPU work of this frame, or the GPU's share of it when that is larger
+        work_ms = (time.perf_counter() - frame_start) * 1000
+        if governor.update(max(work_ms, scene_ms or 0.0)):
+            set_draw_distance(display, governor.preset['draw_distance'])
         
         # Swap buffers
+        profiler.phase('present')
+        capture.capture()
         pygame.display.flip()
-        
-        # Frame rate control - just for display, doesn't affect physics now
-        clock.tick(60)
+        timing.presented(snap.input_time, time.perf_counter())
+        pacer.wait()
+        profiler.frame()
@@ -0,0 +1,155 @@
+import math
+from OpenGL.GL import *
+from OpenGL.error import GLError
+from gpu_resources import (gen_queries, delete_queries, gen_renderbuffer, delete_renderbuffers,
+                           gen_framebuffer, delete_framebuffer)
+
+# The 3D scene renders at between these fractions of the window size
+RESOLUTION_MIN_SCALE = 0.5
+RESOLUTION_MAX_SCALE = 1.0
+RESOLUTION_STEP = 0.05
+# Scene render time the controller aims for, leaving room for the HUD and swap at 60 fps
+RESOLUTION_TARGET_MS = 14.0
+# Frames to wait after a change so the average reflects the new scale
+RESOLUTION_COOLDOWN = 20
+
+
+class ResolutionController:
+    """Picks a render scale that keeps the smoothed scene time near a target.
+
+    Pixel cost grows with the square of the scale, so over budget it jumps
+    straight to the scale that should fit; under budget it creeps back up one
+    step at a time.
+    """
+
+    def __init__(self, target_ms=RESOLUTION_TARGET_MS, min_scale=RESOLUTION_MIN_SCALE,
+                 max_scale=RESOLUTION_MAX_SCALE, step=RESOLUTION_STEP):
+        self.target_ms = target_ms
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.step = step
+        self.scale = max_scale
+        self.average_ms = None
+        self.cooldown = RESOLUTION_COOLDOWN
+
+    def update(self, frame_ms):
+        """Feed one frame's scene time in milliseconds and return the scale for the next frame."""
+        if self.average_ms is None:
+            self.average_ms = frame_ms
+        self.average_ms += (frame_ms - self.average_ms) * 0.1
+        if self.cooldown > 0:
+            self.cooldown -= 1
+            return self.scale
+
+        scale = self.scale
+        if self.average_ms > self.target_ms * 1.05:
+            scale = math.floor(scale * math.sqrt(self.target_ms / self.average_ms) / self.step) * self.step
+        elif self.average_ms < self.target_ms * 0.8:
+            scale += self.step
+        scale = round(max(self.min_scale, min(self.max_scale, scale)), 4)
+
+        if scale != self.scale:
+            self.scale = scale
+            self.cooldown = RESOLUTION_COOLDOWN
+            # Times measured at the old scale say little about the new one
+            self.average_ms = None
+        return self.scale
+
+
+class SceneTimer:
+    """GPU time of the scene pass via GL_TIME_ELAPSED queries, read a few frames late to avoid stalls.
+
+    Falls back to reporting nothing when timer queries are unavailable. Query
+    objects exist on any GL 1.5 context, so support for GL_TIME_ELAPSED
+    (ARB_timer_query or GL 3.3) is checked with one trial query up front
+    rather than failing inside the frame loop.
+    """
+
+    def __init__(self, depth=3):
+        try:
+            self.queries = gen_queries(depth, 'scene timer')
+        except Exception:
+            self.queries = []
+        if self.queries:
+            try:
+                glBeginQuery(GL_TIME_ELAPSED, self.queries[0])
+                glEndQuery(GL_TIME_ELAPSED)
+            except GLError:
+                self.delete()
+        self.frame = 0
+
+    def begin(self):
+        if self.queries:
+            glBeginQuery(GL_TIME_ELAPSED, self.queries[self.frame % len(self.queries)])
+
+    def end(self):
+        """Close this frame's query and return the scene time of the oldest one in ms, or None."""
+        if not self.queries:
+            return None
+        glEndQuery(GL_TIME_ELAPSED)
+        self.frame += 1
+        if self.frame < len(self.queries):
+            return None
+        oldest = self.queries[self.frame % len(self.queries)]
+        # 32-bit result is enough: it wraps only after 4 s of GPU time
+        return glGetQueryObjectuiv(oldest, GL_QUERY_RESULT) / 1e6
+
+    def delete(self):
+        if self.queries:
+            delete_queries(self.queries)
+        self.queries = []
+
+
+class ScaledFramebuffer:
+    """Offscreen colour and depth buffer the scene renders into at a fraction of the window size.
+
+    end() upscales the rendered region to the window with a linear blit. At
+    full scale the FBO is skipped and the scene draws straight to the window.
+    """
+
+    def __init__(self, display, max_scale=RESOLUTION_MAX_SCALE):
+        self.display = display
+        self.width = int(display[0] * max_scale)
+        self.height = int(display[1] * max_scale)
+        self.scale = max_scale
+        self.active = False
+
+        self.color_buffer = gen_renderbuffer(self.width * self.height * 4, 'scaled colour')
+        glBindRenderbuffer(GL_RENDERBUFFER, self.color_buffer)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, self.width, self.height)
+        self.depth_buffer = gen_renderbuffer(self.width * self.height * 4, 'scaled depth')
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depth_buffer)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, self.width, self.height)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+
+        self.framebuffer = gen_framebuffer('scaled scene')
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.color_buffer)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, self.depth_buffer)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+
+    def scaled_size(self):
+        return max(1, int(self.display[0] * self.scale)), max(1, int(self.display[1] * self.scale))
+
+    def begin(self, scale):
+        """Direct scene rendering into the scaled buffer."""
+        self.scale = scale
+        self.active = scale < 1.0
+        if self.active:
+            glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+            glViewport(0, 0, *self.scaled_size())
+
+    def end(self):
+        """Upscale the scene to the window and leave the window bound at native size for the HUD."""
+        if self.active:
+            width, height = self.scaled_size()
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, self.framebuffer)
+            glBindFramebuffer(GL_DRAW_FRAMEBUFFER, 0)
+            glBlitFramebuffer(0, 0, width, height, 0, 0, self.display[0], self.display[1],
+                              GL_COLOR_BUFFER_BIT, GL_LINEAR)
+            glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glViewport(0, 0, *self.display)
+
+    def delete(self):
+        delete_framebuffer(self.framebuffer)
+        delete_renderbuffers([self.color_buffer, self.depth_buffer])
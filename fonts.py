@@ -0,0 +1,44 @@
+import json
+import os
+import pygame.freetype
+from assets import ASSET_ROOT
+
+# Resolved system font paths, so later runs skip the system font scan
+FONT_CACHE = os.path.join(ASSET_ROOT, '.font_cache.json')
+
+_fonts = {}
+
+
+def _load_cache():
+    try:
+        with open(FONT_CACHE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def resolve_font(name):
+    """Path of a system font by name, or None for pygame's default font."""
+    cache = _load_cache()
+    if name in cache and (cache[name] is None or os.path.exists(cache[name])):
+        return cache[name]
+    # match_font scans every installed font the first time it is called
+    import pygame.sysfont
+    path = pygame.sysfont.match_font(name)
+    cache[name] = path
+    try:
+        with open(FONT_CACHE, 'w') as f:
+            json.dump(cache, f)
+    except OSError as e:
+        print(f"Failed to write font cache: {e}")
+    return path
+
+
+def get_font(name="Arial", size=24):
+    """Shared freetype font, initializing the font module on first use."""
+    key = (name, size)
+    if key not in _fonts:
+        if not pygame.freetype.get_init():
+            pygame.freetype.init()
+        _fonts[key] = pygame.freetype.Font(resolve_font(name), size)
+    return _fonts[key]
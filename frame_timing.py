@@ -0,0 +1,82 @@
+import os
+import time
+import pygame
+from pygame.locals import *
+
+# Physics runs at this fixed rate whatever the display does
+PHYSICS_HZ = 60
+# Longer frames (window drags, loading hitches) are clamped so the simulation never spirals
+MAX_FRAME_TIME = 0.25
+
+# 'vsync' waits for the display, 'capped' sleeps to FRAME_CAP, 'uncapped' renders flat out
+PACING_MODES = ('vsync', 'capped', 'uncapped')
+PACING = os.environ.get('DRIVING_PACING', 'vsync')
+FRAME_CAP = 60
+
+
+class FixedStep:
+    """Accumulator that turns variable frame times into whole fixed-length physics ticks."""
+
+    def __init__(self, hz=PHYSICS_HZ, max_frame_time=MAX_FRAME_TIME):
+        self.dt = 1.0 / hz
+        self.max_frame_time = max_frame_time
+        self.accumulator = 0.0
+        self.last = time.perf_counter()
+
+    def advance(self):
+        """Add the time since the last call and return how many ticks are due."""
+        now = time.perf_counter()
+        self.accumulator += min(now - self.last, self.max_frame_time)
+        self.last = now
+        ticks = int(self.accumulator / self.dt)
+        self.accumulator -= ticks * self.dt
+        return ticks
+
+    @property
+    def alpha(self):
+        """How far the displayed frame lies between the previous tick and the latest one (0..1)."""
+        return self.accumulator / self.dt
+
+
+def lerp(a, b, t):
+    return a + (b - a) * t
+
+
+def lerp_angle(a, b, t):
+    """Interpolate between two angles in degrees along the shorter way round."""
+    return a + ((b - a + 180.0) % 360.0 - 180.0) * t
+
+
+def interpolate_pose(previous, current, alpha):
+    """Blend two ([x, z], angle) poses for rendering between physics ticks."""
+    (prev_pos, prev_angle), (pos, angle) = previous, current
+    return [lerp(prev_pos[0], pos[0], alpha), lerp(prev_pos[1], pos[1], alpha)], lerp_angle(prev_angle, angle, alpha)
+
+
+class FramePacer:
+    """Presents frames according to one of PACING_MODES."""
+
+    def __init__(self, mode=PACING, cap=FRAME_CAP):
+        if mode not in PACING_MODES:
+            print(f"Unknown pacing mode {mode!r}, using 'capped'")
+            mode = 'capped'
+        self.mode = mode
+        self.cap = cap
+        self.clock = pygame.time.Clock()
+
+    def setup(self, display):
+        """Ask for a vsynced swap chain when pacing by vsync; fall back to a frame cap without one."""
+        if self.mode != 'vsync':
+            return
+        try:
+            pygame.display.set_mode(display, DOUBLEBUF | OPENGL, vsync=1)
+        except pygame.error as e:
+            print(f"vsync unavailable ({e}), capping at {self.cap} fps")
+            self.mode = 'capped'
+
+    def wait(self):
+        """Call once per presented frame; sleeps only in capped mode."""
+        self.clock.tick(self.cap if self.mode == 'capped' else 0)
+
+    def fps(self):
+        return self.clock.get_fps()
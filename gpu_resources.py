@@ -0,0 +1,182 @@
+"""Bookkeeping for every GL buffer, texture, display list, framebuffer, renderbuffer and query.
+
+Objects are created and deleted through the helpers here, which record them
+under the owner that is current when they are made: the mode that is
+running ('viewer', 'driving'), or an explicit owner such as the shared
+texture cache. Each mode calls leave() on its way out, which reports what
+it left behind; with GPU_DEBUG=1 that raises instead. F10 prints the live
+objects per owner at any time, and any still alive at exit are printed then.
+"""
+import atexit
+import os
+from collections import defaultdict
+import pygame
+from OpenGL.arrays import vbo
+from OpenGL.GL import *
+
+# Set GPU_DEBUG=1 to raise GPULeakError when a mode leaves objects behind
+GPU_DEBUG = bool(os.environ.get('GPU_DEBUG'))
+GPU_REPORT_KEY = pygame.K_F10
+# Owner of objects made outside any mode, e.g. by benchmarks
+DEFAULT_OWNER = 'global'
+
+
+class GPULeakError(RuntimeError):
+    pass
+
+
+class ResourceTracker:
+    """Live GL objects with their owner and estimated size in bytes."""
+
+    def __init__(self, strict=GPU_DEBUG):
+        self.strict = strict
+        self.owners = [DEFAULT_OWNER]
+        # (kind, handle) -> [owner, bytes, label]; GL names are ints, VBOs are keyed by the object itself
+        self.live = {}
+
+    @property
+    def owner(self):
+        return self.owners[-1]
+
+    def enter(self, owner):
+        """Make owner the owner of everything created until the matching leave()."""
+        self.owners.append(owner)
+
+    def leave(self, owner):
+        """Close an owner's scope and report, or in strict mode raise on, objects it still holds."""
+        if owner in self.owners:
+            self.owners.remove(owner)
+        leaked = [(kind, handle, label, size) for (kind, handle), (o, size, label) in self.live.items() if o == owner]
+        if not leaked:
+            return
+        lines = [f"{kind} {handle} ({label}, {size / 1024:.0f} KB)" for kind, handle, label, size in leaked]
+        message = f"{owner} left {len(leaked)} GPU object(s) alive: " + "; ".join(lines)
+        if self.strict:
+            raise GPULeakError(message)
+        print(f"[gpu] {message}")
+
+    @staticmethod
+    def key(kind, handle):
+        return (kind, handle if isinstance(handle, vbo.VBO) else int(handle))
+
+    def add(self, kind, handle, size=0, label='', owner=None):
+        self.live[self.key(kind, handle)] = [owner or self.owner, size, label]
+        return handle
+
+    def resize(self, kind, handle, size):
+        entry = self.live.get(self.key(kind, handle))
+        if entry:
+            entry[1] = size
+
+    def remove(self, kind, handle):
+        self.live.pop(self.key(kind, handle), None)
+
+    def totals(self):
+        """{owner: {kind: [count, bytes]}} of the live objects."""
+        totals = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        for (kind, _), (owner, size, _) in self.live.items():
+            entry = totals[owner][kind]
+            entry[0] += 1
+            entry[1] += size
+        return totals
+
+    def report(self, title="live GPU objects"):
+        totals = self.totals()
+        total_bytes = sum(size for kinds in totals.values() for _, size in kinds.values())
+        print(f"[gpu] {title}: {len(self.live)} objects, ~{total_bytes / 2 ** 20:.1f} MB")
+        for owner, kinds in sorted(totals.items()):
+            parts = ", ".join(f"{count} {kind}s {size / 2 ** 20:.1f} MB" for kind, (count, size) in sorted(kinds.items()))
+            print(f"  {owner}: {parts}")
+
+
+resources = ResourceTracker()
+
+
+@atexit.register
+def report_at_exit():
+    if resources.live:
+        resources.report("GPU objects alive at exit")
+
+
+def gen_texture(label='texture', owner=None):
+    return resources.add('texture', glGenTextures(1), 0, label, owner)
+
+
+def texture_storage(texture_id, size):
+    """Record the bytes of a texture once its images are specified."""
+    resources.resize('texture', texture_id, size)
+
+
+def delete_texture(texture_id):
+    glDeleteTextures([texture_id])
+    resources.remove('texture', texture_id)
+
+
+def gen_list(label='display list'):
+    return resources.add('list', glGenLists(1), 0, label)
+
+
+def delete_list(list_id):
+    glDeleteLists(list_id, 1)
+    resources.remove('list', list_id)
+
+
+def gen_buffers(count, size=0, label='buffer'):
+    buffers = list(glGenBuffers(count)) if count > 1 else [glGenBuffers(1)]
+    for buffer in buffers:
+        resources.add('buffer', buffer, size, label)
+    return buffers
+
+
+def delete_buffers(buffers):
+    glDeleteBuffers(len(buffers), buffers)
+    for buffer in buffers:
+        resources.remove('buffer', buffer)
+
+
+def create_vbo(data, label='vertex buffer', **kwargs):
+    """A vbo.VBO over data, tracked by the object itself as its GL name is made lazily.
+
+    The tracker holds it until delete_vbo(), so a leaked VBO stays listed
+    under its owner rather than being garbage collected.
+    """
+    buffer = vbo.VBO(data, **kwargs)
+    resources.add('vbo', buffer, data.nbytes, label)
+    return buffer
+
+
+def delete_vbo(buffer):
+    buffer.delete()
+    resources.remove('vbo', buffer)
+
+
+def gen_renderbuffer(size=0, label='renderbuffer'):
+    return resources.add('renderbuffer', glGenRenderbuffers(1), size, label)
+
+
+def delete_renderbuffers(renderbuffers):
+    glDeleteRenderbuffers(len(renderbuffers), renderbuffers)
+    for renderbuffer in renderbuffers:
+        resources.remove('renderbuffer', renderbuffer)
+
+
+def gen_framebuffer(label='framebuffer'):
+    return resources.add('framebuffer', glGenFramebuffers(1), 0, label)
+
+
+def delete_framebuffer(framebuffer):
+    glDeleteFramebuffers(1, [framebuffer])
+    resources.remove('framebuffer', framebuffer)
+
+
+def gen_queries(count, label='query'):
+    queries = list(glGenQueries(count))
+    for query in queries:
+        resources.add('query', query, 0, label)
+    return queries
+
+
+def delete_queries(queries):
+    glDeleteQueries(len(queries), queries)
+    for query in queries:
+        resources.remove('query', query)
@@ -0,0 +1,170 @@
+import math
+import numpy as np
+from OpenGL.GL import *
+from OpenGL.GLU import *
+from gpu_resources import (gen_texture, texture_storage, delete_texture, gen_renderbuffer,
+                           delete_renderbuffers, gen_framebuffer, delete_framebuffer)
+
+# Scenery further than this from the camera is drawn as a billboard
+IMPOSTOR_DISTANCE = 45.0
+
+
+class ImpostorAtlas:
+    """Pre-rendered views of a model around the y axis, drawn as camera-facing quads.
+
+    The model is rendered once per view into a texture atlas through an offscreen
+    framebuffer, so every distant instance costs one quad and the whole batch is a
+    single draw call.
+    """
+
+    def __init__(self, model, views=8, tile_size=128, columns=4):
+        self.views = views
+        self.columns = columns
+        self.rows = (views + columns - 1) // columns
+        self.tile_size = tile_size
+
+        positions = np.asarray(model.vertices, dtype=np.float32)
+        low = positions.min(axis=0)
+        high = positions.max(axis=0)
+        self.center_x = float(low[0] + high[0]) / 2
+        self.center_z = float(low[2] + high[2]) / 2
+        self.bottom = float(low[1])
+        # Radius of the footprint and half the height, whichever is larger, fits every view
+        self.radius = float(max(
+            np.hypot(positions[:, 0] - self.center_x, positions[:, 2] - self.center_z).max(),
+            (high[1] - low[1]) / 2,
+        ))
+
+        self.texture_id = self._render_atlas(model)
+
+    def _render_atlas(self, model):
+        width = self.columns * self.tile_size
+        height = self.rows * self.tile_size
+
+        texture_id = gen_texture('impostor atlas')
+        glBindTexture(GL_TEXTURE_2D, texture_id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        texture_storage(texture_id, width * height * 4)
+
+        depth_buffer = gen_renderbuffer(width * height * 4, 'impostor depth')
+        glBindRenderbuffer(GL_RENDERBUFFER, depth_buffer)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+
+        framebuffer = gen_framebuffer('impostor')
+        glBindFramebuffer(GL_FRAMEBUFFER, framebuffer)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, texture_id, 0)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, depth_buffer)
+
+        viewport = glGetIntegerv(GL_VIEWPORT)
+        clear_color = glGetFloatv(GL_COLOR_CLEAR_VALUE)
+
+        # Transparent background so the billboards can be alpha tested
+        glClearColor(0, 0, 0, 0)
+        glViewport(0, 0, width, height)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+
+        r = self.radius
+        for view in range(self.views):
+            column = view % self.columns
+            row = view // self.columns
+            glViewport(column * self.tile_size, row * self.tile_size, self.tile_size, self.tile_size)
+
+            glMatrixMode(GL_PROJECTION)
+            glLoadIdentity()
+            glOrtho(-r, r, self.bottom, self.bottom + 2 * r, 0.1, 4 * r)
+
+            # Look at the model from angle theta around the y axis
+            theta = 2 * math.pi * view / self.views
+            glMatrixMode(GL_MODELVIEW)
+            glLoadIdentity()
+            gluLookAt(self.center_x + math.sin(theta) * 2 * r, 0, self.center_z + math.cos(theta) * 2 * r,
+                      self.center_x, 0, self.center_z, 0, 1, 0)
+            model.render()
+
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPopMatrix()
+
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glViewport(*viewport)
+        glClearColor(*clear_color)
+        delete_framebuffer(framebuffer)
+        delete_renderbuffers([depth_buffer])
+        return texture_id
+
+    def delete(self):
+        delete_texture(self.texture_id)
+
+    def build_quads(self, xs, zs, scales, camera):
+        """Return vertex and texcoord arrays for one billboard per instance."""
+        xs = np.asarray(xs, dtype=np.float32)
+        zs = np.asarray(zs, dtype=np.float32)
+        scales = np.asarray(scales, dtype=np.float32)
+
+        # Direction from each instance to the camera picks the pre-rendered view
+        theta = np.arctan2(camera[0] - xs, camera[1] - zs)
+        view = np.round(theta / (2 * np.pi / self.views)).astype(np.int32) % self.views
+        right_x = np.cos(theta)
+        right_z = -np.sin(theta)
+
+        half = self.radius * scales
+        cx = xs + self.center_x * scales
+        cz = zs + self.center_z * scales
+        y0 = self.bottom * scales
+        y1 = y0 + 2 * half
+
+        vertices = np.empty((len(xs), 4, 3), dtype=np.float32)
+        vertices[:, 0] = np.stack([cx - right_x * half, y0, cz - right_z * half], axis=1)
+        vertices[:, 1] = np.stack([cx + right_x * half, y0, cz + right_z * half], axis=1)
+        vertices[:, 2] = np.stack([cx + right_x * half, y1, cz + right_z * half], axis=1)
+        vertices[:, 3] = np.stack([cx - right_x * half, y1, cz - right_z * half], axis=1)
+
+        u0 = (view % self.columns) / self.columns
+        v0 = (view // self.columns) / self.rows
+        du = 1.0 / self.columns
+        dv = 1.0 / self.rows
+        texcoords = np.empty((len(xs), 4, 2), dtype=np.float32)
+        texcoords[:, 0] = np.stack([u0, v0], axis=1)
+        texcoords[:, 1] = np.stack([u0 + du, v0], axis=1)
+        texcoords[:, 2] = np.stack([u0 + du, v0 + dv], axis=1)
+        texcoords[:, 3] = np.stack([u0, v0 + dv], axis=1)
+        return vertices.reshape(-1, 3), texcoords.reshape(-1, 2)
+
+    def draw(self, xs, zs, scales, camera):
+        """Draw all given instances as billboards in a single call."""
+        if len(xs) == 0:
+            return
+        vertices, texcoords = self.build_quads(xs, zs, scales, camera)
+
+        # Lighting is already baked into the atlas
+        glDisable(GL_LIGHTING)
+        glEnable(GL_TEXTURE_2D)
+        glEnable(GL_ALPHA_TEST)
+        glAlphaFunc(GL_GREATER, 0.5)
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+        glColor4f(1, 1, 1, 1)
+
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, vertices)
+        glTexCoordPointer(2, GL_FLOAT, 0, texcoords)
+        glDrawArrays(GL_QUADS, 0, len(vertices))
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glDisable(GL_ALPHA_TEST)
+        glDisable(GL_TEXTURE_2D)
+        glEnable(GL_LIGHTING)
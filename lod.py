@@ -0,0 +1,137 @@
+import copy
+import numpy as np
+from OBJ import faces_from_arrays
+from assets import asset_path, load_cache, packed_lod_levels, save_cache
+
+# Cluster cell size per LOD level, as a fraction of the model's bounding box diagonal
+LOD_CELL_FRACTIONS = (0.03, 0.08)
+# Camera distance at which each level hands over to the next coarser one
+LOD_DISTANCES = (25.0, 60.0)
+# Fraction of a switch distance the camera must pass before switching back
+LOD_HYSTERESIS = 0.1
+LOD_CACHE_VERSION = 1
+
+
+def faces_to_array(model):
+    """Pack a model's triangle faces into an (F, 3, 3) index array plus a material index per face."""
+    material_names = []
+    material_ids = {}
+    face_materials = []
+    corners = []
+    for material, face in model.faces:
+        if material not in material_ids:
+            material_ids[material] = len(material_names)
+            material_names.append(material)
+        face_materials.append(material_ids[material])
+        corners.append([
+            (v, -1 if vt is None else vt, -1 if vn is None else vn)
+            for v, vt, vn in face
+        ])
+    return np.array(corners, dtype=np.int32).reshape(-1, 3, 3), np.array(face_materials, dtype=np.int32), material_names
+
+
+def cluster_simplify(vertices, faces, cell_size):
+    """Vertex clustering: snap every vertex to a grid cell and drop collapsed triangles.
+
+    Returns the new vertex positions and the faces re-pointed at them; texture
+    and normal indices of the surviving corners are kept as they were.
+    """
+    positions = np.asarray(vertices, dtype=np.float64)
+    cells = np.floor((positions - positions.min(axis=0)) / cell_size).astype(np.int64)
+    _, cluster, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    cluster = cluster.ravel()
+
+    # Each cluster is represented by the mean of its vertices
+    sums = np.zeros((len(counts), 3))
+    np.add.at(sums, cluster, positions)
+    centers = sums / counts[:, None]
+
+    simplified = faces.copy()
+    simplified[:, :, 0] = cluster[faces[:, :, 0]]
+    v = simplified[:, :, 0]
+    keep = (v[:, 0] != v[:, 1]) & (v[:, 1] != v[:, 2]) & (v[:, 0] != v[:, 2])
+    return centers.astype(np.float32), simplified, keep
+
+
+def load_cached_levels(filename, cell_fractions):
+    """Return cached (vertices, faces, face_materials, material_names) per level, or None."""
+    data = load_cache(asset_path(filename), '.lod.npz', LOD_CACHE_VERSION, cell_fractions)
+    try:
+        names = [str(name) for name in data['material_names']]
+        return [
+            (data[f'vertices{i}'], data[f'faces{i}'], data[f'materials{i}'], names)
+            for i in range(len(cell_fractions))
+        ]
+    except (TypeError, KeyError):
+        return None
+
+
+def save_cached_levels(filename, cell_fractions, levels):
+    arrays = {'material_names': np.array(levels[0][3])}
+    for i, (vertices, faces, face_materials, _) in enumerate(levels):
+        arrays[f'vertices{i}'] = vertices
+        arrays[f'faces{i}'] = faces
+        arrays[f'materials{i}'] = face_materials
+    save_cache(asset_path(filename), '.lod.npz', arrays, LOD_CACHE_VERSION, cell_fractions)
+
+
+def build_levels(model, cell_fractions=LOD_CELL_FRACTIONS):
+    """Simplify a model once per entry in cell_fractions, reusing the on-disk cache when valid."""
+    levels = (packed_lod_levels(model.filename, cell_fractions, LOD_CACHE_VERSION)
+              or load_cached_levels(model.filename, cell_fractions))
+    if levels is not None:
+        return levels
+
+    faces, face_materials, names = faces_to_array(model)
+    positions = np.asarray(model.vertices, dtype=np.float64)
+    diagonal = float(np.linalg.norm(positions.max(axis=0) - positions.min(axis=0)))
+
+    levels = []
+    for fraction in cell_fractions:
+        vertices, simplified, keep = cluster_simplify(positions, faces, diagonal * fraction)
+        levels.append((vertices, simplified[keep], face_materials[keep], names))
+
+    save_cached_levels(model.filename, cell_fractions, levels)
+    return levels
+
+
+def make_level_model(model, vertices, faces, face_materials, names):
+    """Create a renderable copy of model that shares its materials but uses the simplified mesh."""
+    level = copy.copy(model)
+    level.vertices = [tuple(v) for v in vertices.tolist()]
+    level.faces = faces_from_arrays(faces, face_materials, names)
+    level.build_arrays()
+    level.build_vbos()
+    return level
+
+
+class LODSet:
+    """A model plus its simplified levels, picked per instance by camera distance."""
+
+    def __init__(self, model, cell_fractions=LOD_CELL_FRACTIONS, distances=LOD_DISTANCES,
+                 hysteresis=LOD_HYSTERESIS):
+        self.levels = [model] + [
+            make_level_model(model, *level) for level in build_levels(model, cell_fractions)
+        ]
+        self.distances = distances
+        self.hysteresis = hysteresis
+        self.current = {}
+
+    def select(self, key, distance):
+        """Return the level to draw for instance key at the given camera distance."""
+        level = self.current.get(key, 0)
+        while level < len(self.levels) - 1 and distance > self.distances[level] * (1 + self.hysteresis):
+            level += 1
+        while level > 0 and distance < self.distances[level - 1] * (1 - self.hysteresis):
+            level -= 1
+        self.current[key] = level
+        return self.levels[level]
+
+    def render(self):
+        self.levels[0].render()
+
+    def delete(self):
+        """Free the simplified levels; the full model belongs to whoever loaded it."""
+        for level in self.levels[1:]:
+            level.delete()
+        self.levels = self.levels[:1]
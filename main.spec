@@ -1,11 +1,18 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+
+# Ship the asset pack when it has been built (python assets.py), the loose asset folders otherwise
+if os.path.exists('assets.pack'):
+    datas = [('assets.pack', '.')]
+else:
+    datas = [('OBJs', 'OBJs'), ('audio', 'audio')]
 
 
 a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=datas,
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
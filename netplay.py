@@ -0,0 +1,413 @@
+"""Headless authoritative multiplayer server and client over UDP.
+
+The server runs the single-player physics (update_car_physics and
+check_game_status) for every connected player at PHYSICS_HZ and sends each
+client quantized snapshots at SNAPSHOT_HZ, delta-compressed against the last
+snapshot that client acknowledged. Clients send their key state every tick
+and render other cars INTERPOLATION_DELAY behind the newest snapshot.
+
+Start a local server from the repository root with:
+
+    python netplay.py [port]
+"""
+import random
+import socket
+import struct
+import sys
+import time
+from frame_timing import FixedStep, PHYSICS_HZ, interpolate_pose
+
+NET_HOST = '127.0.0.1'
+NET_PORT = 47800
+SNAPSHOT_HZ = 20
+# Clients render this many seconds behind the newest snapshot so two are usually on hand
+INTERPOLATION_DELAY = 0.1
+# Snapshots kept on the server as delta baselines; older acks get a full snapshot
+SNAPSHOT_HISTORY = 64
+# Players that send nothing for this many seconds are dropped
+CLIENT_TIMEOUT = 5.0
+MAX_PACKET = 65507
+
+JOIN, WELCOME, INPUT, SNAPSHOT, LEAVE = b'J', b'W', b'I', b'S', b'L'
+WELCOME_FORMAT = struct.Struct('<HIHH')  # player id, road seed, tick rate, snapshot rate
+INPUT_FORMAT = struct.Struct('<HIIB')  # player id, input sequence, acked snapshot tick, key bits
+SNAPSHOT_HEADER = struct.Struct('<IIH')  # tick, baseline tick (0 for a full snapshot), entity count
+# Player ids are 16-bit on the wire; ids of players who left are handed out again after wrapping
+MAX_PLAYER_ID = 0xFFFF
+
+# Key bits of an input packet
+KEY_UP, KEY_DOWN, KEY_LEFT, KEY_RIGHT, KEY_FASTER, KEY_SLOWER, KEY_RESTART = (1 << i for i in range(7))
+
+# Snapshot fields of a car and their quantization steps: centimetres, hundredths of a degree, ...
+FIELDS = ('x', 'z', 'angle', 'speed', 'times', 'flags')
+FIELD_SCALES = (100, 100, 100, 1000, 100, 1)
+FLAG_GAME_OVER, FLAG_GAME_WIN = 1, 2
+
+
+def key_bits(keys):
+    """Pack the driving keys of a pygame.key.get_pressed() result into input bits."""
+    import pygame
+    bits = 0
+    for key, bit in ((pygame.K_UP, KEY_UP), (pygame.K_DOWN, KEY_DOWN), (pygame.K_LEFT, KEY_LEFT),
+                     (pygame.K_RIGHT, KEY_RIGHT), (pygame.K_r, KEY_FASTER), (pygame.K_f, KEY_SLOWER),
+                     (pygame.K_RETURN, KEY_RESTART)):
+        if keys[key]:
+            bits |= bit
+    return bits
+
+
+class InputKeys:
+    """Stand-in for pygame.key.get_pressed() built from a client's key bits."""
+
+    def __init__(self, bits=0):
+        import pygame
+        self.bits = bits
+        self.map = {pygame.K_UP: KEY_UP, pygame.K_DOWN: KEY_DOWN, pygame.K_LEFT: KEY_LEFT,
+                    pygame.K_RIGHT: KEY_RIGHT, pygame.K_r: KEY_FASTER, pygame.K_f: KEY_SLOWER,
+                    pygame.K_RETURN: KEY_RESTART}
+
+    def __getitem__(self, key):
+        return bool(self.bits & self.map.get(key, 0))
+
+
+def write_varint(out, value):
+    """Append a signed integer as a zigzag LEB128 varint."""
+    value = (value << 1) ^ (value >> 63)
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, offset):
+    """Decode a zigzag varint; returns (value, next offset)."""
+    result = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return (result >> 1) ^ -(result & 1), offset
+        shift += 7
+
+
+def encode_snapshot(tick, states, baseline_tick=0, baseline=None):
+    """Serialize {player id: quantized field tuple} as changes against a baseline snapshot.
+
+    Each car is its id, a bit mask of changed fields and the changed fields'
+    differences as varints; unchanged cars are left out and cars gone since
+    the baseline are listed at the end. With no baseline every field is sent.
+    """
+    baseline = baseline or {}
+    body = bytearray()
+    count = 0
+    zero = (0,) * len(FIELDS)
+    for player_id, values in states.items():
+        base = baseline.get(player_id, zero)
+        mask = 0
+        for i, (value, old) in enumerate(zip(values, base)):
+            if value != old:
+                mask |= 1 << i
+        if not mask and player_id in baseline:
+            continue
+        write_varint(body, player_id)
+        body.append(mask)
+        for i, (value, old) in enumerate(zip(values, base)):
+            if mask & (1 << i):
+                write_varint(body, value - old)
+        count += 1
+    removed = [player_id for player_id in baseline if player_id not in states]
+    write_varint(body, len(removed))
+    for player_id in removed:
+        write_varint(body, player_id)
+    return SNAPSHOT + SNAPSHOT_HEADER.pack(tick, baseline_tick, count) + bytes(body)
+
+
+def decode_snapshot(data, baselines):
+    """Rebuild (tick, states) from a snapshot packet, or None when its baseline is no longer known."""
+    tick, baseline_tick, count = SNAPSHOT_HEADER.unpack_from(data, 1)
+    if baseline_tick and baseline_tick not in baselines:
+        return None
+    states = dict(baselines[baseline_tick]) if baseline_tick else {}
+    zero = (0,) * len(FIELDS)
+    offset = 1 + SNAPSHOT_HEADER.size
+    for _ in range(count):
+        player_id, offset = read_varint(data, offset)
+        mask = data[offset]
+        offset += 1
+        values = list(states.get(player_id, zero))
+        for i in range(len(FIELDS)):
+            if mask & (1 << i):
+                delta, offset = read_varint(data, offset)
+                values[i] += delta
+        states[player_id] = tuple(values)
+    removed, offset = read_varint(data, offset)
+    for _ in range(removed):
+        player_id, offset = read_varint(data, offset)
+        states.pop(player_id, None)
+    return tick, states
+
+
+def dequantize(values):
+    """Field tuple of a snapshot back to ([x, z], angle, speed, times, flags)."""
+    x, z, angle, speed, times, flags = (value / scale for value, scale in zip(values, FIELD_SCALES))
+    return [x, z], angle, speed, times, int(flags)
+
+
+class Player:
+    """Server-side state of one connected car, as run_driving_game keeps it for the local car."""
+
+    def __init__(self, player_id, address, start):
+        self.id = player_id
+        self.address = address
+        self.start = start
+        self.keys = 0
+        self.input_sequence = 0
+        self.acked_tick = 0
+        self.last_heard = time.perf_counter()
+        self.times = 1
+        self.max_speed = 0.5
+        self.acceleration = 0.1
+        self.brake_force = 0.05
+        self.friction = 0.02
+        self.elapsed_time = 0
+        self.reset()
+
+    def reset(self):
+        """Back to the start line; like DrivingSimulation.restart, the speed multiplier is kept."""
+        self.car_pos = list(self.start)
+        self.car_speed = 0.0
+        self.car_angle = 0.0
+        self.start_time = None
+        self.game_over = False
+        self.game_win = False
+
+    def quantized(self):
+        flags = (FLAG_GAME_OVER if self.game_over else 0) | (FLAG_GAME_WIN if self.game_win else 0)
+        values = (self.car_pos[0], self.car_pos[1], self.car_angle, self.car_speed, self.times, flags)
+        return tuple(round(value * scale) for value, scale in zip(values, FIELD_SCALES))
+
+
+class GameServer:
+    """Authoritative simulation of every player's car on one shared road."""
+
+    def __init__(self, port=NET_PORT, host=NET_HOST, seed=None, delta=True, snapshot_hz=SNAPSHOT_HZ):
+        import driving_game_mode as game
+        from road_mesh import RoadIndex, centre_line_segments
+        self.game = game
+        self.seed = random.randrange(1 << 31) if seed is None else seed
+        random.seed(self.seed)
+        self.road = game.generate_road()
+        # On-road tests use the drawn spline, as the single-player game does
+        self.track = RoadIndex(centre_line_segments(self.road))
+        self.delta = delta
+        self.snapshot_hz = snapshot_hz
+        self.snapshot_interval = max(1, round(PHYSICS_HZ / snapshot_hz))
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.socket.setblocking(False)
+        self.address = self.socket.getsockname()
+
+        self.players = {}
+        self.by_address = {}
+        self.next_id = 1
+        self.tick = 0
+        self.history = {}
+        self.stats = {'ticks': 0, 'tick_seconds': [], 'bytes_sent': 0, 'packets_sent': 0, 'bytes_received': 0}
+
+    def receive(self):
+        """Apply every packet waiting on the socket."""
+        while True:
+            try:
+                data, address = self.socket.recvfrom(MAX_PACKET)
+            except (BlockingIOError, ConnectionResetError):
+                return
+            self.stats['bytes_received'] += len(data)
+            kind = data[:1]
+            if kind == INPUT and len(data) == 1 + INPUT_FORMAT.size:
+                player_id, sequence, acked_tick, bits = INPUT_FORMAT.unpack_from(data, 1)
+                player = self.players.get(player_id)
+                # Later inputs supersede earlier ones; late or duplicated packets are ignored
+                if player and player.address == address and sequence > player.input_sequence:
+                    player.input_sequence = sequence
+                    player.keys = bits
+                    player.acked_tick = max(player.acked_tick, acked_tick)
+                    player.last_heard = time.perf_counter()
+            elif kind == JOIN:
+                player = self.by_address.get(address)
+                if player is None:
+                    if len(self.players) >= MAX_PLAYER_ID:
+                        continue
+                    player = Player(self.allocate_id(), address, self.road[0].p2)
+                    self.players[player.id] = player
+                    self.by_address[address] = player
+                self.send(WELCOME + WELCOME_FORMAT.pack(player.id, self.seed, PHYSICS_HZ, self.snapshot_hz), address)
+            elif kind == LEAVE:
+                self.drop(self.by_address.get(address))
+
+    def allocate_id(self):
+        """The next player id not in use, counting up from 1 and wrapping at MAX_PLAYER_ID."""
+        while self.next_id in self.players:
+            self.next_id = self.next_id % MAX_PLAYER_ID + 1
+        player_id = self.next_id
+        self.next_id = self.next_id % MAX_PLAYER_ID + 1
+        return player_id
+
+    def drop(self, player):
+        if player:
+            del self.players[player.id]
+            del self.by_address[player.address]
+
+    def send(self, data, address):
+        try:
+            self.socket.sendto(data, address)
+        except (BlockingIOError, ConnectionResetError):
+            return
+        self.stats['bytes_sent'] += len(data)
+        self.stats['packets_sent'] += 1
+
+    def simulate(self, dt):
+        """Advance every player one fixed tick with the single-player rules."""
+        game = self.game
+        for player in self.players.values():
+            keys = InputKeys(player.keys)
+            if (player.game_over or player.game_win) and keys[game.pygame.K_RETURN]:
+                player.reset()
+            if player.start_time is None and player.keys & (KEY_UP | KEY_DOWN | KEY_LEFT | KEY_RIGHT):
+                player.start_time = time.time()
+            (player.car_speed, player.car_angle, player.car_pos, player.times, player.max_speed,
+             player.acceleration, player.brake_force, player.friction, _, _) = game.update_car_physics(
+                keys, player.car_speed, player.car_angle, player.car_pos, player.times, player.max_speed,
+                player.acceleration, player.brake_force, player.friction, player.game_over, player.game_win, dt)
+            # A finished car stays put until it restarts, so only running cars need the road test
+            if not (player.game_over or player.game_win):
+                player.game_over, player.game_win, player.elapsed_time = game.check_game_status(
+                    player.car_pos, self.track, player.start_time, player.game_over, player.game_win,
+                    player.elapsed_time)
+
+    def send_snapshots(self):
+        """Send every player the world, as a delta against the newest snapshot they acknowledged."""
+        states = {player.id: player.quantized() for player in self.players.values()}
+        self.history[self.tick] = states
+        self.history.pop(self.tick - SNAPSHOT_HISTORY * self.snapshot_interval, None)
+        # Players acknowledging the same snapshot get the same bytes
+        encoded = {}
+        for player in self.players.values():
+            baseline_tick = player.acked_tick if self.delta and player.acked_tick in self.history else 0
+            if baseline_tick not in encoded:
+                encoded[baseline_tick] = encode_snapshot(self.tick, states, baseline_tick,
+                                                         self.history.get(baseline_tick))
+            self.send(encoded[baseline_tick], player.address)
+
+    def step(self, dt):
+        start = time.perf_counter()
+        self.receive()
+        now = time.perf_counter()
+        for player in [p for p in self.players.values() if now - p.last_heard > CLIENT_TIMEOUT]:
+            self.drop(player)
+        self.tick += 1
+        self.simulate(dt)
+        if self.tick % self.snapshot_interval == 0:
+            self.send_snapshots()
+        self.stats['ticks'] += 1
+        if self.players:
+            self.stats['tick_seconds'].append(time.perf_counter() - start)
+
+    def run(self, duration=None):
+        """Serve until duration seconds have passed, or forever."""
+        step = FixedStep()
+        end = time.perf_counter() + duration if duration else None
+        print(f"Serving on {self.address[0]}:{self.address[1]}, road seed {self.seed}")
+        while end is None or time.perf_counter() < end:
+            for _ in range(step.advance()):
+                self.step(step.dt)
+            time.sleep(max(0.0, step.dt - step.accumulator))
+        self.socket.close()
+
+
+class GameClient:
+    """Sends inputs to a GameServer and interpolates the snapshots it gets back."""
+
+    def __init__(self, address=(NET_HOST, NET_PORT), timeout=2.0):
+        self.server = address
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.settimeout(timeout)
+        self.socket.sendto(JOIN, address)
+        data, _ = self.socket.recvfrom(MAX_PACKET)
+        while data[:1] != WELCOME:
+            data, _ = self.socket.recvfrom(MAX_PACKET)
+        self.id, self.road_seed, self.tick_hz, self.snapshot_hz = WELCOME_FORMAT.unpack_from(data, 1)
+        self.socket.setblocking(False)
+        self.sequence = 0
+        self.baselines = {}
+        self.snapshots = []
+        self.latest_tick = 0
+        self.latest_time = None
+        self.bytes_received = 0
+
+    def road(self):
+        """The server's road, generated from the same seed."""
+        import driving_game_mode as game
+        random.seed(self.road_seed)
+        return game.generate_road()
+
+    def send_input(self, bits):
+        self.sequence += 1
+        self.socket.sendto(INPUT + INPUT_FORMAT.pack(self.id, self.sequence, self.latest_tick, bits), self.server)
+
+    def receive(self):
+        """Decode every waiting snapshot; returns how many arrived."""
+        received = 0
+        while True:
+            try:
+                data, _ = self.socket.recvfrom(MAX_PACKET)
+            except (BlockingIOError, ConnectionResetError):
+                return received
+            self.bytes_received += len(data)
+            if data[:1] != SNAPSHOT:
+                continue
+            decoded = decode_snapshot(data, self.baselines)
+            if decoded is None or decoded[0] <= self.latest_tick:
+                continue
+            tick, states = decoded
+            self.baselines[tick] = states
+            # Everything at or before the cutoff goes, also when the snapshot at the cutoff was lost
+            cutoff = tick - SNAPSHOT_HISTORY * round(self.tick_hz / self.snapshot_hz)
+            for old in [old for old in self.baselines if old <= cutoff]:
+                del self.baselines[old]
+            self.snapshots.append((tick, states))
+            self.latest_tick = tick
+            self.latest_time = time.perf_counter()
+            received += 1
+
+    def poses(self):
+        """{player id: ([x, z], angle)} at INTERPOLATION_DELAY behind the newest snapshot."""
+        if not self.snapshots:
+            return {}
+        render_tick = (self.latest_tick + (time.perf_counter() - self.latest_time) * self.tick_hz
+                       - INTERPOLATION_DELAY * self.tick_hz)
+        # Drop snapshots that are older than the pair around the render time
+        while len(self.snapshots) > 2 and self.snapshots[1][0] <= render_tick:
+            self.snapshots.pop(0)
+        (tick_a, states_a), (tick_b, states_b) = self.snapshots[0], self.snapshots[min(1, len(self.snapshots) - 1)]
+        alpha = 0.0 if tick_b == tick_a else min(1.0, max(0.0, (render_tick - tick_a) / (tick_b - tick_a)))
+        poses = {}
+        for player_id, values in states_b.items():
+            pos, angle = dequantize(values)[:2]
+            if player_id in states_a:
+                previous = dequantize(states_a[player_id])[:2]
+                poses[player_id] = interpolate_pose(previous, (pos, angle), alpha)
+            else:
+                poses[player_id] = (pos, angle)
+        return poses
+
+    def close(self):
+        try:
+            self.socket.sendto(LEAVE, self.server)
+        finally:
+            self.socket.close()
+
+
+if __name__ == "__main__":
+    GameServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else NET_PORT).run()
@@ -0,0 +1,401 @@
+import math
+import numpy as np
+
+# Candidate rounds per layer; each round offers every still-empty grid cell one dart
+PLACEMENT_ROUNDS = 6
+# Cells along the side of the square blocks a layer's grid is made of; only blocks the region reaches exist
+PLACEMENT_BLOCK = 16
+# Cells along the side of the groups whose region test is first tried once for the whole group
+PLACEMENT_COARSE = 4
+# Blocks classified per pass, and array elements a region works on at once, bounding the memory either takes
+PLACEMENT_BLOCKS_PER_PASS = 1024
+PLACEMENT_CHUNK = 1 << 18
+# Every block is padded by this many cells of its neighbours' edges, so a 5x5 neighbourhood stays in one block
+BLOCK_PAD = 2
+# Neighbours within two cells, the adjacent ones first since most rejections come from them; the four
+# corners are a full spacing away from anything in the middle cell
+NEIGHBOURS = sorted([(dr, dc) for dr in range(-2, 3) for dc in range(-2, 3) if abs(dr) + abs(dc) < 4],
+                    key=lambda offset: max(abs(offset[0]), abs(offset[1])))
+ADJACENT = 9
+
+
+class Annulus:
+    """Ring between min_radius and max_radius around center."""
+
+    def __init__(self, min_radius, max_radius, center=(0.0, 0.0)):
+        self.min_radius = min_radius
+        self.max_radius = max_radius
+        self.center = center
+
+    def blocks(self, size):
+        """Keys (bx, bz) of the size-wide square blocks covering the ring."""
+        cx, cz = self.center
+        r = self.max_radius
+        bz, bx = np.mgrid[math.floor((cz - r) / size):math.floor((cz + r) / size) + 1,
+                          math.floor((cx - r) / size):math.floor((cx + r) / size) + 1]
+        return np.stack([bx.ravel(), bz.ravel()], axis=1)
+
+    def classify(self, xs, zs, blocks, margin):
+        """(near, inside): points within margin of the ring, and points at least margin inside it."""
+        r = np.hypot(xs - self.center[0], zs - self.center[1])
+        return ((r >= self.min_radius - margin) & (r <= self.max_radius + margin),
+                (r >= self.min_radius + margin) & (r <= self.max_radius - margin))
+
+    def nearby(self, xs, zs, blocks, margin):
+        return None
+
+    def contains(self, xs, zs, nearby=None):
+        r = np.hypot(xs - self.center[0], zs - self.center[1])
+        return (r >= self.min_radius) & (r <= self.max_radius)
+
+
+class RoadBand:
+    """Strip on both sides of the road, between inner and outer distance from its centre line.
+
+    Everything closer than inner to any segment is excluded, so objects never
+    land on the road even where it curves back on itself. blocks() files each
+    segment under the blocks it comes within outer of, so a point is only
+    measured against its own block's segments; nearby() narrows those down to
+    the few that can be nearest around a point, which is all contains() looks at.
+    """
+
+    def __init__(self, road, inner, outer):
+        self.p1 = np.array([seg.p1 for seg in road], dtype=np.float64).reshape(-1, 2)
+        self.p2 = np.array([seg.p2 for seg in road], dtype=np.float64).reshape(-1, 2)
+        self.inner = inner
+        self.outer = outer
+        # Rows of x, z, dx, dz and 1 / length squared, one column per segment and a last for a far-away
+        # point that pads lists of them
+        d = self.p2 - self.p1
+        self.rows = np.column_stack([np.vstack([self.p1.T, d.T, 1 / np.maximum((d ** 2).sum(axis=1), 1e-12)]),
+                                     [1e9, 1e9, 0.0, 0.0, 1.0]])
+        self.block_segments = None
+
+    def blocks(self, size):
+        """Keys (bx, bz) of the size-wide square blocks within outer of the road, in the order the tests take."""
+        low = np.floor((np.minimum(self.p1, self.p2) - self.outer) / size).astype(np.int64)
+        spans = np.floor((np.maximum(self.p1, self.p2) + self.outer) / size).astype(np.int64) - low + 1
+        counts = spans[:, 0] * spans[:, 1]
+        segments = np.repeat(np.arange(len(self.p1)), counts)
+        k = np.arange(len(segments)) - np.repeat(np.cumsum(counts) - counts, counts)
+        keys = np.stack([low[segments, 0] + k % spans[segments, 0], low[segments, 1] + k // spans[segments, 0]], axis=1)
+        keys, block = np.unique(keys, axis=0, return_inverse=True)
+        block = block.ravel()
+
+        order = np.argsort(block, kind='stable')
+        block, segments = block[order], segments[order]
+        slot = np.arange(len(block)) - np.searchsorted(block, block)
+        self.block_counts = np.bincount(block, minlength=len(keys))
+        self.block_segments = np.full((len(keys), int(self.block_counts.max())), len(self.p1))
+        self.block_segments[block, slot] = segments
+        return keys
+
+    def squared_distances(self, xs, zs, segments):
+        """Squared distances from points (n, 1) to segments (n, k) given by index."""
+        x, z, dx, dz, inverse_sq = self.rows[:, segments]
+        px = xs - x
+        pz = zs - z
+        t = (px * dx + pz * dz) * inverse_sq
+        np.clip(t, 0, 1, out=t)
+        px -= t * dx
+        pz -= t * dz
+        px *= px
+        pz *= pz
+        px += pz
+        return px
+
+    def grouped(self, blocks):
+        """(group, segments) runs of the points whose blocks hold the same number of segments, none padded."""
+        counts = self.block_counts[blocks]
+        for count in np.unique(counts):
+            group = np.nonzero(counts == count)[0]
+            step = max(1, PLACEMENT_CHUNK // count)
+            for start in range(0, len(group), step):
+                part = group[start:start + step]
+                yield part, self.block_segments[blocks[part], :count]
+
+    def classify(self, xs, zs, blocks, margin):
+        """(near, inside): points within margin of the band, and points at least margin inside it."""
+        dist = np.empty(len(xs))
+        for part, segments in self.grouped(blocks):
+            dist[part] = self.squared_distances(xs[part, None], zs[part, None], segments).min(axis=1)
+        np.sqrt(dist, out=dist)
+        return ((dist >= self.inner - margin) & (dist <= self.outer + margin),
+                (dist >= self.inner + margin) & (dist <= self.outer - margin))
+
+    def nearby(self, xs, zs, blocks, margin):
+        """Rows of the segments that can be nearest to anything within margin of each point, for contains().
+
+        Anything within margin of a point is no further than the nearest
+        segment plus margin from all of its segments, so one more than twice
+        that away from the point can never be nearest. Rows are padded by
+        repeating their last entry, which leaves their nearest distance as is.
+        """
+        parts, found = [], []
+        for part, segments in self.grouped(blocks):
+            dist = np.sqrt(self.squared_distances(xs[part, None], zs[part, None], segments))
+            close = dist <= dist.min(axis=1, keepdims=True) + 2 * margin
+            width = int(close.sum(axis=1).max())
+            order = np.argsort(~close, axis=1, kind='stable')[:, :width]
+            rows = np.take_along_axis(segments, order, axis=1)
+            last = np.take_along_axis(close, order, axis=1).sum(axis=1) - 1
+            parts.append(part)
+            found.append(np.where(np.arange(width) <= last[:, None], rows, rows[np.arange(len(rows)), last][:, None]))
+
+        nearby = np.empty((len(xs), max([rows.shape[1] for rows in found], default=1)), dtype=np.int64)
+        for part, rows in zip(parts, found):
+            nearby[part] = np.pad(rows, ((0, 0), (0, nearby.shape[1] - rows.shape[1])), mode='edge')
+        return nearby
+
+    def contains(self, xs, zs, nearby):
+        """Which points lie in the band, given the nearby() rows of the cells they fall in."""
+        dist = np.empty(len(xs))
+        # A row's own entries end where its last one first appears; rows go in power-of-two widths of them
+        used = (nearby == nearby[:, -1:]).argmax(axis=1) + 1
+        widths = 2 ** np.ceil(np.log2(used)).astype(np.int64)
+        for width in np.unique(widths):
+            group = np.nonzero(widths == width)[0]
+            dist[group] = self.squared_distances(xs[group, None], zs[group, None], nearby[group, :width]).min(axis=1)
+        np.sqrt(dist, out=dist)
+        return (dist >= self.inner) & (dist <= self.outer)
+
+
+class BlockGrid:
+    """A layer's cell grid, kept only for the square blocks of cells a region reaches.
+
+    Each block is stored padded by BLOCK_PAD cells copied from its
+    neighbours' edges, so the 5x5 neighbourhood of any of its cells is found
+    by adding fixed offsets to the cell's slot. A point is stored as a
+    complex64 x + zj fraction of its own cell, which keeps the grid small and
+    exact however far the region is from the origin.
+    """
+
+    def __init__(self, keys, size):
+        self.keys = np.asarray(keys, dtype=np.int64).reshape(-1, 2)
+        self.size = size
+        self.side = size + 2 * BLOCK_PAD
+        # Blocks keep the region's order; finding one is a binary search over their sorted codes
+        codes = self.code(self.keys[:, 0], self.keys[:, 1])
+        self.order = np.argsort(codes)
+        self.codes = codes[self.order]
+        self.offsets = np.array([dr * self.side + dc for dr, dc in NEIGHBOURS])
+        self.shifts = np.array([dc + 1j * dr for dr, dc in NEIGHBOURS], dtype=np.complex64)
+        # Every block's neighbours, indexed [block, dbz + 1, dbx + 1], -1 where there is none
+        dbz, dbx = np.divmod(np.arange(9), 3)
+        self.neighbours = self.find(self.keys[:, 0, None] + dbx - 1, self.keys[:, 1, None] + dbz - 1).reshape(-1, 3, 3)
+
+    @staticmethod
+    def code(bx, bz):
+        return (bx + 2 ** 31) * 2 ** 32 + (bz + 2 ** 31)
+
+    def find(self, bx, bz):
+        """Index of each block (bx, bz), or -1 where there is none."""
+        codes = self.code(bx, bz)
+        index = np.minimum(np.searchsorted(self.codes, codes), len(self.codes) - 1)
+        return np.where(self.codes[index] == codes, self.order[index], -1)
+
+    def cells(self, blocks):
+        """(gx, gz) of every core cell of blocks as (blocks, cells) arrays, counted in cells from the origin."""
+        rows, cols = np.divmod(np.arange(self.size * self.size), self.size)
+        return self.keys[blocks, 0, None] * self.size + cols, self.keys[blocks, 1, None] * self.size + rows
+
+    def slot(self, block, gx, gz):
+        """Index of cell (gx, gz) in the padded array of block."""
+        local_x = gx - self.keys[block, 0] * self.size + BLOCK_PAD
+        local_z = gz - self.keys[block, 1] * self.size + BLOCK_PAD
+        return (block * self.side + local_z) * self.side + local_x
+
+    def locate(self, slots):
+        """(block, gx, gz) of the cells at slots."""
+        block, local = np.divmod(slots, self.side * self.side)
+        local_z, local_x = np.divmod(local, self.side)
+        return (block, self.keys[block, 0] * self.size + local_x - BLOCK_PAD,
+                self.keys[block, 1] * self.size + local_z - BLOCK_PAD)
+
+    def copies(self, gx, gz, home=None):
+        """(which, slot): every slot holding cell (gx, gz), in its own block or on a neighbour's border.
+
+        home, the index of each cell's own block, is looked up when not given.
+        """
+        home_x, home_z = gx // self.size, gz // self.size
+        local_x, local_z = gx - home_x * self.size, gz - home_z * self.size
+        if home is None:
+            home = self.find(home_x, home_z)
+        own = np.nonzero(home >= 0)[0]
+        which, slots = [own], [self.slot(home[own], gx[own], gz[own])]
+        # Only cells within BLOCK_PAD of their block's edges are copied to its neighbours: [dbz + 1, dbx + 1, cell]
+        along_x = np.stack([local_x < BLOCK_PAD, np.ones(len(gx), dtype=bool), local_x >= self.size - BLOCK_PAD])
+        along_z = np.stack([local_z < BLOCK_PAD, np.ones(len(gz), dtype=bool), local_z >= self.size - BLOCK_PAD])
+        wanted = along_z[:, None] & along_x[None]
+        wanted[1, 1] = False
+        dz, dx, cells = np.nonzero(wanted)
+        block = np.full(len(cells), -1, dtype=np.int64)
+        known = home[cells] >= 0
+        block[known] = self.neighbours[home[cells[known]], dz[known], dx[known]]
+        if not known.all():
+            lost = ~known
+            block[lost] = self.find(home_x[cells[lost]] + dx[lost] - 1, home_z[cells[lost]] + dz[lost] - 1)
+        hit = block >= 0
+        which.append(cells[hit])
+        slots.append(self.slot(block[hit], gx[cells[hit]], gz[cells[hit]]))
+        return np.concatenate(which), np.concatenate(slots)
+
+    def empty(self, depth=1):
+        """A grid of empty slots holding depth points each."""
+        return np.full((len(self.keys) * self.side * self.side, depth), np.nan, dtype=np.complex64)
+
+    def clear(self, grid, slots, points):
+        """Which points, given as fractions of the cells at slots, are a spacing from everything in grid."""
+        ok = np.ones(len(slots), dtype=bool)
+        remaining = np.arange(len(slots))
+        # The adjacent cells reject most points, so the outer ring is only checked for the survivors
+        for near in (slice(0, ADJACENT), slice(ADJACENT, None)):
+            others = grid[slots[remaining, None] + self.offsets[near]]
+            # In cell units the spacing is sqrt(2); empty slots are NaN and never closer
+            hit = (np.abs(others + (self.shifts[near] - points[remaining, None])[..., None]) < math.sqrt(2)).any(
+                axis=(1, 2))
+            ok[remaining[hit]] = False
+            remaining = remaining[~hit]
+        return ok
+
+
+class Scatter:
+    """Seedable Poisson-disk placement over a spatial hash grid.
+
+    Each layer is placed on one grid of cell size spacing / sqrt(2) over the
+    whole region, so a cell holds at most one point and only the 5x5
+    neighbourhood needs checking. The grid exists only in the blocks the
+    region reaches, and the region test runs once per cell up front: cells out
+    of its reach take no darts, and only darts in cells on its edges are
+    tested exactly. Cells whose indices agree modulo 3 are far enough apart to
+    accept darts in parallel, which keeps the work vectorized and bounded: a
+    full region can never loop forever. Points from earlier layers stay in
+    the scatter and keep later layers at bay.
+    """
+
+    def __init__(self, seed=None, rounds=PLACEMENT_ROUNDS):
+        self.rng = np.random.default_rng(seed)
+        self.rounds = rounds
+        self.points = np.empty((0, 2))
+
+    def occupy(self, positions):
+        """Mark existing positions so later layers keep their distance."""
+        if len(positions):
+            self.points = np.vstack([self.points, np.asarray(positions, dtype=np.float64).reshape(-1, 2)])
+
+    def place(self, region, spacing, count=None, density=1.0):
+        """Fill region at the given spacing, then keep count points (or a density fraction)."""
+        points = self._fill(region, spacing)
+        keep = len(points) if count is None else min(count, len(points))
+        keep = int(round(keep * density))
+        chosen = points[self.rng.permutation(len(points))[:keep]]
+        self.occupy(chosen)
+        return [tuple(p) for p in chosen.tolist()]
+
+    def _fill(self, region, spacing):
+        cell = spacing / math.sqrt(2)
+        grid = BlockGrid(region.blocks(PLACEMENT_BLOCK * cell), PLACEMENT_BLOCK)
+        slots, tests, nearby = self._classify(region, grid, cell)
+        if len(slots) == 0:
+            return np.empty((0, 2))
+
+        layer = grid.empty()
+        occupied = self._occupancy_grid(grid, cell)
+        block, gx, gz = grid.locate(slots)
+        phase = (gz % 3) * 3 + gx % 3
+        groups = [np.nonzero(phase == p)[0] for p in range(9)]
+        for _ in range(self.rounds):
+            for p, group in enumerate(groups):
+                # Cells filled in earlier rounds drop out for good
+                group = group[np.isnan(layer[slots[group], 0])]
+                groups[p] = group
+                if len(group) == 0:
+                    continue
+                points = (self.rng.random(len(group)) + 1j * self.rng.random(len(group))).astype(np.complex64)
+
+                # Cheapest tests first; each one shrinks the candidate set for the next
+                edge = np.nonzero(tests[group] >= 0)[0]
+                if len(edge):
+                    cells = group[edge]
+                    ok = np.ones(len(group), dtype=bool)
+                    ok[edge] = region.contains((gx[cells] + points[edge].real) * cell,
+                                               (gz[cells] + points[edge].imag) * cell,
+                                               None if nearby is None else nearby[tests[cells]])
+                    group, points = group[ok], points[ok]
+                for other in (layer, occupied):
+                    if other is not None and len(group):
+                        ok = grid.clear(other, slots[group], points)
+                        group, points = group[ok], points[ok]
+
+                which, copies = grid.copies(gx[group], gz[group], block[group])
+                layer[copies, 0] = points[which]
+
+        filled = np.nonzero(~np.isnan(layer[slots, 0]))[0]
+        fractions = layer[slots[filled], 0]
+        return np.stack([(gx[filled] + fractions.real) * cell, (gz[filled] + fractions.imag) * cell], axis=1)
+
+    @staticmethod
+    def _classify(region, grid, cell):
+        """Slots of the cells that can hold points, which of them need a dart test, and the region's data for it.
+
+        Cells are first tested a group of PLACEMENT_COARSE x PLACEMENT_COARSE at a
+        time from the group's centre, with the margin widened to cover the whole
+        group; only the groups straddling an edge of the region are tested cell
+        by cell. tests holds, for each cell, its row in the region's nearby
+        data, or -1 for cells lying wholly inside the region.
+        """
+        size, coarse = grid.size, PLACEMENT_COARSE
+        per_side = size // coarse
+        rows, cols = np.divmod(np.arange(size * size), size)
+        group_of = (rows // coarse) * per_side + cols // coarse
+        group_z, group_x = np.divmod(np.arange(per_side * per_side), per_side)
+        # Every point of a cell lies within half a spacing of its centre, every cell centre within reach of its group's
+        margin = cell / math.sqrt(2)
+        reach = (coarse - 1) / 2 * math.sqrt(2) * cell
+
+        slots, inside, xs, zs, owners = [], [], [], [], []
+        for first in range(0, len(grid.keys), PLACEMENT_BLOCKS_PER_PASS):
+            blocks = np.arange(first, min(first + PLACEMENT_BLOCKS_PER_PASS, len(grid.keys)))
+            keys = grid.keys[blocks]
+            centre_x = (keys[:, 0, None] * size + group_x * coarse + coarse / 2) * cell
+            centre_z = (keys[:, 1, None] * size + group_z * coarse + coarse / 2) * cell
+            near_group, inside_group = region.classify(centre_x.ravel(), centre_z.ravel(),
+                                                       np.repeat(blocks, per_side * per_side), margin + reach)
+            cell_near = near_group.reshape(len(blocks), -1)[:, group_of]
+            cell_inside = inside_group.reshape(len(blocks), -1)[:, group_of]
+
+            gx, gz = grid.cells(blocks)
+            block = np.broadcast_to(blocks[:, None], gx.shape)
+            undecided = cell_near & ~cell_inside
+            cell_near[undecided], cell_inside[undecided] = region.classify(
+                (gx[undecided] + 0.5) * cell, (gz[undecided] + 0.5) * cell, block[undecided], margin)
+            slots.append(grid.slot(block[cell_near], gx[cell_near], gz[cell_near]))
+            inside.append(cell_inside[cell_near])
+            edge = cell_near & ~cell_inside
+            xs.append((gx[edge] + 0.5) * cell)
+            zs.append((gz[edge] + 0.5) * cell)
+            owners.append(block[edge])
+
+        inside = np.concatenate(inside)
+        tests = np.full(len(inside), -1, dtype=np.int64)
+        tests[~inside] = np.arange(np.count_nonzero(~inside))
+        nearby = region.nearby(np.concatenate(xs), np.concatenate(zs), np.concatenate(owners), margin)
+        return np.concatenate(slots), tests, nearby
+
+    def _occupancy_grid(self, grid, cell):
+        """Bucket earlier points into the layer's blocks, as many per slot as fall in it."""
+        if len(self.points) == 0:
+            return None
+        gx = np.floor(self.points[:, 0] / cell).astype(np.int64)
+        gz = np.floor(self.points[:, 1] / cell).astype(np.int64)
+        which, slots = grid.copies(gx, gz)
+        if len(which) == 0:
+            return None
+
+        order = np.argsort(slots, kind='stable')
+        which, slots = which[order], slots[order]
+        depth = np.arange(len(slots)) - np.searchsorted(slots, slots)
+        occupied = grid.empty(int(depth.max()) + 1)
+        occupied[slots, depth] = (self.points[which, 0] / cell - gx[which]
+                                  + 1j * (self.points[which, 1] / cell - gz[which]))
+        return occupied
@@ -0,0 +1,105 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+import pygame
+
+# Set PROFILE=1 to profile from the start of a mode; PROFILE_KEY toggles it at any time
+PROFILE_ON_START = bool(os.environ.get('PROFILE'))
+PROFILE_KEY = pygame.K_F11
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+# Seconds between samples of the game thread's stack
+PROFILE_INTERVAL = 0.002
+# A recording stops by itself after this many frames so a forgotten one stays small
+PROFILE_FRAMES = int(os.environ.get('PROFILE_FRAMES', 1800))
+PROFILE_MAX_DEPTH = 64
+
+
+def frame_label(code):
+    """module.qualname of a code object, e.g. OBJ.OBJ.render."""
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    # co_qualname is new in Python 3.11
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class SamplingProfiler:
+    """Samples the stack of the thread that started it from a background thread.
+
+    Each sample is counted under the current mode and frame phase, which the
+    game loop sets with phase(). stop() writes the counts as collapsed stacks
+    (mode;phase;outer;...;inner count), the input format of flamegraph.pl and
+    speedscope, and prints the most expensive functions and phases.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL, max_frames=PROFILE_FRAMES, directory=PROFILE_DIR):
+        self.interval = interval
+        self.max_frames = max_frames
+        self.directory = directory
+        self.recording = False
+        self.current_phase = 'other'
+
+    def toggle(self, mode):
+        if self.recording:
+            self.stop()
+        else:
+            self.start(mode)
+
+    def start(self, mode):
+        self.mode = mode
+        self.counts = Counter()
+        self.frames = 0
+        self.target = threading.get_ident()
+        self.recording = True
+        self.started = time.perf_counter()
+        self.sampler = threading.Thread(target=self._sample, daemon=True)
+        self.sampler.start()
+        print(f"[profile] sampling {mode} every {self.interval * 1000:.0f} ms")
+
+    def phase(self, name):
+        """Tag the following samples with a frame phase such as 'physics' or 'render'."""
+        self.current_phase = name
+
+    def frame(self):
+        """Count a finished frame; stops the recording once max_frames is reached."""
+        if self.recording:
+            self.frames += 1
+            if self.frames >= self.max_frames:
+                self.stop()
+
+    def _sample(self):
+        while self.recording:
+            frame = sys._current_frames().get(self.target)
+            phase = self.current_phase
+            stack = []
+            while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.counts[(phase, tuple(reversed(stack)))] += 1
+            time.sleep(self.interval)
+
+    def stop(self):
+        """End the recording, write the collapsed stacks and print a summary."""
+        if not self.recording:
+            return
+        self.recording = False
+        self.sampler.join()
+        elapsed = time.perf_counter() - self.started
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self.mode}-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        with open(path, 'w') as f:
+            for (phase, stack), count in sorted(self.counts.items()):
+                f.write(f"{self.mode};{phase};{';'.join(stack)} {count}\n")
+
+        total = sum(self.counts.values()) or 1
+        phases = Counter()
+        own = Counter()
+        for (phase, stack), count in self.counts.items():
+            phases[phase] += count
+            own[stack[-1]] += count
+        print(f"[profile] {total} samples over {self.frames} frames in {elapsed:.1f} s written to {path}")
+        print("  by phase: " + ", ".join(f"{phase} {100 * count / total:.0f}%" for phase, count in phases.most_common()))
+        for label, count in own.most_common(10):
+            print(f"  {100 * count / total:5.1f}%  {label}")
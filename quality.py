@@ -0,0 +1,111 @@
+import csv
+import os
+import time
+from collections import deque
+
+# Presets from most to least expensive; the governor moves one step at a time
+QUALITY_PRESETS = (
+    {'name': 'ultra', 'draw_distance': 200.0, 'grass_distance': 80.0, 'scenery_density': 1.0, 'impostors': True},
+    {'name': 'high', 'draw_distance': 160.0, 'grass_distance': 60.0, 'scenery_density': 1.0, 'impostors': True},
+    {'name': 'medium', 'draw_distance': 120.0, 'grass_distance': 45.0, 'scenery_density': 0.75, 'impostors': True},
+    {'name': 'low', 'draw_distance': 90.0, 'grass_distance': 30.0, 'scenery_density': 0.5, 'impostors': False},
+    {'name': 'minimum', 'draw_distance': 60.0, 'grass_distance': 0.0, 'scenery_density': 0.3, 'impostors': False},
+)
+
+QUALITY_TARGET_FPS = 60
+# Rolling window of frame times the decisions are based on
+QUALITY_WINDOW = 90
+# Step down when the window mean is this far over budget, up when this far under
+QUALITY_DOWN_MARGIN = 0.1
+QUALITY_UP_MARGIN = 0.25
+# Seconds to settle after any change, and to stay under budget before stepping up
+QUALITY_SETTLE_TIME = 1.5
+QUALITY_UPGRADE_TIME = 4.0
+# Set to a file path to append every decision as a CSV row
+QUALITY_LOG = os.environ.get('QUALITY_LOG')
+
+
+def scenery_visible(index, density):
+    """Whether instance index is part of the given density; subsets nest and spread evenly."""
+    return (index * 0.6180339887) % 1.0 < density
+
+
+class QualityGovernor:
+    """Steps through QUALITY_PRESETS to hold a frame-time budget.
+
+    Hysteresis comes from three places: stepping down and up use different
+    margins, stepping up needs QUALITY_UPGRADE_TIME of headroom, and every time
+    a level is abandoned for being too slow the wait before retrying it doubles.
+    When a ResolutionController is given, quality only drops once resolution
+    is at its floor and only rises once resolution is back at full scale.
+    """
+
+    def __init__(self, mode, presets=QUALITY_PRESETS, level=0, target_fps=QUALITY_TARGET_FPS, resolution=None):
+        self.mode = mode
+        self.presets = presets
+        self.level = level
+        self.target_ms = 1000.0 / target_fps
+        self.resolution = resolution
+        self.frames = deque(maxlen=QUALITY_WINDOW)
+        self.settle = QUALITY_SETTLE_TIME
+        self.headroom = 0.0
+        self.upgrade_time = [QUALITY_UPGRADE_TIME] * len(presets)
+        self.last = time.perf_counter()
+
+    @property
+    def preset(self):
+        return self.presets[self.level]
+
+    def update(self, frame_ms):
+        """Feed one frame's time in milliseconds; returns True when the preset changed.
+
+        frame_ms is the work that should fit the budget; settle and upgrade
+        waits run on wall-clock time, so frames that sleep to a cap count too.
+        """
+        self.frames.append(frame_ms)
+        now = time.perf_counter()
+        seconds = now - self.last
+        self.last = now
+        if self.settle > 0:
+            self.settle -= seconds
+            return False
+        if len(self.frames) < self.frames.maxlen:
+            return False
+
+        mean = sum(self.frames) / len(self.frames)
+        resolution_floor = self.resolution is None or self.resolution.scale <= self.resolution.min_scale
+        resolution_ceiling = self.resolution is None or self.resolution.scale >= self.resolution.max_scale
+
+        if mean > self.target_ms * (1 + QUALITY_DOWN_MARGIN):
+            self.headroom = 0.0
+            if self.level < len(self.presets) - 1 and resolution_floor:
+                # This level could not hold the budget; be slower to come back to it
+                self.upgrade_time[self.level] *= 2
+                self._change(self.level + 1, mean, 'over budget')
+                return True
+        elif mean < self.target_ms * (1 - QUALITY_UP_MARGIN) and resolution_ceiling:
+            self.headroom += seconds
+            if self.level > 0 and self.headroom >= self.upgrade_time[self.level - 1]:
+                self._change(self.level - 1, mean, 'headroom')
+                return True
+        else:
+            self.headroom = 0.0
+        return False
+
+    def _change(self, level, mean, reason):
+        ordered = sorted(self.frames)
+        p95 = ordered[int(len(ordered) * 0.95) - 1]
+        old = self.preset['name']
+        self.level = level
+        self.settle = QUALITY_SETTLE_TIME
+        self.headroom = 0.0
+        self.frames.clear()
+        print(f"[quality] {self.mode}: {old} -> {self.preset['name']} ({reason}, mean {mean:.1f} ms, "
+              f"p95 {p95:.1f} ms, target {self.target_ms:.1f} ms)")
+        if QUALITY_LOG:
+            try:
+                with open(QUALITY_LOG, 'a', newline='') as f:
+                    csv.writer(f).writerow([time.strftime('%Y-%m-%d %H:%M:%S'), self.mode, old, self.preset['name'],
+                                            reason, f"{mean:.2f}", f"{p95:.2f}", f"{self.target_ms:.2f}"])
+            except OSError as e:
+                print(f"Failed to write quality log: {e}")
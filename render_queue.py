@@ -0,0 +1,228 @@
+import math
+from OpenGL.GL import *
+from OBJ import set_texture_matrix
+
+# Draw order of the layers; inside a layer items are sorted by GL state
+OPAQUE = 0
+TRANSPARENT = 1
+OVERLAY = 2
+
+# Item kinds
+MESH = 0  # indexed OBJ material
+ARRAYS = 1  # un-indexed static batch part
+CALLABLE = 2  # immediate-mode drawing that manages its own state
+
+STRIDE = 32  # 3 pos (12) + 2 tex (8) + 3 norm (12)
+
+
+class RenderItem:
+    __slots__ = ('kind', 'layer', 'texture', 'uv_transform', 'vertex_buffer', 'index_buffer', 'count',
+                 'index_type', 'color', 'transform', 'depth', 'order', 'draw')
+
+    def __init__(self, kind, layer, depth, order, texture=0, uv_transform=(), vertex_buffer=None,
+                 index_buffer=None, count=0, index_type=None, color=(1, 1, 1), transform=None, draw=None):
+        self.kind = kind
+        self.layer = layer
+        self.depth = depth
+        self.order = order
+        self.texture = texture
+        self.uv_transform = uv_transform
+        self.vertex_buffer = vertex_buffer
+        self.index_buffer = index_buffer
+        self.count = count
+        self.index_type = index_type
+        self.color = color
+        self.transform = transform
+        self.draw = draw
+
+    def sort_key(self):
+        if self.layer == OPAQUE:
+            # Group by texture, atlas tile and buffer, front-to-back inside each group
+            return (OPAQUE, self.kind == CALLABLE, self.texture, self.uv_transform, id(self.vertex_buffer),
+                    self.depth)
+        if self.layer == TRANSPARENT:
+            return (TRANSPARENT, -self.depth, self.order)
+        return (OVERLAY, self.order)
+
+
+class RenderQueue:
+    """Frame-level list of draws, issued sorted by blend mode, texture and buffer.
+
+    Opaque geometry is drawn front-to-back, transparent geometry back-to-front
+    and overlays (the HUD) last in submission order. Shared client state is set
+    once for the whole run of VBO items. A frame may flush more than once (the
+    scene, then the HUD on top); stats totals every flush since begin() and
+    compares the GL state changes issued with what drawing every item on its own
+    would cost.
+    """
+
+    def __init__(self):
+        self.items = []
+        self.camera = (0.0, 0.0, 0.0)
+        self.naive_changes = 0
+        self.stats = {'items': 0, 'state_changes': 0, 'naive_state_changes': 0, 'saved': 0}
+
+    def begin(self, camera):
+        """Start a new frame seen from camera (x, y, z)."""
+        self.items = []
+        self.camera = camera
+        self.naive_changes = 0
+        self.stats = dict.fromkeys(self.stats, 0)
+
+    def _depth(self, x, y, z):
+        cx, cy, cz = self.camera
+        return math.sqrt((x - cx) ** 2 + (y - cy) ** 2 + (z - cz) ** 2)
+
+    def submit_model(self, model, x, y, z, angle=0.0, scale=1.0):
+        """Queue every material of an OBJ placed at (x, y, z), turned by angle about y."""
+        depth = self._depth(x, y, z)
+        transform = (x, y, z, angle, scale)
+        # OBJ.render toggles texturing and three client arrays on and off and
+        # binds its vertex buffer on every call
+        self.naive_changes += 9
+        for material, (index_vbo, count) in model.vbos.items():
+            mat = model.materials.get(material, {})
+            color = mat.get('Kd', (1, 1, 1))
+            transparent = bool(material) and material.lower() == "window"
+            uv_transform = mat.get('uv_transform') or ()
+            self.items.append(RenderItem(
+                MESH, TRANSPARENT if transparent else OPAQUE, depth, len(self.items),
+                texture=mat.get('texture_id') or 0, uv_transform=uv_transform, vertex_buffer=model.vertex_vbo,
+                index_buffer=index_vbo, count=count, index_type=model.index_type,
+                color=(*color, 0.4) if transparent else tuple(color), transform=transform,
+            ))
+            self.naive_changes += 4 if transparent else 2
+            if uv_transform:
+                self.naive_changes += 2
+
+    def submit_batch(self, batch):
+        """Queue every part of a StaticBatch; its vertices are already in world space."""
+        depth = self._depth(batch.center[0], 0.0, batch.center[1])
+        self.naive_changes += 8
+        for vbo_id, count, color, texture_id in batch.parts:
+            self.items.append(RenderItem(
+                ARRAYS, OPAQUE, depth, len(self.items), texture=texture_id or 0,
+                vertex_buffer=vbo_id, count=count, color=tuple(color),
+            ))
+            self.naive_changes += 2
+
+    def submit_draw(self, draw, layer=OPAQUE, position=None):
+        """Queue an immediate-mode draw function that sets up its own GL state."""
+        depth = self._depth(*position) if position is not None else 0.0
+        self.items.append(RenderItem(CALLABLE, layer, depth, len(self.items), draw=draw))
+
+    def flush(self):
+        """Draw and clear everything submitted since begin() or the previous flush."""
+        changes = 0
+        arrays_on = False
+        blend_on = None
+        texture = None
+        uv_transform = ()
+        vertex_buffer = None
+
+        for item in sorted(self.items, key=RenderItem.sort_key):
+            if item.kind == CALLABLE:
+                if arrays_on:
+                    glDisableClientState(GL_VERTEX_ARRAY)
+                    glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+                    glDisableClientState(GL_NORMAL_ARRAY)
+                    glDisable(GL_TEXTURE_2D)
+                    glBindBuffer(GL_ARRAY_BUFFER, 0)
+                    glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+                    changes += 4
+                    arrays_on = False
+                if blend_on:
+                    glDisable(GL_BLEND)
+                    changes += 1
+                blend_on = None
+                texture = None
+                vertex_buffer = None
+                if uv_transform:
+                    set_texture_matrix(None)
+                    changes += 1
+                    uv_transform = ()
+                item.draw()
+                continue
+
+            if not arrays_on:
+                glEnable(GL_TEXTURE_2D)
+                glEnableClientState(GL_VERTEX_ARRAY)
+                glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+                glEnableClientState(GL_NORMAL_ARRAY)
+                changes += 4
+                arrays_on = True
+
+            transparent = item.layer == TRANSPARENT
+            if transparent != blend_on:
+                if transparent:
+                    glEnable(GL_BLEND)
+                    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+                else:
+                    glDisable(GL_BLEND)
+                changes += 1
+                blend_on = transparent
+
+            if item.texture != texture:
+                glBindTexture(GL_TEXTURE_2D, item.texture)
+                changes += 1
+                texture = item.texture
+
+            if item.uv_transform != uv_transform:
+                set_texture_matrix(item.uv_transform)
+                changes += 1
+                uv_transform = item.uv_transform
+
+            if item.vertex_buffer is not vertex_buffer:
+                vbo_id = item.vertex_buffer
+                vbo_id.bind()
+                glVertexPointer(3, GL_FLOAT, STRIDE, vbo_id)
+                glTexCoordPointer(2, GL_FLOAT, STRIDE, vbo_id + 12)
+                glNormalPointer(GL_FLOAT, STRIDE, vbo_id + 20)
+                changes += 1
+                vertex_buffer = vbo_id
+
+            if len(item.color) == 4:
+                glColor4f(*item.color)
+            else:
+                glColor3fv(item.color)
+
+            if item.transform is not None:
+                x, y, z, angle, scale = item.transform
+                glPushMatrix()
+                glTranslatef(x, y, z)
+                glRotatef(angle, 0, 1, 0)
+                glScalef(scale, scale, scale)
+
+            if item.kind == MESH:
+                item.index_buffer.bind()
+                glDrawElements(GL_TRIANGLES, item.count, item.index_type, item.index_buffer)
+                changes += 1
+            else:
+                glDrawArrays(GL_TRIANGLES, 0, item.count)
+
+            if item.transform is not None:
+                glPopMatrix()
+
+        if arrays_on:
+            glDisableClientState(GL_VERTEX_ARRAY)
+            glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+            glDisableClientState(GL_NORMAL_ARRAY)
+            glDisable(GL_TEXTURE_2D)
+            glBindTexture(GL_TEXTURE_2D, 0)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+            changes += 4
+        if blend_on:
+            glDisable(GL_BLEND)
+            changes += 1
+        if uv_transform:
+            set_texture_matrix(None)
+            changes += 1
+
+        self.stats['items'] += len(self.items)
+        self.stats['state_changes'] += changes
+        self.stats['naive_state_changes'] += self.naive_changes
+        self.stats['saved'] += self.naive_changes - changes
+        self.items = []
+        self.naive_changes = 0
+        return self.stats
@@ -0,0 +1,241 @@
+import math
+import numpy as np
+from OpenGL.GL import *
+from RoadSegment import RoadSegment
+from gpu_resources import create_vbo, delete_vbo
+
+ROAD_COLOR = (0.40, 0.25, 0.13)
+GRASS_COLOR = (0.3, 0.8, 0.2)
+# Grass reaches this far beyond each road edge, slightly below the road surface
+GRASS_MARGIN = 15.0
+GRASS_Y = -0.01
+
+# A new sample is kept once the centre line's heading has ranged over this many degrees since the last one;
+# at the outer grass edge, 17 units out, turning within that range moves the edge at most about 0.07 units
+SPLINE_MAX_TURN = 10.0
+# ...or once a skipped sample would lie this far from the straight chord drawn in its place
+SPLINE_MAX_ERROR = 0.05
+# ...or once this far from the last one, so straights stay a few long quads
+SPLINE_MAX_STEP = 30.0
+# Candidate samples evaluated per control span before the adaptive thinning
+SPLINE_SUBDIVISIONS = 16
+# Samples whose spans adaptive_samples measures in one pass, bounding its (samples, window) arrays
+SPLINE_BLOCK = 4096
+# Samples ahead every span is first tried against; spans reaching further are measured again in full
+SPLINE_SHORT_WINDOW = 12
+# Side of the grid cells RoadIndex files segments under, about two generated segments long
+ROAD_INDEX_CELL = 12.0
+
+
+def catmull_rom(points, subdivisions=SPLINE_SUBDIVISIONS):
+    """Sample a uniform Catmull-Rom spline through points.
+
+    Returns (positions, tangents) as (n, 2) arrays; the curve passes through
+    every control point, and the ends are extended by mirroring so the first
+    and last spans have tangents too.
+    """
+    p = np.asarray(points, dtype=np.float64)
+    padded = np.concatenate([2 * p[:1] - p[1:2], p, 2 * p[-1:] - p[-2:-1]])
+    p0, p1, p2, p3 = padded[:-3], padded[1:-2], padded[2:-1], padded[3:]
+
+    t = np.linspace(0.0, 1.0, subdivisions, endpoint=False)[None, :, None]
+    t2, t3 = t * t, t * t * t
+    a, b, c, d = (p0[:, None], p1[:, None], p2[:, None], p3[:, None])
+    positions = 0.5 * (2 * b + (c - a) * t + (2 * a - 5 * b + 4 * c - d) * t2 + (3 * b - a - 3 * c + d) * t3)
+    tangents = 0.5 * ((c - a) + 2 * (2 * a - 5 * b + 4 * c - d) * t + 3 * (3 * b - a - 3 * c + d) * t2)
+
+    # The last control point closes the curve; its tangent is the end of the last span
+    end_tangent = 0.5 * (p3[-1] - p1[-1])
+    positions = np.concatenate([positions.reshape(-1, 2), p[-1:]])
+    tangents = np.concatenate([tangents.reshape(-1, 2), end_tangent[None]])
+    return positions, tangents
+
+
+def adaptive_samples(positions, tangents, max_turn=SPLINE_MAX_TURN, max_step=SPLINE_MAX_STEP,
+                     max_error=SPLINE_MAX_ERROR):
+    """Indices of the samples to keep: dense where the curve bends, sparse on straights.
+
+    From each kept sample the span runs on to the furthest sample it can reach
+    while the heading stays within max_turn over the whole span, every skipped
+    sample stays within max_error of the chord and the chord is at most
+    max_step long; so an S-bend that swings out and back is split even though
+    its ends point the same way.
+    """
+    n = len(positions)
+    if n < 3:
+        return np.arange(n)
+    headings = np.unwrap(np.arctan2(tangents[:, 0], tangents[:, 1]))
+    steps = np.diff(positions, axis=0)
+    secants = np.unwrap(np.arctan2(steps[:, 0], steps[:, 1]))
+    lengths = np.concatenate([[0.0], np.cumsum(np.hypot(steps[:, 0], steps[:, 1]))])
+    # No chord is longer than its arc, so no span can run past max_step of arc
+    window = int((np.searchsorted(lengths, lengths + max_step, side='right') - np.arange(n)).max()) + 1
+
+    reach = np.empty(n - 1, dtype=np.int64)
+    curve = (positions, headings, secants, lengths)
+    limits = (math.radians(max_turn), max_step, max_error)
+    for first in range(0, n - 1, SPLINE_BLOCK):
+        starts = np.arange(first, min(first + SPLINE_BLOCK, n - 1))
+        # Most spans end within a few samples; only the starts a short window cannot settle get the full one
+        found, settled = span_reach(starts, *curve, min(window, SPLINE_SHORT_WINDOW), *limits)
+        if not settled.all():
+            found[~settled], _ = span_reach(starts[~settled], *curve, window, *limits)
+        reach[starts] = found
+
+    keep = [0]
+    while keep[-1] < n - 1:
+        keep.append(int(reach[keep[-1]]))
+    return np.array(keep)
+
+
+def span_reach(starts, positions, headings, secants, lengths, window, max_turn, max_step, max_error):
+    """The furthest sample a single span from each of starts can end on within window samples.
+
+    Also returns which starts were settled, having hit a limit inside the window.
+    Arrays run (offset, start) so the running heading ranges accumulate along
+    contiguous rows.
+    """
+    n = len(positions)
+    xs, zs = positions[:, 0], positions[:, 1]
+    offsets = np.arange(window + 1)
+    spans = np.minimum(starts[None, :] + offsets[:, None], n - 1)
+    ends = spans[1:]
+
+    # Heading ranges over each span: tangents for the turn, the polyline between samples for the error bound
+    h = headings[spans]
+    turn = np.maximum.accumulate(h)[1:] - np.minimum.accumulate(h)[1:]
+    h = secants[np.minimum(spans[:-1], n - 2)]
+    bend = np.maximum.accumulate(h) - np.minimum.accumulate(h)
+    chord_x, chord_z = xs[ends] - xs[starts], zs[ends] - zs[starts]
+    step = np.hypot(chord_x, chord_z)
+    bad = (spans[1:] == spans[:-1]) | (turn > max_turn) | (step > max_step)
+    limit = np.where(bad.any(axis=0), bad.argmax(axis=0), window)
+
+    # Every polyline heading lies within bend of the chord's, so no skipped sample is further from it than
+    # half the arc times sin(bend); only the spans where that bound is too loose are measured sample by sample
+    arc = lengths[ends] - lengths[starts]
+    loose = (np.arange(window)[:, None] < limit) & (arc * np.sin(np.minimum(bend, math.pi / 2)) > 2 * max_error)
+    cols, rows = np.nonzero(loose)
+    order = np.argsort(-cols, kind='stable')
+    rows, cols = rows[order], cols[order]
+    cx, cz = chord_x[cols, rows], chord_z[cols, rows]
+    length = np.maximum(step[cols, rows], 1e-12)
+    first = starts[rows]
+    error = np.zeros(len(rows))
+    for skipped in range(1, int(cols[0]) + 1 if len(cols) else 1):
+        # Spans are sorted longest first, so the ones skipping this many samples are a prefix
+        count = int(np.searchsorted(-cols, -skipped, side='right'))
+        i = first[:count]
+        distance = np.abs(cx[:count] * (zs[i + skipped] - zs[i]) - cz[:count] * (xs[i + skipped] - xs[i]))
+        np.maximum(error[:count], distance / length[:count], out=error[:count])
+    bad[cols, rows] |= error > max_error
+
+    settled = bad.any(axis=0)
+    first_bad = np.where(settled, bad.argmax(axis=0), window)
+    return starts + np.maximum(first_bad, 1), settled
+
+
+def centre_line(road):
+    """Adaptively sampled (positions, tangents) of the spline through a road's segment end points."""
+    points = [road[0].p1] + [seg.p2 for seg in road]
+    positions, tangents = catmull_rom(points)
+    keep = adaptive_samples(positions, tangents)
+    return positions[keep], tangents[keep]
+
+
+def centre_line_segments(road, width=None):
+    """The sampled centre line as RoadSegments, for on-road tests that match the drawn road."""
+    positions, _ = centre_line(road)
+    centre = [tuple(p) for p in positions.tolist()]
+    return [RoadSegment(a, b, width or road[0].width) for a, b in zip(centre, centre[1:])]
+
+
+class RoadIndex:
+    """A road's segments filed under every grid cell their bounds overlap.
+
+    near() returns the few segments around a point, so per-tick on-road tests
+    cost the same on a 60 km import as on the generated road. It indexes and
+    iterates like the segment list it wraps, so it can be passed wherever a
+    road is expected.
+    """
+
+    def __init__(self, segments, cell_size=ROAD_INDEX_CELL):
+        self.segments = list(segments)
+        self.cell_size = cell_size
+        self.cells = {}
+        for seg in self.segments:
+            (x1, z1), (x2, z2) = seg.p1, seg.p2
+            for cx in range(math.floor(min(x1, x2) / cell_size), math.floor(max(x1, x2) / cell_size) + 1):
+                for cz in range(math.floor(min(z1, z2) / cell_size), math.floor(max(z1, z2) / cell_size) + 1):
+                    self.cells.setdefault((cx, cz), []).append(seg)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def __getitem__(self, index):
+        return self.segments[index]
+
+    def __iter__(self):
+        return iter(self.segments)
+
+    def near(self, point, radius):
+        """Every segment that comes within radius of point, plus possibly a few that do not."""
+        x, z = point
+        size = self.cell_size
+        found = []
+        for cx in range(math.floor((x - radius) / size), math.floor((x + radius) / size) + 1):
+            for cz in range(math.floor((z - radius) / size), math.floor((z + radius) / size) + 1):
+                found.extend(self.cells.get((cx, cz), ()))
+        return found
+
+
+def strip_vertices(positions, tangents, half_width, y):
+    """Interleaved left/right edge vertices of a GL_TRIANGLE_STRIP following the centre line."""
+    directions = tangents / np.linalg.norm(tangents, axis=1, keepdims=True)
+    normals = np.stack([-directions[:, 1], directions[:, 0]], axis=1) * half_width
+    strip = np.empty((len(positions) * 2, 3), dtype=np.float32)
+    strip[0::2, 0], strip[0::2, 2] = (positions - normals).T
+    strip[1::2, 0], strip[1::2, 2] = (positions + normals).T
+    strip[:, 1] = y
+    return strip
+
+
+class RoadMesh:
+    """The road and its grass verges as two continuous triangle strips along a spline.
+
+    The spline runs through the end points of the road's segments and is
+    sampled adaptively, so sharp bends get more vertices than straights and
+    no joints need patching. segments holds the sampled centre line as
+    RoadSegments for on-road tests that should match what is drawn.
+    """
+
+    def __init__(self, road, width=None):
+        width = width or road[0].width
+        positions, tangents = centre_line(road)
+
+        road_strip = strip_vertices(positions, tangents, width / 2, 0.0)
+        grass_strip = strip_vertices(positions, tangents, width / 2 + GRASS_MARGIN, GRASS_Y)
+        self.road_count = len(road_strip)
+        self.grass_count = len(grass_strip)
+        self.vertex_count = self.road_count + self.grass_count
+        self.vertex_buffer = create_vbo(np.concatenate([road_strip, grass_strip]), 'road mesh')
+
+        centre = [tuple(p) for p in positions.tolist()]
+        self.segments = [RoadSegment(a, b, width) for a, b in zip(centre, centre[1:])]
+        self.start = tuple(road[0].p1)
+        self.end = tuple(road[-1].p2)
+
+    def render(self):
+        glNormal3f(0.0, 1.0, 0.0)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        self.vertex_buffer.bind()
+        glVertexPointer(3, GL_FLOAT, 12, self.vertex_buffer)
+        glColor3f(*ROAD_COLOR)
+        glDrawArrays(GL_TRIANGLE_STRIP, 0, self.road_count)
+        glColor3f(*GRASS_COLOR)
+        glDrawArrays(GL_TRIANGLE_STRIP, self.road_count, self.grass_count)
+        self.vertex_buffer.unbind()
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+    def delete(self):
+        delete_vbo(self.vertex_buffer)
@@ -0,0 +1,112 @@
+import os
+import statistics
+import sys
+import threading
+import time
+from frame_timing import PHYSICS_HZ, MAX_FRAME_TIME
+
+# Set DRIVING_SIM_THREAD=1 to run the driving simulation on its own thread
+SIM_THREAD = bool(os.environ.get('DRIVING_SIM_THREAD'))
+# The simulation thread needs the interpreter lock within a fraction of a tick;
+# the default 5 ms switch interval would show up as tick jitter
+SIM_SWITCH_INTERVAL = 0.0005
+
+
+class SnapshotBuffer:
+    """Double buffer for immutable snapshots handed from one thread to another.
+
+    The writer fills the slot readers are not pointed at, then flips the
+    index; both steps are single reference stores, so readers take the
+    latest snapshot without a lock and never see a half-built one.
+    """
+
+    def __init__(self, initial):
+        self.slots = [initial, initial]
+        self.front = 0
+
+    def publish(self, snapshot):
+        back = 1 - self.front
+        self.slots[back] = snapshot
+        self.front = back
+
+    def latest(self):
+        return self.slots[self.front]
+
+
+class TimingStats:
+    """Tick intervals and input latencies of one driving session, summarized when it ends."""
+
+    def __init__(self, mode, dt=1.0 / PHYSICS_HZ):
+        self.mode = mode
+        self.dt = dt
+        self.tick_times = []
+        self.latencies = []
+
+    def tick(self, now):
+        self.tick_times.append(now)
+
+    def presented(self, input_time, now):
+        """Count a presented frame whose newest simulation tick used input sampled at input_time."""
+        self.latencies.append(now - input_time)
+
+    def report(self):
+        intervals = [b - a for a, b in zip(self.tick_times, self.tick_times[1:])]
+        if not intervals or not self.latencies:
+            return
+        deviations = sorted(abs(interval - self.dt) for interval in intervals)
+        latencies = sorted(self.latencies)
+        print(f"[sim] {self.mode}: {len(self.tick_times)} ticks, interval {statistics.mean(intervals) * 1000:.2f} ms, "
+              f"jitter {statistics.pstdev(intervals) * 1000:.2f} ms stdev, "
+              f"p95 {deviations[int(len(deviations) * 0.95)] * 1000:.2f} ms off {self.dt * 1000:.2f} ms")
+        print(f"[sim] {self.mode}: input latency mean {statistics.mean(latencies) * 1000:.1f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms over {len(latencies)} frames")
+
+
+class SimulationThread:
+    """Calls tick(dt) at a fixed rate on a background thread until stopped.
+
+    Ticks are scheduled on absolute times, so a late tick does not push the
+    following ones back; after a stall longer than MAX_FRAME_TIME the
+    schedule restarts instead of running a burst of catch-up ticks. An
+    exception in tick() stops the thread and is raised again by check().
+    """
+
+    def __init__(self, tick, stats, hz=PHYSICS_HZ):
+        self.tick = tick
+        self.stats = stats
+        self.dt = 1.0 / hz
+        self.running = False
+        self.error = None
+
+    def start(self):
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(SIM_SWITCH_INTERVAL)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='simulation', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        next_tick = time.perf_counter()
+        try:
+            while self.running:
+                now = time.perf_counter()
+                if now < next_tick:
+                    time.sleep(next_tick - now)
+                    continue
+                if now - next_tick > MAX_FRAME_TIME:
+                    next_tick = now
+                self.stats.tick(now)
+                self.tick(self.dt)
+                next_tick += self.dt
+        except Exception as e:
+            self.error = e
+            self.running = False
+
+    def check(self):
+        if self.error:
+            raise self.error
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        sys.setswitchinterval(self.switch_interval)
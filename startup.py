@@ -0,0 +1,34 @@
+import time
+
+# Target time from main.py starting to the first presented frame, on a warm start
+STARTUP_BUDGET = 1.5  # seconds
+
+_start = time.perf_counter()
+_last = _start
+_phases = []
+_reported = False
+
+
+def mark(phase):
+    """Record the time since the previous mark as the named startup phase."""
+    global _last
+    if _reported:
+        return
+    now = time.perf_counter()
+    _phases.append((phase, now - _last))
+    _last = now
+
+
+def first_frame():
+    """Mark the first presented frame and print the startup breakdown, once."""
+    global _reported
+    if _reported:
+        return
+    mark("first frame")
+    _reported = True
+    total = _last - _start
+    print("Startup timing:")
+    for phase, seconds in _phases:
+        print(f"  {phase:<16} {seconds * 1000:8.1f} ms")
+    status = "within" if total <= STARTUP_BUDGET else "OVER"
+    print(f"  {'total':<16} {total * 1000:8.1f} ms ({status} {STARTUP_BUDGET * 1000:.0f} ms budget)")
@@ -0,0 +1,110 @@
+import numpy as np
+from OpenGL.GL import *
+from gpu_resources import create_vbo, delete_vbo
+
+
+def transform_vertices(data, xs, ys, zs, scales, angles):
+    """Return interleaved vertex data (n, 8) copied once per instance and moved into place.
+
+    Positions are scaled, turned about y by angles (degrees, glRotatef convention)
+    and translated; normals are only turned.
+    """
+    rad = np.radians(np.asarray(angles, dtype=np.float32))[:, None]
+    cos_a = np.cos(rad)
+    sin_a = np.sin(rad)
+    scales = np.asarray(scales, dtype=np.float32)[:, None]
+
+    px, py, pz = data[:, 0], data[:, 1], data[:, 2]
+    nx, ny, nz = data[:, 5], data[:, 6], data[:, 7]
+
+    out = np.empty((len(xs), len(data), 8), dtype=np.float32)
+    out[:, :, 0] = (px * cos_a + pz * sin_a) * scales + np.asarray(xs, dtype=np.float32)[:, None]
+    out[:, :, 1] = py * scales + np.asarray(ys, dtype=np.float32)[:, None]
+    out[:, :, 2] = (pz * cos_a - px * sin_a) * scales + np.asarray(zs, dtype=np.float32)[:, None]
+    out[:, :, 3:5] = data[:, 3:5]
+    out[:, :, 5] = nx * cos_a + nz * sin_a
+    out[:, :, 6] = ny
+    out[:, :, 7] = nz * cos_a - nx * sin_a
+    return out.reshape(-1, 8)
+
+
+class StaticBatch:
+    """Many placed copies of OBJ models merged into one VBO per model material.
+
+    Instances are (model, x, y, z, scale, angle) tuples. The batch never moves, so
+    all transforms are baked into the vertex data and a chunk of thousands of
+    objects costs one draw call per material.
+    """
+
+    def __init__(self, instances):
+        by_model = {}
+        for model, x, y, z, scale, angle in instances:
+            by_model.setdefault(model, []).append((x, y, z, scale, angle))
+
+        merged = {}
+        for model, placed in by_model.items():
+            xs, ys, zs, scales, angles = (np.array(column) for column in zip(*placed))
+            for material, data in model.material_vertex_arrays().items():
+                mat = model.materials.get(material, {})
+                key = (mat.get('Kd', (1, 1, 1)), mat.get('texture_id'))
+                merged.setdefault(key, []).append(transform_vertices(data, xs, ys, zs, scales, angles))
+
+        self.parts = []
+        self.vertex_count = 0
+        for (color, texture_id), arrays in merged.items():
+            data = np.concatenate(arrays)
+            self.parts.append((create_vbo(data, 'static batch'), len(data), color, texture_id))
+            self.vertex_count += len(data)
+
+        points = np.array([(x, z) for _, x, _, z, _, _ in instances], dtype=np.float32)
+        self.center = tuple(points.mean(axis=0)) if len(points) else (0.0, 0.0)
+        self.radius = float(np.hypot(*(points - self.center).T).max()) if len(points) else 0.0
+        self.instance_count = len(instances)
+
+    def render(self):
+        glEnable(GL_TEXTURE_2D)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+
+        for vbo_id, count, color, texture_id in self.parts:
+            glColor3fv(color)
+            glBindTexture(GL_TEXTURE_2D, texture_id or 0)
+
+            vbo_id.bind()
+            stride = 32  # 3 pos (12) + 2 tex (8) + 3 norm (12)
+            glVertexPointer(3, GL_FLOAT, stride, vbo_id)
+            glTexCoordPointer(2, GL_FLOAT, stride, vbo_id + 12)
+            glNormalPointer(GL_FLOAT, stride, vbo_id + 20)
+            glDrawArrays(GL_TRIANGLES, 0, count)
+            vbo_id.unbind()
+
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisable(GL_TEXTURE_2D)
+
+    def delete(self):
+        for vbo_id, _, _, _ in self.parts:
+            delete_vbo(vbo_id)
+        self.parts = []
+
+
+def build_chunked_batches(instances, road, chunk_segments=10):
+    """Split instances into one StaticBatch per run of chunk_segments road segments."""
+    if not instances:
+        return []
+    mids = np.array([((seg.p1[0] + seg.p2[0]) / 2, (seg.p1[1] + seg.p2[1]) / 2) for seg in road])
+    points = np.array([(x, z) for _, x, _, z, _, _ in instances])
+
+    # Nearest segment midpoint, computed in blocks to keep memory flat on long roads
+    nearest = np.empty(len(points), dtype=np.int64)
+    for start in range(0, len(points), 4096):
+        block = points[start:start + 4096]
+        d_sq = ((block[:, None, :] - mids[None, :, :]) ** 2).sum(axis=2)
+        nearest[start:start + 4096] = d_sq.argmin(axis=1)
+
+    chunks = {}
+    for instance, segment in zip(instances, (nearest // chunk_segments).tolist()):
+        chunks.setdefault(segment, []).append(instance)
+    return [StaticBatch(chunk) for _, chunk in sorted(chunks.items())]
@@ -0,0 +1,180 @@
+"""Live telemetry of the driving mode through a memory-mapped ring buffer.
+
+With TELEMETRY=1 (or TELEMETRY=path/to/file) the game writes one fixed-size
+record per physics tick into a shared file; other processes tail it without
+the game ever waiting on them. Watch a running session from the repository
+root with:
+
+    python telemetry.py [path]           a summary line twice a second
+    python telemetry.py [path] --csv     every record as CSV on stdout
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+
+# Set TELEMETRY=1 to publish to TELEMETRY_PATH, or to a file path to publish there
+TELEMETRY = os.environ.get('TELEMETRY')
+TELEMETRY_PATH = os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+                              'driving-telemetry.ring')
+# Records kept in the ring: a minute of ticks at 60 Hz
+TELEMETRY_RECORDS = 3600
+TELEMETRY_VERSION = 1
+
+# magic, version, record size, capacity, session start; the written count follows at WRITTEN_OFFSET
+HEADER = struct.Struct('<4sHHId')
+WRITTEN = struct.Struct('<Q')
+WRITTEN_OFFSET = 24
+HEADER_SIZE = 64
+MAGIC = b'DTEL'
+
+RECORD_FIELDS = (
+    ('tick', 'Q'), ('time', 'd'),
+    ('car_x', 'f'), ('car_z', 'f'), ('car_angle', 'f'), ('car_speed', 'f'), ('times', 'f'),
+    ('light_angle', 'f'), ('elapsed_time', 'f'),
+    ('frame_ms', 'f'), ('work_ms', 'f'), ('scene_ms', 'f'), ('fps', 'f'), ('render_scale', 'f'),
+    ('game_over', 'B'), ('game_win', 'B'), ('quality', 'B'), ('pad', 'B'),
+)
+RECORD = struct.Struct('<' + ''.join(code for _, code in RECORD_FIELDS))
+FIELD_NAMES = tuple(name for name, _ in RECORD_FIELDS if name != 'pad')
+
+
+def resolve_path(setting=TELEMETRY):
+    """File to publish to for a TELEMETRY setting: '1' means TELEMETRY_PATH."""
+    return TELEMETRY_PATH if setting in (None, '', '1') else setting
+
+
+class TelemetryPublisher:
+    """Writes per-tick records into the ring; never blocks and builds no buffers per tick.
+
+    Records are packed straight into the mapping, and the written count in the
+    header is bumped only after a record is complete, so readers can tell a
+    finished record from one being overwritten.
+    """
+
+    def __init__(self, path=TELEMETRY_PATH, capacity=TELEMETRY_RECORDS):
+        self.path = path
+        self.capacity = capacity
+        self.written = 0
+        size = HEADER_SIZE + capacity * RECORD.size
+        with open(path, 'wb') as f:
+            f.truncate(size)
+        self.file = open(path, 'r+b')
+        self.map = mmap.mmap(self.file.fileno(), size)
+        HEADER.pack_into(self.map, 0, MAGIC, TELEMETRY_VERSION, RECORD.size, capacity, time.time())
+        WRITTEN.pack_into(self.map, WRITTEN_OFFSET, 0)
+        print(f"[telemetry] publishing to {path}")
+
+    def publish(self, car_pos, car_angle, car_speed, times, light_angle, elapsed_time,
+                frame_ms, work_ms, scene_ms, fps, render_scale, game_over, game_win, quality):
+        RECORD.pack_into(self.map, HEADER_SIZE + (self.written % self.capacity) * RECORD.size,
+                         self.written, time.perf_counter(), car_pos[0], car_pos[1], car_angle, car_speed,
+                         times, light_angle, elapsed_time, frame_ms, work_ms, scene_ms or 0.0, fps,
+                         render_scale, game_over, game_win, quality, 0)
+        self.written += 1
+        WRITTEN.pack_into(self.map, WRITTEN_OFFSET, self.written)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+class TelemetryReader:
+    """Tails a ring written by TelemetryPublisher from another process."""
+
+    def __init__(self, path=TELEMETRY_PATH):
+        self.path = path
+        self.map = None
+        self.next = 0
+        self.dropped = 0
+
+    def _open(self):
+        """Map the ring, or return False when no complete ring is there yet."""
+        try:
+            with open(self.path, 'rb') as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        if len(self.map) < HEADER_SIZE:
+            self.map.close()
+            self.map = None
+            return False
+        magic, version, record_size, self.capacity, self.session = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != TELEMETRY_VERSION or record_size != RECORD.size:
+            raise ValueError(f"{self.path} is not a version {TELEMETRY_VERSION} telemetry ring")
+        self.next = 0
+        return True
+
+    def written(self):
+        return WRITTEN.unpack_from(self.map, WRITTEN_OFFSET)[0]
+
+    def read(self):
+        """Records written since the last call, as dicts; empty when nothing is new.
+
+        If the reader fell more than a ring behind, the overwritten records
+        are skipped and counted in dropped. A new session (the game was
+        restarted) is picked up from its first record.
+        """
+        if self.map is None and not self._open():
+            return []
+        if HEADER.unpack_from(self.map, 0)[4] != self.session or self.written() < self.next:
+            self.map.close()
+            if not self._open():
+                return []
+        written = self.written()
+        if written - self.next > self.capacity:
+            self.dropped += written - self.capacity - self.next
+            self.next = written - self.capacity
+        records = []
+        for sequence in range(self.next, written):
+            values = RECORD.unpack_from(self.map, HEADER_SIZE + (sequence % self.capacity) * RECORD.size)
+            records.append(dict(zip(FIELD_NAMES, values)))
+        # Records the publisher may have started overwriting while they were copied are dropped
+        overwritten = self.written() - self.capacity + 1 - self.next
+        if overwritten > 0:
+            self.dropped += overwritten
+            records = records[overwritten:]
+        self.next = written
+        return records
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tail the driving mode's telemetry ring.")
+    parser.add_argument('path', nargs='?', default=TELEMETRY_PATH)
+    parser.add_argument('--csv', action='store_true', help="print every record as CSV")
+    parser.add_argument('--interval', type=float, default=0.5, help="seconds between polls")
+    args = parser.parse_args(argv)
+
+    reader = TelemetryReader(args.path)
+    if args.csv:
+        print(','.join(FIELD_NAMES))
+    try:
+        while True:
+            records = reader.read()
+            if args.csv:
+                for record in records:
+                    print(','.join(str(record[name]) for name in FIELD_NAMES))
+                sys.stdout.flush()
+            elif records:
+                last = records[-1]
+                frame_ms = [record['frame_ms'] for record in records]
+                print(f"tick {last['tick']:>7}  pos ({last['car_x']:8.1f}, {last['car_z']:8.1f})  "
+                      f"speed {last['car_speed']:5.2f}  x{last['times']:.1f}  fps {last['fps']:5.1f}  "
+                      f"frame {sum(frame_ms) / len(frame_ms):5.1f}/{max(frame_ms):5.1f} ms  "
+                      f"scale {last['render_scale']:.2f}  dropped {reader.dropped}")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""Streamed heightmap terrain around the road.
+
+The ground is cut into square chunks. A chunk's heights are fractal value
+noise evaluated for its whole grid in one NumPy pass, pressed flat along the
+road corridor and around the start and finish so the road, verges, trees and
+ground tiles keep sitting at y=0. Each chunk is meshed once into a single
+VBO holding all of its detail levels, each with a skirt hanging below its
+edges to hide the cracks where neighbours are drawn at different levels;
+the grid topology is the same for every chunk, so all chunks share one index
+buffer per level. Chunks are built around the camera a few per frame and
+freed once they fall out of range, so what is held follows the draw
+distance rather than the length of the track.
+"""
+import math
+import time
+import numpy as np
+from OpenGL.GL import *
+from road_mesh import GRASS_MARGIN
+from gpu_resources import create_vbo, delete_vbo
+
+TERRAIN_COLOR = (0.28, 0.62, 0.2)
+# Side of a chunk in world units, and grid cells along it at full detail; every level halves the cells
+TERRAIN_CHUNK_SIZE = 64.0
+TERRAIN_CELLS = 32
+TERRAIN_LEVELS = 3
+# Chunks nearer the camera than these distances use levels 0 and 1, the rest the coarsest
+TERRAIN_LOD_DISTANCES = (60.0, 120.0)
+# Peak height of the hills, and the wavelength of the largest ones
+TERRAIN_HEIGHT = 14.0
+TERRAIN_FEATURE_SIZE = 96.0
+TERRAIN_OCTAVES = 4
+# Flattened ground lies just below the grass strips and ground tiles so neither z-fights it
+TERRAIN_FLAT_Y = -0.2
+# The terrain is flat out to the edge of the grass strips, then rises to full height over this distance
+TERRAIN_BLEND = 24.0
+# Flat around the start and finish, covering the 70x70 ground tiles there
+TERRAIN_PAD_RADIUS = 50.0
+# How far the skirts hang below the chunk edges
+TERRAIN_SKIRT_DEPTH = 4.0
+# Chunks built per frame once driving (1-2 ms each); the rest wait for later frames
+TERRAIN_BUILDS_PER_FRAME = 1
+# Chunks are freed this far beyond the load radius, so one on the border is not rebuilt every frame
+TERRAIN_UNLOAD_MARGIN = 32.0
+# Bytes per vertex: 3 position floats and 3 normal floats
+TERRAIN_STRIDE = 24
+
+
+def lattice_values(ix, iz, seed):
+    """Hash integer lattice coordinates to pseudo-random values in [0, 1)."""
+    h = ix.astype(np.uint32) * np.uint32(0x8da6b343) ^ iz.astype(np.uint32) * np.uint32(0xd8163841)
+    h ^= np.uint32((seed * 0xcb1ab31f) & 0xffffffff)
+    h ^= h >> np.uint32(13)
+    h *= np.uint32(0x5bd1e995)
+    h ^= h >> np.uint32(15)
+    return h.astype(np.float64) / 2.0 ** 32
+
+
+def value_noise(x, z, seed):
+    """Smoothly interpolated lattice noise in [0, 1) at arrays of points, lattice spacing 1."""
+    x0, z0 = np.floor(x), np.floor(z)
+    fx, fz = x - x0, z - z0
+    fx, fz = fx * fx * (3 - 2 * fx), fz * fz * (3 - 2 * fz)
+    ix, iz = x0.astype(np.int64), z0.astype(np.int64)
+    top = lattice_values(ix, iz, seed) * (1 - fx) + lattice_values(ix + 1, iz, seed) * fx
+    bottom = lattice_values(ix, iz + 1, seed) * (1 - fx) + lattice_values(ix + 1, iz + 1, seed) * fx
+    return top * (1 - fz) + bottom * fz
+
+
+def fractal_noise(x, z, seed, octaves=TERRAIN_OCTAVES, feature_size=TERRAIN_FEATURE_SIZE):
+    """Octaves of value noise, each twice the frequency and half the amplitude of the last, in [0, 1)."""
+    total = np.zeros_like(x, dtype=np.float64)
+    amplitude, frequency, norm = 1.0, 1.0 / feature_size, 0.0
+    for octave in range(octaves):
+        total += value_noise(x * frequency, z * frequency, seed + octave) * amplitude
+        norm += amplitude
+        amplitude *= 0.5
+        frequency *= 2.0
+    return total / norm
+
+
+def segment_distances(points, a, b):
+    """Distance from each of points (n, 2) to the nearest of the segments a[i]-b[i]."""
+    ab_x, ab_z = b[:, 0] - a[:, 0], b[:, 1] - a[:, 1]
+    lengths = np.maximum(ab_x * ab_x + ab_z * ab_z, 1e-12)
+    # Components are kept as separate (points, segments) arrays; stacking them costs more than the maths
+    dx = points[:, 0, None] - a[None, :, 0]
+    dz = points[:, 1, None] - a[None, :, 1]
+    t = np.clip((dx * ab_x + dz * ab_z) / lengths, 0.0, 1.0)
+    dx -= t * ab_x
+    dz -= t * ab_z
+    return np.sqrt((dx * dx + dz * dz).min(axis=1))
+
+
+def grid_indices(n):
+    """Triangle indices of an n x n vertex grid plus the skirt quads joining its border ring to n * n onward."""
+    rows, cols = np.mgrid[0:n - 1, 0:n - 1]
+    a = (rows * n + cols).ravel()
+    b, c = a + 1, a + n
+    grid = np.stack([a, c, b, b, c, c + 1], axis=1).ravel()
+
+    ring = border_ring(n)
+    top = np.append(ring, ring[0])
+    skirt = n * n + np.append(np.arange(len(ring)), 0)
+    skirts = np.stack([top[:-1], skirt[:-1], top[1:], top[1:], skirt[:-1], skirt[1:]], axis=1).ravel()
+    return np.concatenate([grid, skirts]).astype(np.uint16)
+
+
+def border_ring(n):
+    """Indices of an n x n grid's border vertices, walking once around it."""
+    i = np.arange(n - 1)
+    return np.concatenate([i, (n - 1) + i * n, n * n - 1 - i, (n - 1 - i) * n])
+
+
+class TerrainChunk:
+    __slots__ = ('key', 'bounds', 'vertex_buffer', 'offsets', 'nbytes')
+
+    def __init__(self, key, bounds, vertex_buffer, offsets, nbytes):
+        self.key = key
+        self.bounds = bounds
+        self.vertex_buffer = vertex_buffer
+        self.offsets = offsets
+        self.nbytes = nbytes
+
+    def delete(self):
+        delete_vbo(self.vertex_buffer)
+
+
+class Terrain:
+    """Chunked heightmap ground around a road given as its sampled centre line segments.
+
+    update() streams chunks in and out around a point; render() draws the
+    loaded chunks within a distance at a level chosen by their distance from
+    the camera. Everything within GRASS_MARGIN of the road edges, and within
+    TERRAIN_PAD_RADIUS of the start and finish, is flat, which covers every
+    tree and grass tuft the game places, so they stay at y=0.
+    """
+
+    def __init__(self, segments, start, end, seed=0):
+        self.seed = seed
+        self.a = np.array([seg.p1 for seg in segments], dtype=np.float64)
+        self.b = np.array([seg.p2 for seg in segments], dtype=np.float64)
+        self.low = np.minimum(self.a, self.b)
+        self.high = np.maximum(self.a, self.b)
+        self.pads = np.array([start, end], dtype=np.float64)
+        self.flat_radius = segments[0].width / 2 + GRASS_MARGIN
+        self.chunks = {}
+        self.index_buffers = None
+        self.stats = {'built': 0, 'freed': 0, 'peak': 0, 'peak_bytes': 0, 'build_seconds': 0.0}
+
+    def chunk_heights(self, key):
+        """Heights of a chunk's full-detail grid with one extra sample all round, for the normals."""
+        step = TERRAIN_CHUNK_SIZE / TERRAIN_CELLS
+        x0, z0 = key[0] * TERRAIN_CHUNK_SIZE, key[1] * TERRAIN_CHUNK_SIZE
+        offsets = np.arange(-1, TERRAIN_CELLS + 2) * step
+        z, x = np.meshgrid(z0 + offsets, x0 + offsets, indexing='ij')
+        # Squaring keeps most of the ground low and makes high peaks rare
+        heights = TERRAIN_HEIGHT * fractal_noise(x, z, self.seed) ** 2
+
+        # Only the segments that can reach this chunk take part in the distance test
+        reach = self.flat_radius + TERRAIN_BLEND
+        near = ((self.high[:, 0] >= x0 - step - reach) & (self.low[:, 0] <= x0 + TERRAIN_CHUNK_SIZE + step + reach)
+                & (self.high[:, 1] >= z0 - step - reach) & (self.low[:, 1] <= z0 + TERRAIN_CHUNK_SIZE + step + reach))
+        points = np.stack([x.ravel(), z.ravel()], axis=1)
+        corridor = np.full(len(points), np.inf)
+        if near.any():
+            corridor = segment_distances(points, self.a[near], self.b[near]) - self.flat_radius
+        pads = np.sqrt(((points[:, None, :] - self.pads[None]) ** 2).sum(axis=2)).min(axis=1) - TERRAIN_PAD_RADIUS
+        t = np.clip(np.minimum(corridor, pads) / TERRAIN_BLEND, 0.0, 1.0).reshape(heights.shape)
+        t = t * t * (3 - 2 * t)
+        return TERRAIN_FLAT_Y + (heights - TERRAIN_FLAT_Y) * t
+
+    def chunk_vertices(self, key, heights):
+        """Interleaved position and normal vertices of every level of a chunk, one (n * n + skirt, 6) array each."""
+        step = TERRAIN_CHUNK_SIZE / TERRAIN_CELLS
+        normals = np.empty(heights[1:-1, 1:-1].shape + (3,))
+        normals[..., 0] = (heights[1:-1, :-2] - heights[1:-1, 2:]) / (2 * step)
+        normals[..., 1] = 1.0
+        normals[..., 2] = (heights[:-2, 1:-1] - heights[2:, 1:-1]) / (2 * step)
+        normals /= np.linalg.norm(normals, axis=2, keepdims=True)
+        offsets = np.arange(TERRAIN_CELLS + 1) * step
+        z, x = np.meshgrid(key[1] * TERRAIN_CHUNK_SIZE + offsets, key[0] * TERRAIN_CHUNK_SIZE + offsets, indexing='ij')
+        full = np.concatenate([x[..., None], heights[1:-1, 1:-1, None], z[..., None], normals], axis=2)
+
+        levels = []
+        for level in range(TERRAIN_LEVELS):
+            grid = full[::2 ** level, ::2 ** level]
+            n = grid.shape[0]
+            vertices = grid.reshape(-1, 6)
+            skirt = vertices[border_ring(n)].copy()
+            skirt[:, 1] -= TERRAIN_SKIRT_DEPTH
+            levels.append(np.concatenate([vertices, skirt]).astype(np.float32))
+        return levels
+
+    def _build(self, key):
+        start = time.perf_counter()
+        if self.index_buffers is None:
+            self.index_buffers = []
+            for level in range(TERRAIN_LEVELS):
+                indices = grid_indices(TERRAIN_CELLS // 2 ** level + 1)
+                buffer = create_vbo(indices, f"terrain level {level} indices", target=GL_ELEMENT_ARRAY_BUFFER)
+                self.index_buffers.append((buffer, len(indices)))
+
+        levels = self.chunk_vertices(key, self.chunk_heights(key))
+        data = np.concatenate(levels)
+        offsets = np.cumsum([0] + [len(level) * TERRAIN_STRIDE for level in levels[:-1]]).tolist()
+        x0, z0 = key[0] * TERRAIN_CHUNK_SIZE, key[1] * TERRAIN_CHUNK_SIZE
+        bounds = (x0, z0, x0 + TERRAIN_CHUNK_SIZE, z0 + TERRAIN_CHUNK_SIZE)
+        self.chunks[key] = TerrainChunk(key, bounds, create_vbo(data, 'terrain chunk'), offsets, data.nbytes)
+        self.stats['built'] += 1
+        self.stats['build_seconds'] += time.perf_counter() - start
+
+    @staticmethod
+    def _distance(bounds, point):
+        """Distance from a point to the nearest point of a chunk's square."""
+        dx = max(bounds[0] - point[0], 0.0, point[0] - bounds[2])
+        dz = max(bounds[1] - point[1], 0.0, point[1] - bounds[3])
+        return math.hypot(dx, dz)
+
+    def update(self, center, radius, budget=TERRAIN_BUILDS_PER_FRAME):
+        """Free chunks out of range of center and build up to budget missing ones, nearest first.
+
+        A budget of None builds every missing chunk at once, for loading.
+        Returns the number of chunks still missing.
+        """
+        for key in [key for key, chunk in self.chunks.items()
+                    if self._distance(chunk.bounds, center) > radius + TERRAIN_UNLOAD_MARGIN]:
+            self.chunks.pop(key).delete()
+            self.stats['freed'] += 1
+
+        size = TERRAIN_CHUNK_SIZE
+        reach = int(math.ceil(radius / size))
+        cx, cz = int(math.floor(center[0] / size)), int(math.floor(center[1] / size))
+        missing = []
+        for kx in range(cx - reach, cx + reach + 1):
+            for kz in range(cz - reach, cz + reach + 1):
+                if (kx, kz) in self.chunks:
+                    continue
+                distance = self._distance((kx * size, kz * size, (kx + 1) * size, (kz + 1) * size), center)
+                if distance <= radius:
+                    missing.append((distance, (kx, kz)))
+        missing.sort()
+        for _, key in missing[:budget]:
+            self._build(key)
+
+        self.stats['peak'] = max(self.stats['peak'], len(self.chunks))
+        self.stats['peak_bytes'] = max(self.stats['peak_bytes'], sum(chunk.nbytes for chunk in self.chunks.values()))
+        return len(missing[budget:]) if budget is not None else 0
+
+    def level(self, distance):
+        for level, limit in enumerate(TERRAIN_LOD_DISTANCES):
+            if distance < limit:
+                return level
+        return TERRAIN_LEVELS - 1
+
+    def render(self, camera, target, draw_distance):
+        """Draw the loaded chunks within draw_distance of camera, nearest first, skipping those behind it.
+
+        target is the point the camera looks at.
+        """
+        forward_x, forward_z = target[0] - camera[0], target[1] - camera[1]
+        length = math.hypot(forward_x, forward_z) or 1.0
+        forward_x, forward_z = forward_x / length, forward_z / length
+        half_diagonal = TERRAIN_CHUNK_SIZE * math.sqrt(0.5)
+
+        visible = []
+        for chunk in self.chunks.values():
+            distance = self._distance(chunk.bounds, camera)
+            if distance > draw_distance:
+                continue
+            x0, z0, x1, z1 = chunk.bounds
+            ahead = ((x0 + x1) / 2 - camera[0]) * forward_x + ((z0 + z1) / 2 - camera[1]) * forward_z
+            if ahead < -half_diagonal:
+                continue
+            visible.append((distance, chunk))
+        if not visible:
+            return
+
+        glColor3f(*TERRAIN_COLOR)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        bound_level = None
+        for distance, chunk in sorted(visible, key=lambda item: item[0]):
+            level = self.level(distance)
+            index_buffer, count = self.index_buffers[level]
+            if level != bound_level:
+                index_buffer.bind()
+                bound_level = level
+            chunk.vertex_buffer.bind()
+            offset = chunk.offsets[level]
+            glVertexPointer(3, GL_FLOAT, TERRAIN_STRIDE, chunk.vertex_buffer + offset)
+            glNormalPointer(GL_FLOAT, TERRAIN_STRIDE, chunk.vertex_buffer + offset + 12)
+            glDrawElements(GL_TRIANGLES, count, GL_UNSIGNED_SHORT, index_buffer)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+
+    def report(self):
+        built = self.stats['built']
+        if not built:
+            return
+        print(f"[terrain] {built} chunks built ({self.stats['build_seconds'] / built * 1000:.2f} ms each), "
+              f"{self.stats['freed']} freed, peak {self.stats['peak']} loaded "
+              f"({self.stats['peak_bytes'] / 1024:.0f} KB of vertices)")
+
+    def delete(self):
+        for chunk in self.chunks.values():
+            chunk.delete()
+        self.chunks = {}
+        if self.index_buffers:
+            for index_buffer, _ in self.index_buffers:
+                delete_vbo(index_buffer)
+        self.index_buffers = None
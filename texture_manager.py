@@ -0,0 +1,177 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from OpenGL import contextdata
+from OpenGL.GL import *
+from assets import asset_key, asset_path, load_cache, packed_texture_levels, save_cache
+from gpu_resources import gen_texture, texture_storage
+
+# 'numpy' uploads a box-filtered chain built here; 'driver' leaves it to glGenerateMipmap
+MIPMAP_MODE = 'numpy'
+DECODE_WORKERS = 4
+TEXTURE_CACHE_VERSION = 1
+# Owner of the cached textures, which live as long as their GL context
+TEXTURE_CACHE_OWNER = 'texture cache'
+
+
+def decode_image(path):
+    """Decode an image into (h, w, 4) RGBA bytes with the bottom row first, as GL expects."""
+    with Image.open(asset_path(path)) as image:
+        pixels = np.asarray(image.convert('RGBA'))
+    return np.ascontiguousarray(pixels[::-1])
+
+
+def build_mipmaps(pixels):
+    """Return the full mip chain of an RGBA image, halving with a 2x2 box filter down to 1x1."""
+    levels = [pixels]
+    level = pixels
+    while level.shape[0] > 1 or level.shape[1] > 1:
+        # Repeat the last row/column of odd sizes so every output texel has four inputs
+        if level.shape[0] > 1 and level.shape[0] % 2:
+            level = np.concatenate([level, level[-1:]], axis=0)
+        if level.shape[1] > 1 and level.shape[1] % 2:
+            level = np.concatenate([level, level[:, -1:]], axis=1)
+        wide = level.astype(np.uint16)
+        if wide.shape[0] > 1:
+            wide = wide[0::2] + wide[1::2]
+        else:
+            wide = wide * 2
+        if wide.shape[1] > 1:
+            wide = wide[:, 0::2] + wide[:, 1::2]
+        else:
+            wide = wide * 2
+        level = ((wide + 2) // 4).astype(np.uint8)
+        levels.append(level)
+    return levels
+
+
+def load_cached_levels(path):
+    """Return the cached decoded mip chain of an image, or None when missing or stale."""
+    data = load_cache(asset_path(path), '.tex.npz', TEXTURE_CACHE_VERSION, MIPMAP_MODE)
+    try:
+        return [data[f'level{i}'] for i in range(int(data['count']))]
+    except (TypeError, KeyError):
+        return None
+
+
+def save_cached_levels(path, levels):
+    arrays = {'count': np.array(len(levels))}
+    for i, level in enumerate(levels):
+        arrays[f'level{i}'] = level
+    save_cache(asset_path(path), '.tex.npz', arrays, TEXTURE_CACHE_VERSION, MIPMAP_MODE)
+
+
+def load_levels(path):
+    """Decoded mip chain of an image (just the base level in driver mode), via the pack or disk cache."""
+    levels = packed_texture_levels(path, TEXTURE_CACHE_VERSION) or load_cached_levels(path)
+    if levels is None:
+        pixels = decode_image(path)
+        levels = build_mipmaps(pixels) if MIPMAP_MODE == 'numpy' else [pixels]
+        save_cached_levels(path, levels)
+    return levels
+
+
+def upload_levels(levels, label='texture', owner=None):
+    """Create a trilinear-filtered GL texture from a mip chain and return its id."""
+    texture_id = gen_texture(label, owner)
+    glBindTexture(GL_TEXTURE_2D, texture_id)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    for i, level in enumerate(levels):
+        glTexImage2D(GL_TEXTURE_2D, i, GL_RGBA, level.shape[1], level.shape[0], 0,
+                     GL_RGBA, GL_UNSIGNED_BYTE, level)
+    if len(levels) == 1:
+        glGenerateMipmap(GL_TEXTURE_2D)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glBindTexture(GL_TEXTURE_2D, 0)
+    # A driver-built chain adds a third to the base level
+    size = sum(level.nbytes for level in levels)
+    texture_storage(texture_id, size * 4 // 3 if len(levels) == 1 else size)
+    return texture_id
+
+
+def _power_of_two(n):
+    return 1 << max(0, int(n - 1).bit_length())
+
+
+def crop_to_uv_bounds(pixels, uv_min, uv_max):
+    """Cut the power-of-two sized block of an image that covers a UV rectangle.
+
+    Returns the block and its (x, y) pixel origin in the source image.
+    """
+    height, width = pixels.shape[:2]
+    x0, y0 = int(uv_min[0] * width), int(uv_min[1] * height)
+    x1, y1 = int(np.ceil(uv_max[0] * width)), int(np.ceil(uv_max[1] * height))
+    crop_w = min(width, _power_of_two(x1 - x0))
+    crop_h = min(height, _power_of_two(y1 - y0))
+    x0 = max(0, min(x0, width - crop_w))
+    y0 = max(0, min(y0, height - crop_h))
+    return pixels[y0:y0 + crop_h, x0:x0 + crop_w], (x0, y0)
+
+
+class TextureManager:
+    """Shared image cache: decodes on a thread pool and uploads each file once per GL context.
+
+    Decoded mip chains are kept on disk next to the image (`*.tex.npz`) so later
+    runs skip PNG decoding; GL uploads always happen on the calling (GL) thread.
+    """
+
+    def __init__(self, workers=DECODE_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.pending = {}
+        self.ids = {}
+
+    def _key(self, path):
+        return asset_key(path)
+
+    def preload(self, paths):
+        """Start decoding images in the background so later texture() calls only upload."""
+        for path in paths:
+            key = self._key(path)
+            if key not in self.pending:
+                self.pending[key] = self.pool.submit(load_levels, key)
+
+    def levels(self, path):
+        """Block until an image's mip chain is decoded and return it."""
+        key = self._key(path)
+        if key not in self.pending:
+            self.preload([key])
+        return self.pending[key].result()
+
+    def texture(self, path):
+        """GL texture id for an image, uploading it in the current context on first use."""
+        key = (contextdata.getContext(), self._key(path))
+        if key not in self.ids:
+            self.ids[key] = upload_levels(self.levels(path), key[1], TEXTURE_CACHE_OWNER)
+        return self.ids[key]
+
+    def atlas(self, paths, uv_min, uv_max, columns=4):
+        """Pack the region inside a UV rectangle of several images into one texture.
+
+        Returns (texture_id, transforms) where transforms[i] is the
+        (offset_u, offset_v, scale_u, scale_v) texture matrix that maps the
+        original UVs of image i onto its tile. Tiles sit on power-of-two
+        boundaries, so mip levels never blend neighbouring images. The atlas
+        is not cached: it belongs to the caller, who deletes it.
+        """
+        self.preload(paths)
+        crops = [crop_to_uv_bounds(self.levels(path)[0], uv_min, uv_max) for path in paths]
+        tile_h = max(crop.shape[0] for crop, _ in crops)
+        tile_w = max(crop.shape[1] for crop, _ in crops)
+        columns = min(columns, len(paths))
+        rows = (len(paths) + columns - 1) // columns
+        atlas_w, atlas_h = tile_w * columns, tile_h * _power_of_two(rows)
+
+        pixels = np.zeros((atlas_h, atlas_w, 4), dtype=np.uint8)
+        transforms = []
+        for i, (path, (crop, (x0, y0))) in enumerate(zip(paths, crops)):
+            tx, ty = (i % columns) * tile_w, (i // columns) * tile_h
+            pixels[ty:ty + crop.shape[0], tx:tx + crop.shape[1]] = crop
+            height, width = self.levels(path)[0].shape[:2]
+            transforms.append(((tx - x0) / atlas_w, (ty - y0) / atlas_h, width / atlas_w, height / atlas_h))
+
+        levels = build_mipmaps(pixels) if MIPMAP_MODE == 'numpy' else [pixels]
+        return upload_levels(levels, 'atlas'), transforms
+
+
+textures = TextureManager()
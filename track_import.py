@@ -0,0 +1,189 @@
+"""Import tracks from polyline files.
+
+Accepts CSV files whose first two columns are x,z in metres (lon,lat in
+degrees when loaded with geo=True), one point per line, and GeoJSON-style
+files whose "coordinates" hold [lon, lat] pairs.
+Files are parsed in chunks, simplified with Douglas-Peucker and resampled
+into RoadSegments of the length generate_road uses. The result is cached
+next to the source as <name>.track.npz, so later loads skip all of that.
+
+Drive an imported track with TRACK=path/to/track.csv python main.py, or
+preprocess one from the repository root with the command below.
+
+    python track_import.py path/to/track.geojson
+"""
+import math
+import os
+import re
+import sys
+import time
+import numpy as np
+from RoadSegment import RoadSegment
+from assets import load_cache, save_cache
+
+# Path of a track file to drive instead of a random road
+TRACK = os.environ.get('TRACK')
+TRACK_CACHE_VERSION = 1
+# Douglas-Peucker tolerance and resampled segment length, in game units (one unit is a metre)
+TRACK_TOLERANCE = 1.0
+TRACK_SEGMENT_LENGTH = 6.0
+EARTH_RADIUS = 6371000.0
+READ_CHUNK = 1 << 20
+
+NUMBER = rb'-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?'
+CSV_ROW = re.compile(rb'^[ \t]*(' + NUMBER + rb')[ \t]*,[ \t]*(' + NUMBER + rb')', re.MULTILINE)
+COORDINATE_PAIR = re.compile(rb'\[\s*(' + NUMBER + rb')\s*,\s*(' + NUMBER + rb')')
+
+
+def read_csv_points(path):
+    """(n, 2) float array of the first two columns of a CSV file; lines not starting with a number are skipped."""
+    chunks = []
+    with open(path, 'rb') as f:
+        while True:
+            lines = f.readlines(READ_CHUNK)
+            if not lines:
+                break
+            rows = CSV_ROW.findall(b''.join(lines))
+            if rows:
+                chunks.append(np.array(rows, dtype=np.float64))
+    return np.concatenate(chunks) if chunks else np.empty((0, 2))
+
+
+def read_geojson_points(path):
+    """(n, 2) float array of the [lon, lat] pairs in the first "coordinates" array of a GeoJSON file.
+
+    The file is scanned in chunks rather than loaded whole, and scanning stops
+    at the bracket that closes the array. Heights are ignored.
+    """
+    chunks = []
+    pending = b''
+    depth = None
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_CHUNK), b''):
+            pending += block
+            if depth is None:
+                key = pending.find(b'"coordinates"')
+                opening = pending.find(b'[', key) if key >= 0 else -1
+                if opening < 0:
+                    # Keep the key itself when its array starts in the next chunk
+                    pending = pending[key:] if key >= 0 else pending[-32:]
+                    continue
+                pending, depth = pending[opening:], 0
+
+            # Hold back everything from the last '[' so no pair is split between chunks
+            cut = pending.rfind(b'[')
+            data, pending = pending[:cut], pending[cut:]
+            brackets = np.frombuffer(data, dtype=np.uint8)
+            levels = depth + np.cumsum((brackets == ord('[')).astype(np.int64) - (brackets == ord(']')))
+            closed = np.flatnonzero(levels == 0)
+            if len(closed):
+                data, pending = data[:closed[0] + 1], b''
+            else:
+                depth = int(levels[-1]) if len(levels) else depth
+            pairs = COORDINATE_PAIR.findall(data)
+            if pairs:
+                chunks.append(np.array(pairs, dtype=np.float64))
+            if len(closed):
+                break
+    pairs = COORDINATE_PAIR.findall(pending)
+    if pairs:
+        chunks.append(np.array(pairs, dtype=np.float64))
+    return np.concatenate(chunks) if chunks else np.empty((0, 2))
+
+
+def project(lon_lat):
+    """Equirectangular projection of (lon, lat) degrees to metres around the first point."""
+    lon0, lat0 = lon_lat[0]
+    x = np.radians(lon_lat[:, 0] - lon0) * EARTH_RADIUS * math.cos(math.radians(lat0))
+    z = np.radians(lon_lat[:, 1] - lat0) * EARTH_RADIUS
+    return np.stack([x, z], axis=1)
+
+
+def douglas_peucker(points, tolerance):
+    """Indices of the points Douglas-Peucker keeps at the given tolerance.
+
+    Iterative, so millions of points never hit the recursion limit; each
+    range's distances are computed in one NumPy pass.
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        a, b = points[first], points[last]
+        inner = points[first + 1:last]
+        ab = b - a
+        length = math.hypot(*ab)
+        if length == 0:
+            distances = np.hypot(*(inner - a).T)
+        else:
+            distances = np.abs(ab[0] * (inner[:, 1] - a[1]) - ab[1] * (inner[:, 0] - a[0])) / length
+        index = int(distances.argmax())
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
+
+
+def resample(points, spacing):
+    """Points at equal distances along a polyline, always including both ends."""
+    steps = np.hypot(*np.diff(points, axis=0).T)
+    distance = np.concatenate([[0.0], np.cumsum(steps)])
+    count = max(1, int(round(distance[-1] / spacing)))
+    targets = np.linspace(0.0, distance[-1], count + 1)
+    return np.stack([np.interp(targets, distance, points[:, 0]), np.interp(targets, distance, points[:, 1])], axis=1)
+
+
+def align_start(points):
+    """Move the track to start at the origin heading along +z, like generate_road's."""
+    points = points - points[0]
+    dx, dz = points[1]
+    angle = math.atan2(dx, dz)
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    return np.stack([points[:, 0] * cos_a - points[:, 1] * sin_a, points[:, 0] * sin_a + points[:, 1] * cos_a], axis=1)
+
+
+def process_track(path, tolerance=TRACK_TOLERANCE, spacing=TRACK_SEGMENT_LENGTH, geo=None):
+    """Parse, simplify, resample and align a track file; returns the (n, 2) road points."""
+    if geo is None:
+        geo = path.lower().endswith(('.json', '.geojson'))
+    points = read_geojson_points(path) if path.lower().endswith(('.json', '.geojson')) else read_csv_points(path)
+    if geo:
+        points = project(points)
+    # Consecutive duplicates add nothing and give zero-length segments
+    points = points[np.concatenate([[True], np.any(np.diff(points, axis=0) != 0, axis=1)])]
+    if len(points) < 2:
+        raise ValueError(f"{path} has fewer than two distinct points")
+    simplified = points[douglas_peucker(points, tolerance)]
+    return align_start(resample(simplified, spacing)), len(points), len(simplified)
+
+
+def load_track_points(path, tolerance=TRACK_TOLERANCE, spacing=TRACK_SEGMENT_LENGTH, geo=None):
+    """Road points of a track file, from its cache when that is up to date."""
+    cached = load_cache(path, '.track.npz', TRACK_CACHE_VERSION, tolerance, spacing, geo)
+    if cached is not None and 'points' in cached:
+        return cached['points']
+
+    start = time.perf_counter()
+    points, raw_count, simplified_count = process_track(path, tolerance, spacing, geo)
+    print(f"Imported {path}: {raw_count} points, {simplified_count} after simplification, "
+          f"{len(points) - 1} segments in {(time.perf_counter() - start) * 1000:.0f} ms")
+    save_cache(path, '.track.npz', {'points': points}, TRACK_CACHE_VERSION, tolerance, spacing, geo)
+    return points
+
+
+def load_track(path, tolerance=TRACK_TOLERANCE, spacing=TRACK_SEGMENT_LENGTH, geo=None):
+    """The track in a polyline file as a list of RoadSegments, like generate_road returns."""
+    points = load_track_points(path, tolerance, spacing, geo)
+    path_points = [tuple(p) for p in points.tolist()]
+    return [RoadSegment(a, b) for a, b in zip(path_points, path_points[1:])]
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    road = load_track(sys.argv[1])
+    print(f"{len(road)} segments ready in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,102 @@
+import numpy as np
+
+# Post-transform cache size assumed when ordering triangles
+CACHE_SIZE = 16
+
+
+def optimize_vertex_cache(indices, vertex_count, cache_size=CACHE_SIZE):
+    """Reorder a triangle list for post-transform vertex cache locality (Tipsify).
+
+    indices is a flat sequence of triangle corners; the same triangles are
+    returned in a new order as a flat list.
+    """
+    triangles = [indices[i:i + 3] for i in range(0, len(indices), 3)]
+    if not triangles:
+        return []
+
+    adjacency = [[] for _ in range(vertex_count)]
+    for t, tri in enumerate(triangles):
+        for v in tri:
+            adjacency[v].append(t)
+    live = [len(adj) for adj in adjacency]
+
+    timestamps = [0] * vertex_count
+    emitted = [False] * len(triangles)
+    dead_end = []
+    output = []
+    time = cache_size + 1
+    cursor = 0
+    fan = triangles[0][0]
+
+    while fan >= 0:
+        candidates = []
+        for t in adjacency[fan]:
+            if emitted[t]:
+                continue
+            for v in triangles[t]:
+                output.append(v)
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if time - timestamps[v] > cache_size:
+                    timestamps[v] = time
+                    time += 1
+            emitted[t] = True
+
+        # Prefer the candidate that is still in the cache and has the most work left
+        fan = -1
+        best = -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = 0
+                if time - timestamps[v] + 2 * live[v] <= cache_size:
+                    priority = time - timestamps[v]
+                if priority > best:
+                    best = priority
+                    fan = v
+        if fan >= 0:
+            continue
+
+        # Otherwise back up through recently used vertices, then scan forward
+        while dead_end:
+            v = dead_end.pop()
+            if live[v] > 0:
+                fan = v
+                break
+        if fan >= 0:
+            continue
+        while cursor < vertex_count:
+            if live[cursor] > 0:
+                fan = cursor
+                break
+            cursor += 1
+
+    return output
+
+
+def average_cache_miss_ratio(indices, cache_size=CACHE_SIZE):
+    """Vertex transforms per triangle through a FIFO cache; 0.5 is ideal, 3.0 is no reuse."""
+    if len(indices) == 0:
+        return 0.0
+    cache = []
+    misses = 0
+    for v in indices:
+        if v not in cache:
+            misses += 1
+            cache.append(v)
+            if len(cache) > cache_size:
+                cache.pop(0)
+    return misses / (len(indices) / 3)
+
+
+def reorder_vertices(vertex_data, index_lists):
+    """Renumber vertices in order of first use so vertex fetches walk memory forwards."""
+    remap = [-1] * len(vertex_data)
+    order = []
+    for indices in index_lists:
+        for v in indices:
+            if remap[v] < 0:
+                remap[v] = len(order)
+                order.append(v)
+    remap = np.array(remap, dtype=np.int64)
+    return vertex_data[order], [remap[np.asarray(indices, dtype=np.int64)] for indices in index_lists]
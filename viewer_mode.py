@@ -4,14 +4,40 @@ from OpenGL.GL import *
 from OpenGL.GLU import *
 import sys
 import math 
-import random
+import time
 import pygame.mixer
 import pygame.freetype
 from OBJ import OBJ
-
-pygame.init()
-global font
-font = pygame.freetype.SysFont("Arial", 24)
+from placement import Scatter, Annulus
+from texture_manager import textures
+from assets import load_sound
+from fonts import get_font
+import startup
+from quality import QualityGovernor, scenery_visible
+from capture import FrameCapture, CAPTURE_KEY, CAPTURE_ON_START
+from profiler import SamplingProfiler, PROFILE_KEY, PROFILE_ON_START
+from gpu_resources import resources, gen_texture, texture_storage, delete_texture, gen_list, delete_list, GPU_REPORT_KEY
+from voices import VoiceManager, PRIORITY_AMBIENT, PRIORITY_ENGINE
+
+CAR_SKINS = [f"OBJs/textures/texture{i}.png" for i in range(1, 6)]
+# Pack the used part of every car skin into one atlas instead of five 2048x2048 textures
+CAR_SKIN_ATLAS = True
+
+# The text is laid out in this virtual screen and stretched over the window, so it scales with it
+VIEWER_TEXT_SPACE = (1000, 800)
+# Title and control instructions as (text, x, y) in VIEWER_TEXT_SPACE with y measured up from the bottom
+VIEWER_TEXT = [("Press Left/Right Arrow to change car texture, Enter to start the game", 200, 750)] + [
+    (instruction, 20, 20 + i * 25) for i, instruction in enumerate([
+        "Click R/F to control speed",
+        "Q/E to control sunlight direction",
+        "A/W/D to control camera angle",
+        "ESC to return to the main menu",
+        "ESC in the main menu to quit",
+        "INSTRUCTIONS:",
+    ])
+]
+# Window events after which the last presented frame has to be drawn again
+REDRAW_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.WINDOWSIZECHANGED)
 
 def setup_lighting():
     """Configure basic lighting for the scene."""
@@ -29,8 +55,26 @@ def setup_lighting():
     glEnable(GL_COLOR_MATERIAL)
     glColorMaterial(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE)
 
-def draw_text(text, x, y, color=(255, 255, 255)):
-    """Draw 2D text on screen."""
+def create_text_overlay(texts, space=VIEWER_TEXT_SPACE, color=(255, 255, 255)):
+    """Render every (text, x, y) line once into a single texture covering space and return its id."""
+    surface = pygame.Surface(space, pygame.SRCALPHA)
+    for text, x, y in texts:
+        text_surface, rect = get_font().render(text, color)
+        surface.blit(text_surface, (x, space[1] - y - text_surface.get_height()))
+    text_data = pygame.image.tostring(surface, "RGBA", True)
+
+    text_texture = gen_texture('viewer text')
+    glBindTexture(GL_TEXTURE_2D, text_texture)
+    # Stretched to the window size, so filtered like the per-line text textures it replaces
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, space[0], space[1], 0, GL_RGBA, GL_UNSIGNED_BYTE, text_data)
+    glBindTexture(GL_TEXTURE_2D, 0)
+    texture_storage(text_texture, len(text_data))
+    return text_texture
+
+def draw_text_overlay(text_texture, display):
+    """Draw the cached text overlay stretched over the whole window."""
     # Switch to orthographic projection for 2D rendering
     glDisable(GL_LIGHTING)
     glDisable(GL_DEPTH_TEST)
@@ -38,42 +82,28 @@ def draw_text(text, x, y, color=(255, 255, 255)):
     glMatrixMode(GL_PROJECTION)
     glPushMatrix()
     glLoadIdentity()
-    glOrtho(0, 1000, 0, 800, -1, 1)  # Match your display size
+    glOrtho(0, display[0], 0, display[1], -1, 1)
     
     glMatrixMode(GL_MODELVIEW)
     glPushMatrix()
     glLoadIdentity()
     
-    # Render text to a surface
-    text_surface, rect = font.render(text, color)
-    text_data = pygame.image.tostring(text_surface, "RGBA", True)
-    
-    # Create a texture
-    text_texture = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, text_texture)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, text_surface.get_width(), text_surface.get_height(), 
-                0, GL_RGBA, GL_UNSIGNED_BYTE, text_data)
-    
-    # Draw the texture as a quad
     glEnable(GL_TEXTURE_2D)
+    glBindTexture(GL_TEXTURE_2D, text_texture)
     glEnable(GL_BLEND)
     glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
     
     glColor4f(1, 1, 1, 1)
     glBegin(GL_QUADS)
-    glTexCoord2f(0, 0); glVertex2f(x, y)
-    glTexCoord2f(1, 0); glVertex2f(x + text_surface.get_width(), y)
-    glTexCoord2f(1, 1); glVertex2f(x + text_surface.get_width(), y + text_surface.get_height())
-    glTexCoord2f(0, 1); glVertex2f(x, y + text_surface.get_height())
+    glTexCoord2f(0, 0); glVertex2f(0, 0)
+    glTexCoord2f(1, 0); glVertex2f(display[0], 0)
+    glTexCoord2f(1, 1); glVertex2f(display[0], display[1])
+    glTexCoord2f(0, 1); glVertex2f(0, display[1])
     glEnd()
     
-    # Clean up
     glDisable(GL_BLEND)
     glDisable(GL_TEXTURE_2D)
     glBindTexture(GL_TEXTURE_2D, 0)
-    glDeleteTextures([text_texture])
     
     # Restore previous state
     glMatrixMode(GL_PROJECTION)
@@ -127,21 +157,30 @@ def load_models(texture_index=1):
     
     return car_obj, tree_model, grass1_model, grass2_model
 
+def load_car_skins(car_obj):
+    """Return (texture_id, uv_transform) for each car skin, ready for car_obj.set_texture."""
+    if CAR_SKIN_ATLAS:
+        uv_min, uv_max = car_obj.uv_bounds('MAIN')
+        atlas_id, transforms = textures.atlas(CAR_SKINS, uv_min, uv_max)
+        return [(atlas_id, transform) for transform in transforms]
+    textures.preload(CAR_SKINS)
+    return [(textures.texture(path), None) for path in CAR_SKINS]
+
 def create_display_lists(tree_model, grass1_model, grass2_model):
     """Create OpenGL display lists for models."""
     # Tree display list
-    tree_display_list = glGenLists(1)
+    tree_display_list = gen_list('tree')
     glNewList(tree_display_list, GL_COMPILE)
     tree_model.render()
     glEndList()
 
     # Grass display lists
-    grass1_display_list = glGenLists(1)
+    grass1_display_list = gen_list('grass1')
     glNewList(grass1_display_list, GL_COMPILE)
     grass1_model.render()
     glEndList()
 
-    grass2_display_list = glGenLists(1)
+    grass2_display_list = gen_list('grass2')
     glNewList(grass2_display_list, GL_COMPILE)
     grass2_model.render()
     glEndList()
@@ -149,63 +188,61 @@ def create_display_lists(tree_model, grass1_model, grass2_model):
     return tree_display_list, grass1_display_list, grass2_display_list
 
 def setup_audio():
-    """Initialize and start audio playback."""
+    """Initialize audio and start the ambience and the idling car; returns the VoiceManager."""
     pygame.mixer.pre_init(44100, -16, 2, 2048)  # Pre-initialize mixer
     pygame.mixer.init()
 
-    # Load and start background music
-    pygame.mixer.music.load("audio/nature.mp3")
-    pygame.mixer.music.set_volume(0.2)
-    pygame.mixer.music.play(-1)
+    # Load and start background ambience
+    nature_sound = load_sound("audio/nature.mp3")
+    nature_sound.set_volume(0.2)
 
-    # Load engine sound
-    engine_sound = pygame.mixer.Sound("audio/engine.mp3")
+    # Load engine sound; it comes from the car at the origin
+    engine_sound = load_sound("audio/engine.mp3")
     engine_sound.set_volume(0.6)
-    engine_channel = pygame.mixer.Channel(1)
-    engine_channel.play(engine_sound, -1)
 
-def generate_tree_positions(count=30, min_radius=5, max_radius=21, min_distance=2.5):
+    voices = VoiceManager({'nature': nature_sound, 'engine': engine_sound})
+    voices.play('nature', priority=PRIORITY_AMBIENT, loop=True)
+    voices.play('engine', position=(0.0, 0.0), priority=PRIORITY_ENGINE, loop=True)
+    return voices
+
+def generate_tree_positions(count=30, min_radius=5, max_radius=21, min_distance=2.5, seed=None):
     """Generate random positions for trees."""
-    object_positions = []
-    tree_positions = []
-    
-    while len(tree_positions) < count:
-        angle = random.uniform(0, 2 * math.pi)
-        radius = random.uniform(min_radius, max_radius)
-        x, z = radius * math.cos(angle), radius * math.sin(angle)
-        
-        if all(math.hypot(x - ox, z - oz) > min_distance for ox, oz in object_positions):
-            tree_positions.append((x, z))
-            object_positions.append((x, z))
-            
+    scatter = Scatter(seed)
+    tree_positions = scatter.place(Annulus(min_radius, max_radius), min_distance, count=count)
+    object_positions = list(tree_positions)
+
     return tree_positions, object_positions
 
 def generate_grass_positions(
     count=250, min_radius=3, max_radius=21, min_distance=1.5, 
-    object_positions=None, grass_models=None
+    object_positions=None, grass_models=None, seed=None
 ):
     """Generate random positions for grass objects."""
     if object_positions is None:
         object_positions = []
-    
+
+    scatter = Scatter(seed)
+    scatter.occupy(object_positions)
+    positions = scatter.place(Annulus(min_radius, max_radius), min_distance, count=count)
+
     grass_objects = []
-    while len(grass_objects) < count:
-        angle = random.uniform(0, 2 * math.pi)
-        radius = random.uniform(min_radius, max_radius)
-        x, z = radius * math.cos(angle), radius * math.sin(angle)
-        
-        if all(math.hypot(x - ox, z - oz) > min_distance for ox, oz in object_positions):
-            model = random.choice(grass_models)
-            grass_objects.append((x, z, model))
-            object_positions.append((x, z))
-            
+    for x, z in positions:
+        model = grass_models[scatter.rng.integers(len(grass_models))]
+        grass_objects.append((x, z, model))
+        object_positions.append((x, z))
+
     return grass_objects
 
-def handle_events(rotation, mouse_down, last_mouse_pos, zoom_radius, texture_index, car_obj):
+def handle_events(events, rotation, mouse_down, last_mouse_pos, zoom_radius, texture_index, car_obj, skins,
+                  capture=None, profiler=None):
     """Process pygame events and return updated state."""
     next_window = False
-    for event in pygame.event.get():
+    for event in events:
         if event.type == pygame.QUIT:
+            if capture:
+                capture.stop()
+            if profiler:
+                profiler.stop()
             pygame.quit()
             sys.exit()
             
@@ -230,11 +267,11 @@ def handle_events(rotation, mouse_down, last_mouse_pos, zoom_radius, texture_ind
         elif event.type == pygame.KEYDOWN:
             if event.key == pygame.K_RIGHT:
                 texture_index = (texture_index % 5) + 1
-                car_obj = OBJ('OBJs/car.obj', override_texture=f"textures/texture{texture_index}.png")
+                car_obj.set_texture('MAIN', *skins[texture_index - 1])
                 
             elif event.key == pygame.K_LEFT:
                 texture_index = 5 if texture_index == 1 else texture_index - 1
-                car_obj = OBJ('OBJs/car.obj', override_texture=f"textures/texture{texture_index}.png")
+                car_obj.set_texture('MAIN', *skins[texture_index - 1])
                 
             elif event.key == pygame.K_RETURN:
                 next_window = True
@@ -242,6 +279,15 @@ def handle_events(rotation, mouse_down, last_mouse_pos, zoom_radius, texture_ind
             elif event.key == pygame.K_ESCAPE:
                 next_window = True
                 texture_index = 0
+
+            elif event.key == CAPTURE_KEY and capture:
+                capture.toggle('viewer')
+
+            elif event.key == PROFILE_KEY and profiler:
+                profiler.toggle('viewer')
+
+            elif event.key == GPU_REPORT_KEY:
+                resources.report()
                 
     return rotation, mouse_down, last_mouse_pos, zoom_radius, texture_index, car_obj, next_window
 
@@ -279,20 +325,15 @@ def update_lighting(light_angle):
     
     return light_angle
 
-def render_scene(car_obj, tree_positions, grass_objects, tree_display_list, camY):
-    """Render all scene elements."""
-    # Clear the screen
-    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-    
-    # Ground
-    if camY >= 0:
-        draw_circular_base()
-
-    # Car
-    car_obj.render()
+def create_scenery_list(tree_positions, grass_objects, tree_display_list, density=1.0):
+    """Compile the trees and grass, keeping the given fraction of each, into one display list."""
+    scenery_list = gen_list('scenery')
+    glNewList(scenery_list, GL_COMPILE)
 
     # Trees
-    for x, z in tree_positions:
+    for i, (x, z) in enumerate(tree_positions):
+        if not scenery_visible(i, density):
+            continue
         glPushMatrix()
         glTranslatef(x, -0.01, z)
         glScalef(0.2, 0.2, 0.2)
@@ -300,32 +341,35 @@ def render_scene(car_obj, tree_positions, grass_objects, tree_display_list, camY
         glPopMatrix()
 
     # Grass
-    for x, z, model in grass_objects:
+    for i, (x, z, model) in enumerate(grass_objects):
+        if not scenery_visible(i, density):
+            continue
         glPushMatrix()
         glTranslatef(x, -0.01, z)
         glScalef(0.5, 0.5, 0.5)
         glCallList(model)
         glPopMatrix()
 
-    # Draw title/instruction near top center
-    draw_text("Press Left/Right Arrow to change car texture, Enter to start the game", 200, 750, (255, 255, 255))
+    glEndList()
+    return scenery_list
 
-    # Individual control instructions (one per line, top-left corner)
-    instructions = [
-        "Click R/F to control speed",
-        "Q/E to control sunlight direction",
-        "A/W/D to control camera angle",
-        "ESC to return to the main menu",
-        "ESC in the main menu to quit",
-        "INSTRUCTIONS:",
-    ]
+def render_scene(car_obj, scenery_list, text_texture, display, camY):
+    """Render all scene elements."""
+    # Clear the screen
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    
+    # Ground
+    if camY >= 0:
+        draw_circular_base()
 
-    start_y = 20   # Top of the screen
-    line_spacing = 25
-    x = 20         # Left side padding
+    # Car
+    car_obj.render()
 
-    for i, instruction in enumerate(instructions):
-        draw_text(instruction, x, start_y + i * line_spacing, (255, 255, 255))
+    # Trees and grass
+    glCallList(scenery_list)
+
+    # Title and instructions
+    draw_text_overlay(text_texture, display)
 
 
 
@@ -334,15 +378,25 @@ def run_viewer_mode(display):
     pygame.display.set_mode(display, DOUBLEBUF | OPENGL)
     initialize_opengl(display)
     setup_lighting()
+    resources.enter('viewer')
+    startup.mark("display")
 
     texture_index = 1
+    # Decode every skin in the background while the models are parsed
+    textures.preload(CAR_SKINS)
     car_obj, tree_model, grass1_model, grass2_model = load_models(texture_index)
+    startup.mark("models")
+    skins = load_car_skins(car_obj)
+    car_obj.set_texture('MAIN', *skins[texture_index - 1])
+    startup.mark("car skins")
     
     tree_display_list, grass1_display_list, grass2_display_list = create_display_lists(
         tree_model, grass1_model, grass2_model
     )
+    startup.mark("display lists")
     
-    setup_audio()
+    voices = setup_audio()
+    startup.mark("audio")
     
     # Generate scene objects
     tree_positions, object_positions = generate_tree_positions()
@@ -351,9 +405,11 @@ def run_viewer_mode(display):
         object_positions=object_positions, 
         grass_models=grass_models
     )
+    startup.mark("scene")
     
     # Game state
     clock = pygame.time.Clock()
+    governor = QualityGovernor('viewer')
     rotation = [0, 20]
     mouse_down = False
     last_mouse_pos = (0, 0)
@@ -361,18 +417,46 @@ def run_viewer_mode(display):
     light_angle = 0.0
 
     # Main loop
+    text_texture = create_text_overlay(VIEWER_TEXT)
+    scenery_list = create_scenery_list(tree_positions, grass_objects, tree_display_list,
+                                       governor.preset['scenery_density'])
+    capture = FrameCapture(display)
+    if CAPTURE_ON_START:
+        capture.start('viewer')
+    profiler = SamplingProfiler()
+    if PROFILE_ON_START:
+        profiler.start('viewer')
+    dirty = True
     while True:
-        dt = clock.tick(60) / 1000.0
-        fps = clock.get_fps()
-        pygame.display.set_caption(f"3D Car Viewer - FPS: {int(fps)}")
+        # Sleep in the event queue while nothing on screen can change; held Q/E keys animate the light
+        events = pygame.event.get()
+        keys = pygame.key.get_pressed()
+        if not (events or dirty or keys[pygame.K_q] or keys[pygame.K_e]):
+            profiler.phase('idle')
+            events = [pygame.event.wait()] + pygame.event.get()
+        profiler.phase('events')
+        clock.tick(60)
+        frame_start = time.perf_counter()
 
         # Handle input
+        view = (tuple(rotation), zoom_radius, texture_index)
         rotation, mouse_down, last_mouse_pos, zoom_radius, texture_index, car_obj, next_window = handle_events(
-            rotation, mouse_down, last_mouse_pos, zoom_radius, texture_index, car_obj
+            events, rotation, mouse_down, last_mouse_pos, zoom_radius, texture_index, car_obj, skins, capture, profiler
         )
 
         if next_window:
-            pygame.mixer.music.stop()
+            capture.stop()
+            profiler.stop()
+            for display_list in (scenery_list, tree_display_list, grass1_display_list, grass2_display_list):
+                delete_list(display_list)
+            delete_texture(text_texture)
+            if CAR_SKIN_ATLAS:
+                delete_texture(skins[0][0])
+            for model in (car_obj, tree_model, grass1_model, grass2_model):
+                model.delete()
+            resources.leave('viewer')
+            voices.stop_all()
+            pygame.mixer.stop()
             pygame.mixer.quit()
             return texture_index
 
@@ -385,10 +469,33 @@ def run_viewer_mode(display):
         gluLookAt(camX, camY, camZ, 0, 0, 0, 0, 1, 0)
 
         # Update lighting
+        previous_light = light_angle
         light_angle = update_lighting(light_angle)
+
+        exposed = any(event.type in REDRAW_EVENTS for event in events)
+        dirty = dirty or exposed or light_angle != previous_light or view != (tuple(rotation), zoom_radius, texture_index)
+        if not dirty:
+            continue
         
+        # Mix the car's engine for the new camera position
+        voices.update((camX, camZ), (0.0, 0.0))
+
         # Render everything
-        render_scene(car_obj, tree_positions, grass_objects, tree_display_list, camY)
+        profiler.phase('scene')
+        render_scene(car_obj, scenery_list, text_texture, display, camY)
 
-        # Swap buffers
+        # Swap buffers; only redrawn frames are recorded, so idle stretches leave no frames
+        profiler.phase('present')
+        capture.capture()
         pygame.display.flip()
+        startup.first_frame()
+        profiler.frame()
+        dirty = False
+
+        # Only rendered frames count towards the quality budget, idle waits do not
+        if governor.update((time.perf_counter() - frame_start) * 1000):
+            delete_list(scenery_list)
+            scenery_list = create_scenery_list(tree_positions, grass_objects, tree_display_list,
+                                               governor.preset['scenery_density'])
+            dirty = True
+        pygame.display.set_caption(f"3D Car Viewer - FPS: {int(clock.get_fps())}")
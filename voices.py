@@ -0,0 +1,155 @@
+import math
+import numpy as np
+import pygame
+
+# Mixer channels the manager owns; emitters beyond this many play silently until a voice frees up
+AUDIO_CHANNELS = 12
+# Full volume up to this distance (the follow camera's offset), fading to silence at the maximum
+AUDIO_REFERENCE_DISTANCE = 10.0
+AUDIO_MAX_DISTANCE = 80.0
+# Emitters quieter than this do not hold a voice
+AUDIO_MIN_GAIN = 0.01
+# Channel volumes are only touched when they move by more than this
+AUDIO_GAIN_EPSILON = 0.01
+# A playing voice only loses its channel to an equal-priority emitter this much louder,
+# so two similar emitters do not keep restarting each other
+AUDIO_STEAL_MARGIN = 1.25
+
+# Higher priorities steal voices from lower ones
+PRIORITY_AMBIENT = 0
+PRIORITY_TRAFFIC = 1
+PRIORITY_ENGINE = 2
+PRIORITY_EFFECT = 3
+
+
+class Emitter:
+    """A sound the game wants heard, with or without a mixer channel at the moment."""
+
+    __slots__ = ('key', 'sound', 'priority', 'loop', 'volume', 'position', 'channel', 'started', 'left', 'right')
+
+    def __init__(self, key, sound, priority, loop, volume, position):
+        self.key = key
+        self.sound = sound
+        self.priority = priority
+        self.loop = loop
+        self.volume = volume
+        self.position = position
+        self.channel = None
+        self.started = False
+        self.left = self.right = -1.0
+
+
+class VoiceManager:
+    """Plays named emitters on a fixed pool of mixer channels.
+
+    play() and move() only record what should be heard. update() runs once
+    per frame: it computes distance and pan gains for every emitter from the
+    camera in one NumPy pass, gives the channels to the highest priority,
+    loudest emitters (stealing from the rest) and sets the changed channel
+    volumes. Every emitter costs that pass, but only the audible ones, within
+    AUDIO_MAX_DISTANCE and above AUDIO_MIN_GAIN, are ranked for a voice, and
+    channel calls are bounded by the pool size. Emitters with no position
+    play centred at their own volume.
+    """
+
+    def __init__(self, sounds, channels=AUDIO_CHANNELS):
+        pygame.mixer.set_num_channels(channels)
+        self.sounds = sounds
+        self.size = channels
+        self.free = [pygame.mixer.Channel(i) for i in range(channels)]
+        self.emitters = {}
+        self.stats = {'stolen': 0, 'culled': 0, 'peak': 0}
+
+    def play(self, key, sound=None, position=None, priority=PRIORITY_EFFECT, loop=False, volume=1.0):
+        """Start (or restart) the emitter key; sound names an entry of sounds and defaults to key."""
+        self.stop(key)
+        self.emitters[key] = Emitter(key, self.sounds[sound or key], priority, loop, volume, position)
+
+    def playing(self, key):
+        return key in self.emitters
+
+    def move(self, key, position):
+        emitter = self.emitters.get(key)
+        if emitter:
+            emitter.position = position
+
+    def stop(self, key):
+        emitter = self.emitters.pop(key, None)
+        if emitter and emitter.channel:
+            self._release(emitter)
+
+    def stop_all(self):
+        for key in list(self.emitters):
+            self.stop(key)
+
+    def _release(self, emitter):
+        emitter.channel.stop()
+        self.free.append(emitter.channel)
+        emitter.channel = None
+
+    def gains(self, emitters, listener, target):
+        """(left, right) channel volumes of each emitter for a listener at listener looking at target."""
+        volumes = np.array([e.volume for e in emitters])
+        positioned = np.array([e.position is not None for e in emitters])
+        points = np.array([e.position if e.position is not None else listener for e in emitters], dtype=np.float64)
+
+        offsets = points - listener
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        gain = np.minimum(1.0, AUDIO_REFERENCE_DISTANCE / np.maximum(distances, 1e-6))
+        gain *= np.clip((AUDIO_MAX_DISTANCE - distances) / (AUDIO_MAX_DISTANCE - AUDIO_REFERENCE_DISTANCE), 0.0, 1.0)
+
+        # The listener's right is forward x up; -x is screen right when looking along +z
+        forward_x, forward_z = target[0] - listener[0], target[1] - listener[1]
+        length = math.hypot(forward_x, forward_z) or 1.0
+        right = np.array([-forward_z, forward_x]) / length
+        pan = np.where(distances > 1e-6, offsets @ right / np.maximum(distances, 1e-6), 0.0)
+
+        gain = np.where(positioned, gain, 1.0) * volumes
+        pan = np.where(positioned, pan, 0.0)
+        # Equal-power panning keeps the loudness constant across the stereo field
+        angle = (pan + 1.0) * math.pi / 4
+        left = np.minimum(1.0, gain * np.cos(angle) * math.sqrt(2))
+        right = np.minimum(1.0, gain * np.sin(angle) * math.sqrt(2))
+        return left, right, gain
+
+    def update(self, listener, target):
+        """Assign channels and set volumes for this frame's listener position and view target."""
+        # One-shots that have played out are done
+        for emitter in [e for e in self.emitters.values() if e.started and e.channel and not e.channel.get_busy()]:
+            if not emitter.loop:
+                self.stop(emitter.key)
+        if not self.emitters:
+            return
+
+        emitters = list(self.emitters.values())
+        left, right, gain = self.gains(emitters, listener, target)
+        # Emitters out of earshot never get a voice, so only the rest are ranked
+        audible = np.nonzero(gain >= AUDIO_MIN_GAIN)[0]
+        held = np.array([emitters[i].channel is not None for i in audible], dtype=bool)
+        priority = np.array([emitters[i].priority for i in audible])
+        rank = np.where(held, gain[audible] * AUDIO_STEAL_MARGIN, gain[audible])
+        voiced = set(audible[np.lexsort((-rank, -priority))[:self.size]].tolist())
+
+        # Take channels from the emitters that lost out before handing them to the winners
+        for i, emitter in enumerate(emitters):
+            if i in voiced or not (emitter.channel or not emitter.started):
+                continue
+            if emitter.channel:
+                self._release(emitter)
+                self.stats['stolen'] += 1
+            # A one-shot without a voice now would only be heard late or cut, so it is dropped
+            if not emitter.loop:
+                self.emitters.pop(emitter.key, None)
+                self.stats['culled'] += not emitter.started
+
+        for i in voiced:
+            emitter = emitters[i]
+            if emitter.channel is None:
+                emitter.channel = self.free.pop()
+                emitter.channel.play(emitter.sound, -1 if emitter.loop else 0)
+                emitter.started = True
+                emitter.left = emitter.right = -1.0
+            if abs(left[i] - emitter.left) > AUDIO_GAIN_EPSILON or abs(right[i] - emitter.right) > AUDIO_GAIN_EPSILON:
+                emitter.left, emitter.right = float(left[i]), float(right[i])
+                emitter.channel.set_volume(emitter.left, emitter.right)
+        self.stats['peak'] = max(self.stats['peak'], len(voiced))